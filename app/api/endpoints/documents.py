@@ -1,19 +1,75 @@
 # app/api/endpoints/documents.py
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi import (
+    APIRouter,
+    UploadFile,
+    File,
+    HTTPException,
+    Depends,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
 import logging
+import time
 from pathlib import Path
+from typing import AsyncIterator, List, Optional
 
+from app.core.admission import upload_admission
 from app.core.config import settings
+from app.core.metrics import stage
+from app.core.middleware import client_key
+from app.core.responses import FastJSONResponse
+from app.services.batch import BatchItem, process_batch
 from app.services.document_processor import DocumentProcessorService
-from app.schemas.document import DocumentProcessResponse
+from app.services.document_reader import document_reader
+from app.services.jobs import job_queue, JobQueueFull
+from app.services.search import search_index
+from app.services.storage import DocumentNotFound
+from app.services.upload_stream import result_line, stream_upload
+from app.services.worker_pool import WorkerPoolSaturated, WorkerPoolTimeout
+from app.utils.document_parser import parse_page_range
+from app.utils.uploads import (
+    discard_source,
+    extract_archive,
+    spool_upload,
+    UploadTooLarge,
+)
+from app.schemas.document import (
+    DocumentContentResponse,
+    DocumentProcessResponse,
+    JobAcceptedResponse,
+    JobStatusResponse,
+    SearchResponse,
+)
 
 logger = logging.getLogger("doc_processor")
 router = APIRouter()
 
 
-@router.post("/upload", response_model=DocumentProcessResponse)
-async def upload_document(file: UploadFile = File(...)):
+@router.post(
+    "/upload",
+    response_model=DocumentProcessResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "With `response=stream`: metadata, content and "
+            "result lines",
+        },
+        202: {"model": JobAcceptedResponse},
+    },
+)
+async def upload_document(
+    file: UploadFile = File(...),
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+    force: bool = Query(False),
+    pages: Optional[str] = Query(None, description="PDF page range, e.g. 1-20"),
+    version_of: Optional[str] = Query(
+        None, description="ID of a stored document this upload is a new version of"
+    ),
+    response: str = Query("full", pattern="^(summary|full|stream)$"),
+):
     """
     Upload a document (PDF or DOCX) to be processed and stored in Firestore.
 
@@ -21,6 +77,31 @@ async def upload_document(file: UploadFile = File(...)):
     stores the extracted data in Firestore.
 
     Returns processing result with document ID and summary statistics.
+    With `mode=async` the document is queued instead and a `202` response
+    with a job ID is returned; poll `/documents/jobs/{job_id}` for the result.
+
+    Uploads whose content was already processed return the existing document
+    without parsing it again, unless `force=true` is given. The
+    `X-Dedup-Cache` header reports `hit`, `miss` or `bypass`.
+
+    For PDFs, `pages` (e.g. `1-20`, `5` or `10-`) extracts only that range.
+
+    With `version_of`, the upload replaces the content of that document as
+    its next version, keeping its ID; only the content chunks that changed
+    are written. Version uploads are never answered from the dedup index.
+
+    `response` selects what is returned: `full` (default) includes all
+    extracted content, `summary` leaves it out, and `stream` returns NDJSON
+    as the document is extracted: a `metadata` line, `pages`,
+    `paragraphs`, `headers` and `tables` lines of up to `CONTENT_PAGE_SIZE`
+    items with their `offset`, then a `result` line (the `summary`
+    response) or an `error` line with `status_code` and `detail`. Only
+    `full` is supported with `mode=async`; job results leave the content
+    out, to be read through `/documents/{document_id}/content`.
+
+    Uploads are admitted per client and against the server's concurrency
+    and memory limits (see app.core.admission); rejected uploads get `429`
+    or `503` with a `Retry-After` header.
     """
     try:
         # Validate file extension
@@ -31,27 +112,151 @@ async def upload_document(file: UploadFile = File(...)):
                 detail=f"Only {', '.join(settings.ALLOWED_EXTENSIONS)} files are supported",
             )
 
-        # Read file content
-        file_content = await file.read()
+        page_range = None
+        if pages:
+            try:
+                page_range = parse_page_range(pages)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if file_ext != ".pdf":
+                raise HTTPException(
+                    status_code=400,
+                    detail="Page ranges are only supported for PDF documents",
+                )
+
+        if mode == "async" and response != "full":
+            raise HTTPException(
+                status_code=400,
+                detail="Only response=full is supported with mode=async",
+            )
+
+        if version_of and await document_reader.get_etag(version_of) is None:
+            raise HTTPException(status_code=404, detail="Document not found")
 
-        # Check file size
-        if len(file_content) > settings.MAX_UPLOAD_SIZE:
+        # Read file content in chunks, rejecting oversized files early
+        try:
+            with stage("read"):
+                upload = await spool_upload(
+                    file,
+                    max_size=settings.MAX_UPLOAD_SIZE,
+                    memory_threshold=settings.UPLOAD_SPOOL_THRESHOLD,
+                    chunk_size=settings.UPLOAD_CHUNK_SIZE,
+                    spool_dir=settings.UPLOAD_SPOOL_DIR,
+                )
+        except UploadTooLarge:
             max_size_mb = settings.MAX_UPLOAD_SIZE / (1024 * 1024)
             raise HTTPException(
                 status_code=400,
                 detail=f"File size exceeds maximum allowed size of {max_size_mb}MB",
             )
 
-        # Process document
-        result = await DocumentProcessorService.process_document(
-            file_content=file_content, filename=file.filename
-        )
+        streaming = False
+        try:
+            content_hash = upload.sha256
+            dedup_status = "miss"
+            if force or version_of or not settings.DEDUP_ENABLED:
+                dedup_status = "bypass"
+            else:
+                with stage("dedup"):
+                    duplicate = await DocumentProcessorService.find_duplicate(
+                        content_hash, page_range
+                    )
+                if duplicate is not None:
+                    headers = {"X-Dedup-Cache": "hit", "X-Content-SHA256": content_hash}
+                    if response == "stream":
+                        return StreamingResponse(
+                            iter([result_line(duplicate)]),
+                            media_type="application/x-ndjson",
+                            headers=headers,
+                        )
+                    if response == "summary":
+                        duplicate.content = None
+                    return FastJSONResponse(duplicate, headers=headers)
+
+            dedup_headers = {
+                "X-Dedup-Cache": dedup_status,
+                "X-Content-SHA256": content_hash,
+            }
+
+            if mode == "async":
+                # The job store takes ownership of the buffered content
+                source = upload.detach()
+                try:
+                    job = await job_queue.submit(
+                        source,
+                        file.filename,
+                        content_hash=content_hash,
+                        page_range=page_range,
+                        version_of=version_of,
+                    )
+                except BaseException:
+                    discard_source(source)
+                    raise
+                status_url = f"{settings.API_PREFIX}/documents/jobs/{job['job_id']}"
+                return JSONResponse(
+                    status_code=202,
+                    content=JobAcceptedResponse(
+                        job_id=job["job_id"],
+                        status=job["status"],
+                        status_url=status_url,
+                    ).model_dump(),
+                    headers={"Location": status_url, **dedup_headers},
+                )
 
-        return result
+            if response == "stream":
+                # The stream takes ownership of the upload
+                streaming = True
+                return StreamingResponse(
+                    stream_upload(
+                        upload,
+                        file.filename,
+                        content_hash=content_hash,
+                        page_range=page_range,
+                        version_of=version_of,
+                    ),
+                    media_type="application/x-ndjson",
+                    headers=dedup_headers,
+                )
+
+            # Process document
+            result = await DocumentProcessorService.process_document(
+                file_content=upload.source(),
+                filename=file.filename,
+                content_hash=content_hash,
+                page_range=page_range,
+                version_of=version_of,
+                include_content=response == "full",
+            )
+
+            return FastJSONResponse(result, headers=dedup_headers)
+        finally:
+            if not streaming:
+                upload.close()
 
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
+    except DocumentNotFound:
+        # The document was deleted while the new version was processed
+        raise HTTPException(status_code=404, detail="Document not found")
+    except JobQueueFull as e:
+        logger.warning(f"Rejected upload, job queue full: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+        )
+    except WorkerPoolSaturated as e:
+        # Too many documents are already waiting for a parser
+        logger.warning(f"Rejected upload, extraction pool saturated: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+        )
+    except WorkerPoolTimeout as e:
+        logger.error(f"Document extraction timed out: {e}")
+        raise HTTPException(status_code=504, detail="Document processing timed out")
     except ValueError as e:
         # Document processing errors
         logger.error(f"Document processing error: {e}")
@@ -60,3 +265,246 @@ async def upload_document(file: UploadFile = File(...)):
         # Unexpected errors
         logger.error(f"Unexpected error in upload_document: {e}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
+
+
+def _too_large_detail(max_size: int) -> str:
+    return f"File size exceeds maximum allowed size of {max_size / (1024 * 1024)}MB"
+
+
+async def _batch_items(file: UploadFile) -> List[BatchItem]:
+    """Spool one file of a batch upload, expanding zip archives"""
+    file_ext = Path(file.filename or "").suffix.lower()
+    if file_ext == ".zip":
+        try:
+            archive = await spool_upload(
+                file,
+                max_size=settings.BATCH_MAX_UPLOAD_SIZE,
+                memory_threshold=settings.UPLOAD_SPOOL_THRESHOLD,
+                chunk_size=settings.UPLOAD_CHUNK_SIZE,
+                spool_dir=settings.UPLOAD_SPOOL_DIR,
+            )
+        except UploadTooLarge:
+            raise HTTPException(
+                status_code=400,
+                detail=_too_large_detail(settings.BATCH_MAX_UPLOAD_SIZE),
+            )
+        try:
+            members = await asyncio.to_thread(
+                extract_archive,
+                archive.source(),
+                settings.ALLOWED_EXTENSIONS,
+                max_size=settings.MAX_UPLOAD_SIZE,
+                max_members=settings.BATCH_MAX_FILES,
+                memory_threshold=settings.UPLOAD_SPOOL_THRESHOLD,
+                chunk_size=settings.UPLOAD_CHUNK_SIZE,
+                spool_dir=settings.UPLOAD_SPOOL_DIR,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
+        finally:
+            archive.close()
+        return [
+            BatchItem(member.filename, member.upload, member.error)
+            for member in members
+        ]
+
+    if file_ext not in settings.ALLOWED_EXTENSIONS:
+        return [
+            BatchItem(
+                file.filename,
+                None,
+                f"Only {', '.join(settings.ALLOWED_EXTENSIONS)} files are supported",
+            )
+        ]
+    try:
+        upload = await spool_upload(
+            file,
+            max_size=settings.MAX_UPLOAD_SIZE,
+            memory_threshold=settings.UPLOAD_SPOOL_THRESHOLD,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE,
+            spool_dir=settings.UPLOAD_SPOOL_DIR,
+        )
+    except UploadTooLarge:
+        return [
+            BatchItem(file.filename, None, _too_large_detail(settings.MAX_UPLOAD_SIZE))
+        ]
+    return [BatchItem(file.filename, upload)]
+
+
+async def _stream_batch(items: List[BatchItem], force: bool) -> AsyncIterator[str]:
+    try:
+        async for line in process_batch(items, force=force):
+            yield line
+    finally:
+        # process_batch closes uploads as it goes; this also covers a
+        # client that disconnects before the stream starts
+        for item in items:
+            if item.upload is not None:
+                item.upload.close()
+
+
+@router.post(
+    "/upload-batch",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "One BatchFileResult line per document, then a "
+            "BatchSummary line",
+        }
+    },
+)
+async def upload_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    force: bool = Query(False),
+):
+    """
+    Upload several documents (PDF, DOCX or zip archives of them) at once.
+
+    Up to `BATCH_MAX_PARALLEL` documents are processed concurrently and their
+    Firestore writes are shared between documents where they fit in one
+    batch. The response streams one JSON line per document as soon as it is
+    done (in completion order, with its `index` in the upload), followed by
+    a summary line with `done: true`.
+
+    A failing document does not fail the batch: its line carries the status
+    code and error the single upload endpoint would have returned. Requests
+    with more than `BATCH_MAX_FILES` documents or an unreadable archive are
+    rejected with `400` before anything is processed.
+
+    Batches go through the same admission control as single uploads and
+    count one upload per document against the client's rate limit.
+    """
+    items: List[BatchItem] = []
+    try:
+        for file in files:
+            items.extend(await _batch_items(file))
+            if len(items) > settings.BATCH_MAX_FILES:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"A batch may contain at most {settings.BATCH_MAX_FILES} documents",
+                )
+    except BaseException:
+        for item in items:
+            if item.upload is not None:
+                item.upload.close()
+        raise
+
+    # Admission took a token for the request; the other documents pay theirs
+    upload_admission.charge(client_key(request.scope), len(items) - 1)
+    return StreamingResponse(
+        _stream_batch(items, force), media_type="application/x-ndjson"
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    """
+    Get the state of a background processing job.
+
+    Returns the job state, progress and, once the job has succeeded, the
+    processing result without its content, which is read through
+    `/documents/{document_id}/content`. Finished jobs are kept for
+    JOB_RETENTION seconds.
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_documents(
+    q: str = Query(..., min_length=1, max_length=500),
+    document_id: Optional[List[str]] = Query(
+        None, description="Only search these documents"
+    ),
+    document_type: Optional[str] = Query(None, pattern="^(docx|pdf)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=settings.SEARCH_MAX_RESULTS),
+):
+    """
+    Search the extracted text of processed documents.
+
+    Documents containing any of the words in `q` are ranked with BM25;
+    `"quoted phrases"` must appear as written. Results can be limited to
+    some `document_id`s or a `document_type`. Each result has a snippet of
+    the best matching header, paragraph or table row, HTML-escaped with
+    the matching words in `<mark>` tags, and the `type` and `item_index`
+    of that item for reading it through `/documents/{document_id}/content`.
+    """
+    if search_index is None:
+        raise HTTPException(status_code=404, detail="Search is not enabled")
+    start = time.perf_counter()
+    try:
+        total, results = await search_index.search(
+            q,
+            document_ids=document_id,
+            document_type=document_type,
+            offset=offset,
+            limit=limit,
+        )
+    except Exception as e:
+        logger.error(f"Error searching documents: {e}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred")
+    return SearchResponse(
+        query=q,
+        total=total,
+        offset=offset,
+        limit=limit,
+        took_ms=round((time.perf_counter() - start) * 1000, 2),
+        results=results,
+    )
+
+
+@router.get("/{document_id}/content", response_model=DocumentContentResponse)
+async def get_document_content(
+    document_id: str,
+    request: Request,
+    content_type: Optional[str] = Query(
+        None, alias="type", pattern="^(pages|paragraphs|headers|tables)$"
+    ),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(
+        settings.CONTENT_PAGE_SIZE, ge=1, le=settings.CONTENT_MAX_PAGE_SIZE
+    ),
+):
+    """
+    Get a page of the extracted content of a processed document.
+
+    Returns up to `limit` items per content type starting at `offset`,
+    optionally restricted to one `type`. Only the chunks covering the
+    requested page are read. Responses carry an ETag; a matching
+    `If-None-Match` header returns `304 Not Modified`.
+    """
+    try:
+        etag = await document_reader.get_etag(document_id)
+        if etag is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match.strip() == "*" or etag in [
+            tag.strip() for tag in if_none_match.split(",")
+        ]:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        result = await document_reader.read(
+            document_id,
+            content_types=[content_type] if content_type else None,
+            offset=offset,
+            limit=limit,
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        page, etag = result
+        return FastJSONResponse(
+            page, headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reading content of document {document_id}: {e}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred")
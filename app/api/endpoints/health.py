@@ -1,7 +1,10 @@
 # app/api/endpoints/health.py
 from fastapi import APIRouter
+from app.core.admission import upload_admission
 from app.core.config import settings
 from app.schemas.document import HealthCheckResponse
+from app.services.jobs import job_queue
+from app.services.worker_pool import extraction_pool
 
 router = APIRouter()
 
@@ -10,10 +13,24 @@ router = APIRouter()
 async def health_check():
     """
     Health check endpoint to verify API is functioning properly.
-    Returns status information about the service.
+    Returns status information about the service, and the current load
+    of this server worker against its upload admission, extraction pool
+    and job queue limits.
     """
     return {
         "status": "healthy",
         "service": "document-processor",
         "version": settings.VERSION,
+        "load": {
+            "admission": upload_admission.stats(),
+            "extraction": {
+                "pending": extraction_pool.pending,
+                "capacity": extraction_pool.capacity,
+                "workers": extraction_pool.max_workers,
+            },
+            "jobs": {
+                "queued": job_queue.queued,
+                "max_queued": job_queue.max_queued,
+            },
+        },
     }
@@ -0,0 +1,16 @@
+# app/api/endpoints/metrics.py
+from fastapi import APIRouter, Response
+
+from app.core.metrics import CONTENT_TYPE, registry
+
+router = APIRouter()
+
+
+@router.get("", response_class=Response)
+async def get_metrics():
+    """
+    Prometheus metrics for this process: request and stage latencies,
+    Firestore latencies, document sizes, extraction counts and the number
+    of documents and jobs in flight.
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,209 @@
+# app/core/admission.py
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Tuple
+
+from app.core.config import settings
+from app.core.metrics import UPLOADS_REJECTED
+
+
+class AdmissionRejected(Exception):
+    """An upload was turned away; clients may retry after `retry_after` seconds"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class AdmissionController:
+    """
+    Admission control for uploads, applied before their body is read.
+
+    Each client gets a token bucket of `rate` uploads per second with
+    bursts of up to `burst`; a client out of tokens is rejected with 429.
+    At most `max_concurrent` admitted uploads are processed at a time, and
+    only while their declared sizes add up to no more than `memory_budget`
+    bytes (an upload larger than the budget runs alone). Other uploads
+    wait in arrival order, up to `max_waiting` of them for at most
+    `wait_timeout` seconds, and are rejected with 503 beyond that. Uploads
+    rejected with 503 give their token back. Batch uploads hold one slot
+    per document they process at a time and pay one token per document.
+
+    Limits are per process; all state lives on the event loop thread.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        memory_budget: int,
+        max_waiting: int,
+        wait_timeout: float,
+        rate: float,
+        burst: int,
+        retry_after: int,
+        max_clients: int = 10000,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.memory_budget = max(1, memory_budget)
+        self.max_waiting = max(0, max_waiting)
+        self.wait_timeout = wait_timeout
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.retry_after = retry_after
+        self.max_clients = max_clients
+        self._active = 0
+        self._memory = 0
+        self._waiters: Deque[Tuple[asyncio.Future, int, int]] = deque()
+        # Least recently seen clients first, so the oldest bucket is evicted
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def _check_rate(self, client: str):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        bucket = self._buckets.pop(client, None) or TokenBucket(self.burst, now)
+        bucket.tokens = min(
+            self.burst, bucket.tokens + (now - bucket.updated) * self.rate
+        )
+        bucket.updated = now
+        self._buckets[client] = bucket
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+        if bucket.tokens < 1:
+            UPLOADS_REJECTED.inc(reason="rate_limited")
+            raise AdmissionRejected(
+                429,
+                "Too many uploads, try again later",
+                max(1, math.ceil((1 - bucket.tokens) / self.rate)),
+            )
+        bucket.tokens -= 1
+
+    def charge(self, client: str, tokens: int):
+        """
+        Take `tokens` more from a client already admitted, such as the other
+        documents of a batch. The bucket may go into debt, delaying the
+        client's next uploads until it is refilled.
+        """
+        bucket = self._buckets.get(client)
+        if bucket is not None and self.rate > 0 and tokens > 0:
+            bucket.tokens -= tokens
+
+    def _refund(self, client: str):
+        """Give back the token of an upload that was not admitted"""
+        bucket = self._buckets.get(client)
+        if bucket is not None and self.rate > 0:
+            bucket.tokens = min(self.burst, bucket.tokens + 1)
+
+    def _fits(self, size: int, slots: int) -> bool:
+        return self._active == 0 or (
+            self._active + slots <= self.max_concurrent
+            and self._memory + size <= self.memory_budget
+        )
+
+    def _take(self, size: int, slots: int):
+        self._active += slots
+        self._memory += size
+
+    def _wake(self):
+        """Admit waiting uploads in arrival order while they fit"""
+        while self._waiters and self._fits(*self._waiters[0][1:]):
+            waiter, size, slots = self._waiters.popleft()
+            self._take(size, slots)
+            waiter.set_result(None)
+
+    def _saturated(self) -> AdmissionRejected:
+        UPLOADS_REJECTED.inc(reason="saturated")
+        return AdmissionRejected(
+            503, "Server is busy, try again later", self.retry_after
+        )
+
+    async def acquire(self, client: str, size: int, slots: int = 1) -> int:
+        """
+        Admit an upload of `size` declared bytes from `client`, waiting for
+        `slots` processing slots if needed.
+
+        Returns:
+            int: The reserved size, to pass to release()
+
+        Raises:
+            AdmissionRejected: If the client is over its rate limit (429) or
+                no slot became free in time (503)
+        """
+        size = min(size, self.memory_budget)
+        slots = min(max(1, slots), self.max_concurrent)
+        admit_now = not self._waiters and self._fits(size, slots)
+        # Check capacity first so a saturated server does not use up tokens
+        if not admit_now and len(self._waiters) >= self.max_waiting:
+            raise self._saturated()
+        self._check_rate(client)
+        if admit_now:
+            self._take(size, slots)
+            return size
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((waiter, size, slots))
+        try:
+            await asyncio.wait_for(waiter, self.wait_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as the wait ended
+                self.release(size, slots)
+            else:
+                self._waiters.remove((waiter, size, slots))
+                self._wake()
+                self._refund(client)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._saturated()
+            raise
+        return size
+
+    def release(self, size: int, slots: int = 1):
+        """Free the slots and memory reserved by acquire()"""
+        slots = min(max(1, slots), self.max_concurrent)
+        self._active -= slots
+        self._memory -= size
+        self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load and limits"""
+        return {
+            "processing": self._active,
+            "max_concurrent": self.max_concurrent,
+            "waiting": len(self._waiters),
+            "max_waiting": self.max_waiting,
+            "memory_in_flight": self._memory,
+            "memory_budget": self.memory_budget,
+            "rate_per_client": self.rate,
+            "burst_per_client": self.burst,
+            "clients": len(self._buckets),
+        }
+
+    def reset(self):
+        """Forget the rate limit state of all clients"""
+        self._buckets.clear()
+
+
+# Shared controller for single document uploads
+upload_admission = AdmissionController(
+    max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+    memory_budget=settings.ADMISSION_MEMORY_BUDGET,
+    max_waiting=settings.ADMISSION_MAX_WAITING,
+    wait_timeout=settings.ADMISSION_WAIT_TIMEOUT,
+    rate=settings.ADMISSION_RATE,
+    burst=settings.ADMISSION_BURST,
+    retry_after=settings.ADMISSION_RETRY_AFTER,
+    max_clients=settings.ADMISSION_MAX_CLIENTS,
+)
@@ -1,6 +1,6 @@
 # app/core/config.py
 import os
-from typing import List, Union
+from typing import List, Optional, Union
 from pydantic import AnyHttpUrl, validator
 from pydantic_settings import BaseSettings
 
@@ -31,13 +31,112 @@ class Settings(BaseSettings):
     )
 
     FIREBASE_COLLECTION_NAME: str = "processed_documents"
+    FIREBASE_PROJECT_ID: Optional[str] = None  # required with the emulator
+    FIRESTORE_EMULATOR_HOST: Optional[str] = None  # e.g. "localhost:8080"
+
+    # Storage backend settings
+    STORAGE_BACKEND: str = "firestore"  # "firestore", "sqlite" or "memory"
+    STORAGE_DB_PATH: str = "data/storage.sqlite3"
+
+    # PDF extraction settings
+    PDF_PARALLEL_MIN_PAGES: int = 64  # split extraction across workers above this
+    PDF_PAGES_PER_TASK: int = 32  # smallest page slice handed to one worker
+    PDF_TABLE_DETECTION: str = "layout"  # "layout" (word positions) or "text"
+
+    # Firestore bulk write settings
+    FIRESTORE_BATCH_SIZE: int = 500  # Firestore allows at most 500 writes per batch
+    FIRESTORE_MAX_CONCURRENT_COMMITS: int = 8
+    FIRESTORE_COMMIT_RETRIES: int = 3
+    FIRESTORE_RETRY_BACKOFF: float = 0.5  # seconds, doubled on each retry
+    CHUNK_TARGET_BYTES: int = 256 * 1024  # content per chunk document (max ~1MB)
+    CHUNK_COMPRESSION: str = "none"  # "zlib" or "zstd" (zstandard package)
+    CHUNK_COMPRESSED_TARGET_BYTES: int = 1008 * 1024  # before compression
+    FIRESTORE_CHANNEL_POOL_SIZE: int = 4  # shared AsyncClients, one channel each
+    FIRESTORE_TIMEOUT: float = 30.0  # deadline per Firestore RPC, seconds
+    FIRESTORE_WARMUP: bool = True  # connect all channels on startup
 
     # Document processing settings
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: List[str] = [".docx", ".pdf"]
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB read per chunk
+    UPLOAD_SPOOL_THRESHOLD: int = 2 * 1024 * 1024  # spool to disk above 2MB
+    UPLOAD_SPOOL_DIR: Optional[str] = None  # system temp directory if unset
+    UPLOAD_STREAM_BUFFER: int = 8  # streamed upload lines held for a slow client
+
+    # Upload admission control, per server worker
+    ADMISSION_MAX_CONCURRENT: int = 8  # uploads processed at once
+    ADMISSION_MEMORY_BUDGET: int = 256 * 1024 * 1024  # declared upload bytes in flight
+    ADMISSION_MAX_WAITING: int = 32  # uploads queued for a slot before 503s
+    ADMISSION_WAIT_TIMEOUT: float = 10.0  # seconds an upload may wait for a slot
+    ADMISSION_RATE: float = 2.0  # uploads per second per client; 0 disables
+    ADMISSION_BURST: int = 20  # uploads a client may send at once
+    ADMISSION_RETRY_AFTER: int = 5  # Retry-After seconds for 503 responses
+    ADMISSION_MAX_CLIENTS: int = 10000  # clients whose rate limit state is kept
+
+    # Batch upload settings
+    BATCH_MAX_FILES: int = 100  # documents per batch request, zip members included
+    BATCH_MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # whole request / zip archive
+    BATCH_MAX_PARALLEL: int = 4  # documents of one batch processed at a time
+    BATCH_WRITE_WINDOW: float = 0.05  # seconds to gather documents into shared writes
+
+    # Extraction worker pool settings
+    EXTRACTION_POOL_MODE: str = "process"  # "process" or "thread"
+    EXTRACTION_POOL_WORKERS: int = 0  # 0 means one worker per CPU
+    EXTRACTION_QUEUE_SIZE: int = 32  # jobs allowed to wait for a free worker
+    EXTRACTION_JOB_TIMEOUT: float = 120.0  # seconds
+    EXTRACTION_WORKER_MAX_JOBS: int = 50  # recycle a worker process after N jobs
+
+    # Content read settings
+    CONTENT_PAGE_SIZE: int = 100  # items per type returned by default
+    CONTENT_MAX_PAGE_SIZE: int = 1000
+    CONTENT_CACHE_SIZE: int = 256  # documents kept in the read cache
+    CONTENT_CACHE_TTL: int = 300  # seconds
+    CONTENT_FETCH_GROUP_BYTES: int = 2 * 1024 * 1024  # chunk bytes per parallel read
+
+    # Deduplication settings
+    DEDUP_ENABLED: bool = True
+    DEDUP_CACHE_SIZE: int = 1024  # entries kept in the local LRU
+    DEDUP_COLLECTION_NAME: str = "document_hashes"
+
+    # Full-text search settings
+    SEARCH_ENABLED: bool = True
+    SEARCH_DB_PATH: str = "data/search.sqlite3"  # local to each instance
+    SEARCH_MAX_RESULTS: int = 100  # largest page of search results
+    SEARCH_SNIPPET_CHARS: int = 200
+
+    # Background job settings
+    JOB_BACKEND: str = "memory"  # "memory" or "sqlite"
+    JOB_DB_PATH: str = "data/jobs.sqlite3"
+    JOB_WORKERS: int = 2
+    JOB_MAX_QUEUED: int = 100
+    JOB_HEARTBEAT_INTERVAL: float = 10.0  # seconds between owner heartbeats
+    JOB_STALE_AFTER: float = 60.0  # seconds without heartbeat before takeover
+    JOB_RETENTION: float = 24 * 3600.0  # keep finished jobs this long; 0 forever
+
+    # Production server settings (serve.py)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = int(os.getenv("PORT", "8000"))
+    SERVER_WORKERS: int = 0  # 0 means one worker per CPU
+    SERVER_MAX_REQUESTS: int = 1000  # recycle a worker after N requests; 0 never
+    SERVER_MAX_REQUESTS_JITTER: int = 100  # keeps workers from recycling together
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # seconds to drain requests on SIGTERM
+    SERVER_TIMEOUT: int = 120  # restart a worker silent for this many seconds
+    SERVER_KEEPALIVE: int = 5  # seconds
+    # Proxies trusted to set X-Forwarded-For, comma-separated ("*" for any)
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+
+    # Profiling settings
+    PROFILE_DIR: str = "profiles"
+    PROFILE_ADMIN_TOKEN: Optional[str] = None  # enables the X-Profile header if set
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of documents profiled at random
+    PROFILE_SAMPLE_MODE: str = "cpu"  # "cpu" (cProfile) or "memory" (tracemalloc)
+    PROFILE_SLOW_UPLOAD_SECONDS: float = 20.0  # report slower documents; 0 disables
+    PROFILE_KEEP_SLOW_DOCUMENTS: bool = False  # copy slow documents for replay
 
     # Logging settings
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    LOG_QUEUE_SIZE: int = 10000  # records buffered for the writer thread
 
     class Config:
         case_sensitive = True
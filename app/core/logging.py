@@ -1,16 +1,183 @@
 # app/core/logging.py
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    WatchedFileHandler,
+)
 from pathlib import Path
+from typing import List, Optional
+
 from app.core.config import settings
+from app.core.metrics import LOG_RECORDS_DROPPED
+
+# Correlation id of the request (or job) being handled, added to every record
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes of every LogRecord; anything else was passed in `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "request_id"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["BufferedQueueHandler"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_")
+        )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFormatter(logging.Formatter):
+    """Plain text format with the correlation id, when there is one"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        rid = getattr(record, "request_id", None)
+        return f"[{rid}] {message}" if rid else message
+
+
+class BufferedQueueHandler(QueueHandler):
+    """
+    Hand records to the background writer through a bounded queue.
+
+    The message is merged with its arguments on the calling thread, so the
+    record no longer references mutable arguments, but formatting and I/O
+    happen on the writer thread. When the queue is full, records are
+    dropped and counted rather than blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks keep frames alive; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+def _handlers(log_file: Path) -> List[logging.Handler]:
+    if settings.LOG_FORMAT == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = RequestIdFormatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+    handlers = [
+        # Console handler
+        logging.StreamHandler(sys.stdout),
+        # File handler with rotation
+        RotatingFileHandler(
+            log_file, maxBytes=10485760, backupCount=5, encoding="utf8"  # 10MB
+        ),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _start_listener(handlers: List[logging.Handler]):
+    global _listener
+    _listener = QueueListener(
+        _queue_handler.queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The writer thread does not survive fork (gunicorn preloads the app in
+    # the master); give the child its own queue and thread
+    if _listener is not None:
+        _queue_handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        _start_listener(list(_listener.handlers))
+
+
+def share_log_file():
+    """
+    Let several processes append to the log file.
+
+    A RotatingFileHandler in each process would rotate the shared file
+    under the others and lose records, so it is replaced by a
+    WatchedFileHandler, which reopens the file after external rotation
+    (e.g. logrotate). Call before forking workers.
+    """
+    if _listener is None:
+        return
+    handlers = []
+    for handler in _listener.handlers:
+        if isinstance(handler, RotatingFileHandler):
+            shared = WatchedFileHandler(handler.baseFilename, encoding="utf8")
+            shared.setFormatter(handler.formatter)
+            handler.close()
+            handler = shared
+        handlers.append(handler)
+    stop_logging()
+    _start_listener(handlers)
+
+
+def stop_logging():
+    """Write out buffered records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def setup_logging():
     """
     Set up logging configuration for the application.
     Returns a logger instance.
+
+    Records go through a bounded queue to a background thread that writes
+    them to stdout and the rotating log file, so logging never does I/O on
+    the event loop thread.
     """
+    global _queue_handler
+    logger = logging.getLogger("doc_processor")
+    if _queue_handler is not None:
+        return logger
+
     # Create logs directory if it doesn't exist
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
@@ -18,27 +185,14 @@ def setup_logging():
     # Set up log file path
     log_file = log_dir / "app.log"
 
-    # Configure log format
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    date_format = "%Y-%m-%d %H:%M:%S"
-
-    # Configure logging
-    logging.basicConfig(
-        level=getattr(logging, settings.LOG_LEVEL),
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            # Console handler
-            logging.StreamHandler(sys.stdout),
-            # File handler with rotation
-            RotatingFileHandler(
-                log_file, maxBytes=10485760, backupCount=5, encoding="utf8"  # 10MB
-            ),
-        ],
-    )
+    _queue_handler = BufferedQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    _start_listener(_handlers(log_file))
 
-    # Create and return logger
-    logger = logging.getLogger("doc_processor")
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, settings.LOG_LEVEL))
+    root.addHandler(_queue_handler)
+    atexit.register(stop_logging)
+    os.register_at_fork(after_in_child=_restart_after_fork)
 
     # Set third-party loggers to WARNING level
     for logger_name in ("uvicorn", "uvicorn.access", "fastapi"):
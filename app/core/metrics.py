@@ -0,0 +1,373 @@
+# app/core/metrics.py
+import bisect
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow parses
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+SIZE_BUCKETS = tuple(2**n * 1024 for n in range(0, 16, 2))  # 1KiB .. 16MiB
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Base class for metrics exported in the Prometheus text format.
+
+    Values are kept per combination of label values; updates are thread
+    safe so the metrics can be used from worker threads as well.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues, extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._labels(key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """
+    Value that goes up and down. A gauge without labels may instead read
+    its value from a callback each time the metrics are collected.
+    """
+
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def value(self, **labels: str) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        if self._function is not None:
+            yield f"{self.name} {_format_value(self._function())}"
+            return
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._labels(key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count per bucket (the last one is +Inf), and the sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted(
+                (key, list(counts), self._sums[key])
+                for key, counts in self._counts.items()
+            )
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = self._labels(key, {"le": _format_value(bound)})
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{self._labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{self._labels(key)} {cumulative}"
+
+
+class Registry:
+    """Set of metrics rendered together for a scrape"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# Prometheus text exposition format version served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.register(
+    Histogram(
+        "doc_processor_http_request_duration_seconds",
+        "Time to handle HTTP requests, until the response body is sent",
+        ["method", "route", "status"],
+    )
+)
+STAGE_SECONDS = registry.register(
+    Histogram(
+        "doc_processor_stage_duration_seconds",
+        "Time spent in each document processing stage",
+        ["stage"],
+    )
+)
+FIRESTORE_SECONDS = registry.register(
+    Histogram(
+        "doc_processor_firestore_duration_seconds",
+        "Latency of Firestore operations, including client-side retries",
+        ["operation"],
+    )
+)
+DOCUMENT_SIZE_BYTES = registry.register(
+    Histogram(
+        "doc_processor_document_size_bytes",
+        "Size of processed documents",
+        ["document_type"],
+        buckets=SIZE_BUCKETS,
+    )
+)
+DOCUMENTS_PROCESSED = registry.register(
+    Counter(
+        "doc_processor_documents_processed_total",
+        "Documents processed, by type and outcome",
+        ["document_type", "outcome"],
+    )
+)
+ITEMS_EXTRACTED = registry.register(
+    Counter(
+        "doc_processor_items_extracted_total",
+        "Pages, paragraphs, headers and tables extracted from documents",
+        ["kind"],
+    )
+)
+DOCUMENTS_IN_PROGRESS = registry.register(
+    Gauge(
+        "doc_processor_documents_in_progress",
+        "Documents currently being processed",
+    )
+)
+JOBS_QUEUED = registry.register(
+    Gauge("doc_processor_jobs_queued", "Background jobs waiting for a worker")
+)
+JOBS_RUNNING = registry.register(
+    Gauge("doc_processor_jobs_running", "Background jobs being processed")
+)
+EXTRACTION_PENDING = registry.register(
+    Gauge(
+        "doc_processor_extraction_pending",
+        "Extraction tasks submitted to the worker pool and not yet finished",
+    )
+)
+UPLOADS_REJECTED = registry.register(
+    Counter(
+        "doc_processor_uploads_rejected_total",
+        "Uploads turned away by admission control, by reason",
+        ["reason"],
+    )
+)
+LOG_RECORDS_DROPPED = registry.register(
+    Counter(
+        "doc_processor_log_records_dropped_total",
+        "Log records dropped because the log queue was full",
+    )
+)
+
+# Where stage durations are added up: the current request's Server-Timing
+# header and any enclosing record_stages() blocks
+_stage_timings: ContextVar[Tuple[Dict[str, float], ...]] = ContextVar(
+    "stage_timings", default=()
+)
+
+
+def start_server_timing() -> Dict[str, float]:
+    """Collect stage durations for the current request (and its tasks)"""
+    timings: Dict[str, float] = {}
+    _stage_timings.set((timings,))
+    return timings
+
+
+@contextmanager
+def record_stages() -> Iterator[Dict[str, float]]:
+    """Collect the durations of the stages run inside the block"""
+    timings: Dict[str, float] = {}
+    token = _stage_timings.set(_stage_timings.get() + (timings,))
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    """Server-Timing header value; durations are in milliseconds"""
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+    )
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a processing stage. The duration is recorded in the stage histogram
+    and, within a request, added to its Server-Timing header.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        for timings in _stage_timings.get():
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def timed_operation(histogram: Histogram, **labels: str):
+    """Decorator that times every call of an async function"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,215 @@
+# app/core/middleware.py
+import logging
+import re
+import time
+import uuid
+from typing import Iterable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.core.logging import request_id
+from app.core.metrics import (
+    HTTP_REQUEST_SECONDS,
+    format_server_timing,
+    start_server_timing,
+)
+from app.core.profiling import request_profile, requested_mode
+
+# Allowance for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+logger = logging.getLogger("doc_processor")
+
+# Client supplied correlation ids are kept only if they look like one
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject uploads whose declared Content-Length is already too large,
+    before any of the request body is read or parsed.
+    """
+
+    def __init__(self, app: ASGIApp, max_upload_size: int, paths: Iterable[str]):
+        self.app = app
+        self.max_upload_size = max_upload_size
+        self.max_body_size = max_upload_size + MULTIPART_OVERHEAD
+        self.paths = set(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"] in self.paths
+        ):
+            content_length = dict(scope["headers"]).get(b"content-length", b"")
+            if content_length.isdigit() and int(content_length) > self.max_body_size:
+                max_size_mb = self.max_upload_size / (1024 * 1024)
+                response = JSONResponse(
+                    status_code=413,
+                    content={
+                        "detail": f"File size exceeds maximum allowed size of {max_size_mb}MB"
+                    },
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+
+def client_key(scope: Scope) -> str:
+    """
+    Rate limit key of a request: its client IP. Behind a proxy the server
+    takes it from X-Forwarded-For (SERVER_FORWARDED_ALLOW_IPS); unvalidated
+    headers such as API keys are not used, as clients could vary them.
+    """
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class AdmissionMiddleware:
+    """
+    Admit uploads through an AdmissionController before their body is
+    read, answering `429` or `503` with a `Retry-After` header right away
+    when a client is over its rate limit or the server is saturated.
+
+    Uploads are sized by their Content-Length, or as `max_upload_size`
+    without one, and hold `slots` processing slots while they run.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        max_upload_size: int,
+        paths: Iterable[str],
+        slots: int = 1,
+    ):
+        self.app = app
+        self.controller = controller
+        self.max_upload_size = max_upload_size
+        self.paths = set(paths)
+        self.slots = slots
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"] in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        size = int(content_length) if content_length.isdigit() else None
+        client = client_key(scope)
+        try:
+            reserved = await self.controller.acquire(
+                client,
+                size if size is not None else self.max_upload_size,
+                self.slots,
+            )
+        except AdmissionRejected as e:
+            logger.warning(f"Rejected upload with {e.status_code}: {e.detail}")
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(reserved, self.slots)
+
+
+class MetricsMiddleware:
+    """
+    Record the duration of each HTTP request and report the time spent in
+    each processing stage in a Server-Timing response header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = start_server_timing()
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timings["total"] = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", format_server_timing(timings))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # Label by route template rather than path to bound the series
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            )
+
+
+class ProfilingMiddleware:
+    """
+    Profile the documents processed by a request when an admin asks for it
+    with the `X-Profile` header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            mode = requested_mode(Headers(scope=scope))
+            if mode:
+                request_profile(mode)
+        await self.app(scope, receive, send)
+
+
+class RequestIdMiddleware:
+    """
+    Give each request a correlation id, taken from its `X-Request-ID` header
+    or generated, that is added to its log records and echoed in the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = Headers(scope=scope).get("x-request-id", "")
+        if not REQUEST_ID_PATTERN.match(rid):
+            rid = uuid.uuid4().hex
+        token = request_id.set(rid)
+
+        async def send_with_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", rid)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,305 @@
+# app/core/profiling.py
+import asyncio
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import shutil
+import time
+import tracemalloc
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import record_stages
+
+logger = logging.getLogger("doc_processor")
+
+PROFILE_MODES = ("cpu", "memory")
+
+# Rows of the cProfile and tracemalloc reports
+TOP_ENTRIES = 40
+TRACEMALLOC_FRAMES = 10
+
+# Profile mode asked for by the current request (see requested_mode)
+_requested: ContextVar[Optional[str]] = ContextVar("requested_profile", default=None)
+_session: ContextVar[Optional["ProfileSession"]] = ContextVar(
+    "profile_session", default=None
+)
+# cProfile hooks the whole event loop thread and tracemalloc the whole
+# process, so only one document is profiled at a time
+_active = False
+
+
+def requested_mode(headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Profile mode from the `X-Profile: cpu|memory` header, honoured only with
+    an `X-Admin-Token` header matching PROFILE_ADMIN_TOKEN.
+    """
+    mode = headers.get("x-profile", "").lower()
+    token = settings.PROFILE_ADMIN_TOKEN
+    if mode not in PROFILE_MODES or not token:
+        return None
+    if not hmac.compare_digest(
+        headers.get("x-admin-token", "").encode(), token.encode()
+    ):
+        logger.warning("Ignoring X-Profile header with an invalid admin token")
+        return None
+    return mode
+
+
+def request_profile(mode: Optional[str]):
+    """Profile the documents processed by the current request (and its tasks)"""
+    _requested.set(mode)
+
+
+def _report_base(filename: str) -> str:
+    """Path prefix, without extension, for the files of one report"""
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.splitext(filename)[0])[:40]
+    name = f"{datetime.now():%Y%m%d-%H%M%S}-{stem}-{uuid.uuid4().hex[:6]}"
+    return os.path.join(settings.PROFILE_DIR, name)
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot) -> List[str]:
+    stats = snapshot.filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    ).statistics("traceback")
+    lines = []
+    for stat in stats[:TOP_ENTRIES]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{stat.size / 1024:10.1f} KiB {stat.count:8} blocks  "
+            f"{frame.filename}:{frame.lineno}"
+        )
+    return lines
+
+
+def run_profiled(
+    mode: str, directory: str, fn: Callable[..., Any], *args: Any
+) -> Tuple[Any, Any]:
+    """
+    Run fn(*args) on an extraction worker under the profiler.
+
+    Returns:
+        Tuple[Any, Any]: The result and the worker's report: the path of its
+        cProfile dump, or its peak and top allocations
+    """
+    if mode == "cpu":
+        profiler = cProfile.Profile()
+        result = profiler.runcall(fn, *args)
+        path = os.path.join(directory, f"worker-{uuid.uuid4().hex}.prof")
+        profiler.dump_stats(path)
+        return result, path
+
+    if tracemalloc.is_tracing():
+        # Thread pool worker: the session already traces this process
+        return fn(*args), None
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    try:
+        result = fn(*args)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {
+        "pid": os.getpid(),
+        "peak": peak,
+        "top": _top_allocations(snapshot),
+    }
+
+
+class ProfileSession:
+    """
+    Profile of one document: the event loop side (chunking, writes) runs
+    under cProfile or tracemalloc in this process, and every extraction
+    task is profiled on its worker with run_profiled.
+    """
+
+    def __init__(self, mode: str, reason: str, filename: str):
+        self.mode = mode
+        self.reason = reason
+        self.filename = filename
+        self.directory = settings.PROFILE_DIR
+        self.base = _report_base(filename)
+        self.worker_reports: List[Any] = []
+        self._profiler: Optional[cProfile.Profile] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.mode == "cpu":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def stop(self):
+        if self.mode == "cpu":
+            self._profiler.disable()
+        else:
+            self._snapshot = tracemalloc.take_snapshot()
+            _, self._peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    def collect(self, value: Tuple[Any, Any]) -> Any:
+        """Keep the report of a run_profiled call and return its result"""
+        result, report = value
+        if report is not None:
+            self.worker_reports.append(report)
+        return result
+
+    def _write_cpu(self, base: str) -> List[str]:
+        out = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=out)
+        for path in self.worker_reports:
+            stats.add(path)
+        stats.dump_stats(f"{base}.prof")
+        for path in self.worker_reports:
+            os.unlink(path)
+        out.write(
+            f"{self.filename}: event loop and {len(self.worker_reports)} "
+            "extraction tasks\n"
+        )
+        stats.sort_stats("cumulative").print_stats(TOP_ENTRIES)
+        with open(f"{base}.txt", "w") as f:
+            f.write(out.getvalue())
+        return [f"{base}.prof", f"{base}.txt"]
+
+    def _write_memory(self, base: str) -> List[str]:
+        lines = [
+            f"{self.filename}: event loop process, peak "
+            f"{self._peak / 1024 / 1024:.1f} MiB",
+            *_top_allocations(self._snapshot),
+        ]
+        for report in self.worker_reports:
+            lines += [
+                "",
+                f"extraction worker {report['pid']}, peak "
+                f"{report['peak'] / 1024 / 1024:.1f} MiB",
+                *report["top"],
+            ]
+        with open(f"{base}.txt", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return [f"{base}.txt"]
+
+    def write(self, report: Dict[str, Any]) -> List[str]:
+        """Write the profile and a JSON summary; returns the written paths"""
+        if self.mode == "cpu":
+            paths = self._write_cpu(self.base)
+        else:
+            paths = self._write_memory(self.base)
+        return paths + _write_report(self.base, {**report, "files": paths})
+
+
+def _write_report(base: str, report: Dict[str, Any]) -> List[str]:
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    with open(f"{base}.json", "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    return [f"{base}.json"]
+
+
+def current_session() -> Optional[ProfileSession]:
+    """Profile session of the document being processed, if any"""
+    return _session.get()
+
+
+def _choose_mode() -> Tuple[Optional[str], str]:
+    mode = _requested.get()
+    if mode:
+        return mode, "requested"
+    if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return settings.PROFILE_SAMPLE_MODE, "sampled"
+    return None, ""
+
+
+@asynccontextmanager
+async def profile_document(
+    filename: str, source: Any = None
+) -> AsyncIterator[Optional[ProfileSession]]:
+    """
+    Profile processing of one document when the request asked for it or it
+    was sampled, and write a report for documents slower than
+    PROFILE_SLOW_UPLOAD_SECONDS.
+
+    Reports for slow documents hold the stage timings; the document itself is
+    copied next to them when PROFILE_KEEP_SLOW_DOCUMENTS is set, so it can be
+    uploaded again with `X-Profile`.
+    """
+    global _active
+    mode, reason = _choose_mode()
+    session = None
+    if mode and _active:
+        logger.warning(f"Not profiling {filename}: another profile is running")
+    elif mode:
+        session = ProfileSession(mode, reason, filename)
+        session.start()
+        _active = True
+
+    token = _session.set(session)
+    start = time.perf_counter()
+    error = None
+    try:
+        with record_stages() as stages:
+            yield session
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        _session.reset(token)
+        elapsed = time.perf_counter() - start
+        report = {
+            "filename": filename,
+            "mode": mode,
+            "reason": reason,
+            "elapsed_seconds": round(elapsed, 3),
+            "stages": {name: round(seconds, 3) for name, seconds in stages.items()},
+            "error": error,
+        }
+        if session is not None:
+            session.stop()
+            _active = False
+            try:
+                paths = await asyncio.to_thread(session.write, report)
+                logger.info(f"Profile of {filename} written to {paths[0]}")
+            except Exception as e:
+                logger.error(f"Error writing profile of {filename}: {e}")
+        elif (
+            settings.PROFILE_SLOW_UPLOAD_SECONDS
+            and elapsed >= settings.PROFILE_SLOW_UPLOAD_SECONDS
+        ):
+            try:
+                paths = await asyncio.to_thread(
+                    _capture_slow_document, filename, source, report
+                )
+                logger.warning(
+                    f"Slow document {filename} took {elapsed:.1f}s; "
+                    f"report written to {paths[-1]}"
+                )
+            except Exception as e:
+                logger.error(f"Error writing slow document report: {e}")
+
+
+def _capture_slow_document(
+    filename: str, source: Any, report: Dict[str, Any]
+) -> List[str]:
+    base = _report_base(filename)
+    paths = []
+    if settings.PROFILE_KEEP_SLOW_DOCUMENTS and source is not None:
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        path = base + os.path.splitext(filename)[1]
+        if isinstance(source, str):
+            shutil.copyfile(source, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(source)
+        paths.append(path)
+    return paths + _write_report(base, {**report, "reason": "slow", "files": paths})
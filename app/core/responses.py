@@ -0,0 +1,48 @@
+# app/core/responses.py
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Encode what the JSON encoders do not handle natively"""
+    if isinstance(obj, BaseModel):
+        # Shallow: nested values are encoded as they are, without the copy
+        # and validation model_dump() would make of them
+        return dict(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode trusted data as compact UTF-8 JSON, with orjson when installed.
+    Pydantic models are encoded from their field values as they are.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for content built by the service itself.
+
+    Endpoints return it instead of their response model so FastAPI does not
+    validate and re-encode every extracted item again; the response model
+    still documents the endpoint.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
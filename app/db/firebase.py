@@ -1,24 +1,92 @@
 # app/db/firebase.py
+import asyncio
+import itertools
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.api_core import exceptions as google_exceptions
+from google.api_core.retry import AsyncRetry, if_transient_error
+from google.cloud.firestore import AsyncClient
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.auth.credentials import AnonymousCredentials
 import logging
+import os
+import time
 from app.core.config import settings
-from typing import Dict, Any
+from app.core.metrics import FIRESTORE_SECONDS, timed_operation
+from app.utils.chunking import estimate_size
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger("doc_processor")
 
+CHUNKS_COLLECTION = "document_chunks"
+
+# Errors worth retrying a batch commit for; anything else fails immediately
+RETRYABLE_ERRORS = (
+    google_exceptions.Aborted,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    ConnectionError,
+    TimeoutError,
+)
+
+# (collection name, document id, document data)
+Write = Tuple[str, str, Dict[str, Any]]
+
+# Firestore rejects commits larger than 10 MiB; close a batch well before it
+MAX_BATCH_BYTES = 9 * 1024 * 1024
+# Allowance per write for document names, field names and small fields
+WRITE_OVERHEAD_BYTES = 1024
+
+
+def _deadline() -> Dict[str, Any]:
+    """
+    RPC options bounding a call by FIRESTORE_TIMEOUT. `timeout` alone only
+    bounds each attempt; the retry deadline bounds the call with its retries.
+    """
+    return {
+        "retry": AsyncRetry(
+            predicate=if_transient_error, timeout=settings.FIRESTORE_TIMEOUT
+        ),
+        "timeout": settings.FIRESTORE_TIMEOUT,
+    }
+
+
+class _EmulatorCredential(credentials.Base):
+    """Anonymous credential for the Firestore emulator, which skips auth"""
+
+    def get_credential(self):
+        return AnonymousCredentials()
+
 
 def initialize_firebase():
     """
     Initialize Firebase app with the provided credentials.
     This should be called only once during application startup.
+
+    When FIRESTORE_EMULATOR_HOST is set the app connects to the local
+    Firestore emulator instead and no credentials file is needed.
     """
     try:
         if not firebase_admin._apps:
-            cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
-            firebase_admin.initialize_app(cred)
-            logger.info("Firebase initialized successfully")
+            if settings.FIRESTORE_EMULATOR_HOST:
+                # The Firestore client library reads the emulator address
+                # from the environment
+                os.environ["FIRESTORE_EMULATOR_HOST"] = settings.FIRESTORE_EMULATOR_HOST
+                firebase_admin.initialize_app(
+                    _EmulatorCredential(),
+                    {"projectId": settings.FIREBASE_PROJECT_ID},
+                )
+                logger.info(
+                    f"Firebase initialized against the Firestore emulator at "
+                    f"{settings.FIRESTORE_EMULATOR_HOST}"
+                )
+            else:
+                cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
+                firebase_admin.initialize_app(cred)
+                logger.info("Firebase initialized successfully")
         else:
             logger.info("Firebase already initialized")
     except Exception as e:
@@ -26,16 +94,87 @@ def initialize_firebase():
         raise
 
 
-def get_firestore_client():
-    """Get Firestore client instance"""
+# Shared async clients, one gRPC channel each, handed out round-robin
+_clients: List[AsyncClient] = []
+_next_client = itertools.count()
+
+
+def open_firestore_clients() -> List[AsyncClient]:
+    """
+    Create the shared AsyncClient pool if it does not exist yet.
+
+    Each client owns one gRPC channel. A single HTTP/2 connection caps the
+    number of concurrent streams, so spreading RPCs over a few channels
+    keeps concurrent batch commits and reads from queuing on one connection.
+    """
+    if _clients:
+        return _clients
     try:
-        return firestore.client()
+        app = firebase_admin.get_app()
+        credential = app.credential.get_credential()
+        for _ in range(max(1, settings.FIRESTORE_CHANNEL_POOL_SIZE)):
+            _clients.append(AsyncClient(project=app.project_id, credentials=credential))
+        logger.info(f"Opened {len(_clients)} Firestore client channels")
+        return _clients
     except Exception as e:
-        logger.error(f"Error getting Firestore client: {e}")
+        logger.error(f"Error creating Firestore clients: {e}")
         raise
 
 
-def save_document(document_id: str, data: Dict[str, Any]):
+def get_firestore_client() -> AsyncClient:
+    """Get a shared Firestore AsyncClient, opening the pool on first use"""
+    clients = _clients or open_firestore_clients()
+    return clients[next(_next_client) % len(clients)]
+
+
+async def warm_up_firestore():
+    """
+    Make one cheap read on every channel so that connection setup, TLS and
+    token fetches happen at startup rather than on the first user request.
+    Failures are logged; the channels connect again on first use.
+    """
+    start = time.perf_counter()
+    try:
+        # Round-robin hands out every pooled client once
+        clients = [
+            get_firestore_client()
+            for _ in range(max(1, settings.FIRESTORE_CHANNEL_POOL_SIZE))
+        ]
+        await asyncio.gather(
+            *(
+                client.collection(settings.FIREBASE_COLLECTION_NAME)
+                .document("_warmup")
+                .get(**_deadline())
+                for client in clients
+            )
+        )
+        logger.info(
+            f"Firestore warm-up finished in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+    except Exception as e:
+        logger.warning(f"Firestore warm-up failed: {e}")
+
+
+async def close_firestore_clients():
+    """Close the shared clients and their gRPC channels"""
+    clients = list(_clients)
+    _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+            # AsyncClient.close() leaves the gRPC channel open
+            api = client._firestore_api_internal
+            if api is not None:
+                await api.transport.close()
+        except Exception as e:
+            logger.warning(f"Error closing Firestore client: {e}")
+    if clients:
+        logger.info(f"Closed {len(clients)} Firestore client channels")
+
+
+@timed_operation(FIRESTORE_SECONDS, operation="save_document")
+async def save_document(document_id: str, data: Dict[str, Any]):
     """Save document metadata to Firestore"""
     try:
         db = get_firestore_client()
@@ -44,14 +183,15 @@ def save_document(document_id: str, data: Dict[str, Any]):
         # Add timestamp
         data["created_at"] = firestore.SERVER_TIMESTAMP
 
-        doc_ref.set(data)
+        await doc_ref.set(data, **_deadline())
         logger.info(f"Document metadata saved to Firestore with ID: {document_id}")
     except Exception as e:
         logger.error(f"Error saving to Firestore: {e}")
         raise
 
 
-def save_document_chunk(chunk_id: str, data: Dict[str, Any]):
+@timed_operation(FIRESTORE_SECONDS, operation="save_document_chunk")
+async def save_document_chunk(chunk_id: str, data: Dict[str, Any]):
     """Save document chunk to Firestore"""
     try:
         db = get_firestore_client()
@@ -59,9 +199,351 @@ def save_document_chunk(chunk_id: str, data: Dict[str, Any]):
         # Add timestamp
         data["created_at"] = firestore.SERVER_TIMESTAMP
 
-        chunk_ref = db.collection("document_chunks").document(chunk_id)
-        chunk_ref.set(data)
-        logger.info(f"Document chunk saved with ID: {chunk_id}")
+        chunk_ref = db.collection(CHUNKS_COLLECTION).document(chunk_id)
+        await chunk_ref.set(data, **_deadline())
+        # One line per chunk is too much at ingestion volume; bulk saves log
+        # a summary per write group instead
+        logger.debug(f"Document chunk saved with ID: {chunk_id}")
     except Exception as e:
         logger.error(f"Error saving chunk to Firestore: {e}")
         raise
+
+
+@timed_operation(FIRESTORE_SECONDS, operation="get_document_metadata")
+async def get_document_metadata(document_id: str) -> Optional[Dict[str, Any]]:
+    """Get a document's metadata from Firestore, or None if it does not exist"""
+    try:
+        db = get_firestore_client()
+        snapshot = (
+            await db.collection(settings.FIREBASE_COLLECTION_NAME)
+            .document(document_id)
+            .get(**_deadline())
+        )
+        return snapshot.to_dict() if snapshot.exists else None
+    except Exception as e:
+        logger.error(f"Error reading document {document_id} from Firestore: {e}")
+        raise
+
+
+@timed_operation(FIRESTORE_SECONDS, operation="get_document_chunks")
+async def get_document_chunks(chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch chunk documents by ID in a single batched read"""
+    try:
+        db = get_firestore_client()
+        refs = [db.collection(CHUNKS_COLLECTION).document(c) for c in chunk_ids]
+        return {
+            snapshot.id: snapshot.to_dict()
+            async for snapshot in db.get_all(refs, **_deadline())
+            if snapshot.exists
+        }
+    except Exception as e:
+        logger.error(f"Error reading chunks from Firestore: {e}")
+        raise
+
+
+@timed_operation(FIRESTORE_SECONDS, operation="query_document_chunks")
+async def query_document_chunks(
+    document_id: str, content_type: str
+) -> List[Dict[str, Any]]:
+    """Fetch all chunks of one type for a document, ordered by chunk index"""
+    try:
+        db = get_firestore_client()
+        query = (
+            db.collection(CHUNKS_COLLECTION)
+            .where(filter=FieldFilter("document_id", "==", document_id))
+            .where(filter=FieldFilter("type", "==", content_type))
+        )
+        chunks = [snapshot.to_dict() async for snapshot in query.stream(**_deadline())]
+        return sorted(chunks, key=lambda chunk: int(chunk["chunk_index"]))
+    except Exception as e:
+        logger.error(f"Error querying chunks from Firestore: {e}")
+        raise
+
+
+@timed_operation(FIRESTORE_SECONDS, operation="get_document_hash")
+async def get_document_hash(content_hash: str) -> Optional[Dict[str, Any]]:
+    """Look up the document previously processed for a content hash"""
+    try:
+        db = get_firestore_client()
+        snapshot = (
+            await db.collection(settings.DEDUP_COLLECTION_NAME)
+            .document(content_hash)
+            .get(**_deadline())
+        )
+        return snapshot.to_dict() if snapshot.exists else None
+    except Exception as e:
+        logger.error(f"Error reading content hash from Firestore: {e}")
+        raise
+
+
+@timed_operation(FIRESTORE_SECONDS, operation="save_document_hash")
+async def save_document_hash(content_hash: str, data: Dict[str, Any]):
+    """Record the document produced for a content hash"""
+    try:
+        db = get_firestore_client()
+        data["created_at"] = firestore.SERVER_TIMESTAMP
+        await db.collection(settings.DEDUP_COLLECTION_NAME).document(content_hash).set(
+            data, **_deadline()
+        )
+        logger.info(f"Content hash recorded for document {data.get('document_id')}")
+    except Exception as e:
+        logger.error(f"Error saving content hash to Firestore: {e}")
+        raise
+
+
+@timed_operation(FIRESTORE_SECONDS, operation="delete_document")
+async def delete_document(document_id: str) -> bool:
+    """
+    Delete a document's metadata and all of its chunks.
+
+    The metadata document is deleted first, so a partially deleted document
+    is never visible to readers.
+
+    Returns:
+        bool: False if the document did not exist
+    """
+    try:
+        db = get_firestore_client()
+        doc_ref = db.collection(settings.FIREBASE_COLLECTION_NAME).document(document_id)
+        if not (await doc_ref.get(**_deadline())).exists:
+            return False
+
+        query = db.collection(CHUNKS_COLLECTION).where(
+            filter=FieldFilter("document_id", "==", document_id)
+        )
+        refs = [doc_ref] + [
+            snapshot.reference async for snapshot in query.stream(**_deadline())
+        ]
+        for start in range(0, len(refs), 500):
+            batch = db.batch()
+            for ref in refs[start : start + 500]:
+                batch.delete(ref)
+            await batch.commit(**_deadline())
+        logger.info(f"Deleted document {document_id} and {len(refs) - 1} chunks")
+        return True
+    except Exception as e:
+        logger.error(f"Error deleting document {document_id} from Firestore: {e}")
+        raise
+
+
+@timed_operation(FIRESTORE_SECONDS, operation="delete_chunks")
+async def delete_document_chunks(chunk_ids: List[str]):
+    """Delete chunk documents by ID, in batches"""
+    try:
+        db = get_firestore_client()
+        for start in range(0, len(chunk_ids), 500):
+            batch = db.batch()
+            for chunk_id in chunk_ids[start : start + 500]:
+                batch.delete(db.collection(CHUNKS_COLLECTION).document(chunk_id))
+            await batch.commit(**_deadline())
+        logger.info(f"Deleted {len(chunk_ids)} chunks")
+    except Exception as e:
+        logger.error(f"Error deleting chunks from Firestore: {e}")
+        raise
+
+
+def _write_size(write: Write) -> int:
+    """
+    Estimated size of a write in a commit. Chunks use the stored size
+    recorded in their `byte_size`; other documents are estimated in full.
+    """
+    _, _, data = write
+    if data.get("byte_size") is not None:
+        return int(data["byte_size"]) + WRITE_OVERHEAD_BYTES
+    return estimate_size(data) + WRITE_OVERHEAD_BYTES
+
+
+def _split_into_batches(writes: List[Write], batch_size: int) -> List[List[Write]]:
+    """
+    Group writes into batches that respect the Firestore per-batch limits:
+    at most `batch_size` (500) writes and MAX_BATCH_BYTES of data
+    """
+    batch_size = max(1, min(batch_size, 500))
+    batches: List[List[Write]] = []
+    current: List[Write] = []
+    current_bytes = 0
+    for write in writes:
+        size = _write_size(write)
+        if current and (
+            len(current) >= batch_size or current_bytes + size > MAX_BATCH_BYTES
+        ):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(write)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+@timed_operation(FIRESTORE_SECONDS, operation="commit")
+async def _commit_writes(writes: List[Write]):
+    """Commit a group of writes atomically as a single WriteBatch"""
+    db = get_firestore_client()
+    batch = db.batch()
+    for collection, doc_id, data in writes:
+        batch.set(db.collection(collection).document(doc_id), data)
+    # Failed batches are retried by _commit_batches, not by the client
+    await batch.commit(retry=None, timeout=settings.FIRESTORE_TIMEOUT)
+
+
+async def _commit_batches(batches: List[List[Write]]) -> int:
+    """
+    Commit batches concurrently, retrying only the batches that failed.
+
+    Returns:
+        int: Number of batch retries that were needed
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.FIRESTORE_MAX_CONCURRENT_COMMITS))
+
+    async def commit(writes: List[Write]):
+        async with semaphore:
+            await _commit_writes(writes)
+
+    pending = batches
+    retries = 0
+    attempt = 0
+    while pending:
+        results = await asyncio.gather(
+            *(commit(writes) for writes in pending), return_exceptions=True
+        )
+        failed = [
+            (writes, result)
+            for writes, result in zip(pending, results)
+            if isinstance(result, Exception)
+        ]
+        if not failed:
+            break
+
+        errors = [error for _, error in failed]
+        fatal = [e for e in errors if not isinstance(e, RETRYABLE_ERRORS)]
+        if fatal or attempt >= settings.FIRESTORE_COMMIT_RETRIES:
+            raise (fatal or errors)[0]
+
+        attempt += 1
+        retries += len(failed)
+        logger.warning(
+            f"{len(failed)} of {len(pending)} Firestore batches failed "
+            f"({errors[0]}), retry {attempt}/{settings.FIRESTORE_COMMIT_RETRIES}"
+        )
+        await asyncio.sleep(settings.FIRESTORE_RETRY_BACKOFF * 2 ** (attempt - 1))
+        pending = [writes for writes, _ in failed]
+
+    return retries
+
+
+def _plan_batches(
+    documents: List[Tuple[str, Dict[str, Any], Dict[str, Dict[str, Any]]]],
+    batch_size: int,
+) -> Tuple[List[List[Write]], List[Write]]:
+    """
+    Pack the writes of several documents into shared batches.
+
+    A document whose chunks and metadata fit in one batch (by write count
+    and size) is kept whole in a single batch, so it is stored atomically.
+    Larger documents get chunk batches of their own, and their metadata
+    writes are returned separately to be committed after every chunk batch.
+
+    Returns:
+        Tuple[List[List[Write]], List[Write]]: Batches and deferred metadata writes
+    """
+    batches: List[List[Write]] = []
+    deferred: List[Write] = []
+    current: List[Write] = []
+    current_bytes = 0
+    for document_id, data, chunks in documents:
+        chunk_writes = [
+            (CHUNKS_COLLECTION, chunk_id, chunk_data)
+            for chunk_id, chunk_data in chunks.items()
+        ]
+        document_write = (settings.FIREBASE_COLLECTION_NAME, document_id, data)
+        document_bytes = sum(map(_write_size, chunk_writes)) + _write_size(
+            document_write
+        )
+
+        if len(chunk_writes) + 1 > batch_size or document_bytes > MAX_BATCH_BYTES:
+            batches.extend(_split_into_batches(chunk_writes, batch_size))
+            deferred.append(document_write)
+            continue
+        if current and (
+            len(current) + len(chunk_writes) + 1 > batch_size
+            or current_bytes + document_bytes > MAX_BATCH_BYTES
+        ):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.extend(chunk_writes)
+        current.append(document_write)
+        current_bytes += document_bytes
+    if current:
+        batches.append(current)
+    return batches, deferred
+
+
+async def save_documents_bulk(
+    documents: List[Tuple[str, Dict[str, Any], Dict[str, Dict[str, Any]]]],
+) -> Dict[str, Any]:
+    """
+    Save several documents with their chunks, sharing write batches.
+
+    Documents are packed into as few batches as possible and the batches are
+    committed concurrently. Metadata that did not fit in the batch of its
+    chunks is written after all chunk batches, so the presence of a metadata
+    document always implies that its chunks are stored.
+
+    Args:
+        documents: (document ID, metadata, chunks keyed by chunk ID) tuples
+
+    Returns:
+        Dict[str, Any]: Write statistics (batches, writes, retries, latency_ms)
+    """
+    start = time.perf_counter()
+    try:
+        for _, data, chunks in documents:
+            data["created_at"] = firestore.SERVER_TIMESTAMP
+            for chunk_data in chunks.values():
+                chunk_data["created_at"] = firestore.SERVER_TIMESTAMP
+
+        batch_size = max(1, min(settings.FIRESTORE_BATCH_SIZE, 500))
+        batches, deferred = _plan_batches(documents, batch_size)
+        retries = await _commit_batches(batches)
+        if deferred:
+            deferred_batches = _split_into_batches(deferred, batch_size)
+            retries += await _commit_batches(deferred_batches)
+            batches.extend(deferred_batches)
+
+        stats = {
+            "batches": len(batches),
+            "writes": sum(len(chunks) + 1 for _, _, chunks in documents),
+            "retries": retries,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        logger.info(
+            f"{len(documents)} documents saved to Firestore: {stats['writes']} "
+            f"writes in {stats['batches']} batches, {stats['retries']} retries, "
+            f"{stats['latency_ms']} ms"
+        )
+        return stats
+    except Exception as e:
+        logger.error(f"Error bulk saving {len(documents)} documents to Firestore: {e}")
+        raise
+
+
+async def save_document_bulk(
+    document_id: str, data: Dict[str, Any], chunks: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Save document metadata and all of its chunks using batched writes.
+
+    If everything fits in one batch it is committed atomically. Otherwise the
+    chunk batches are committed concurrently and the metadata document is
+    written last, so its presence implies that all chunks are stored.
+
+    Args:
+        document_id (str): ID of the metadata document
+        data (Dict[str, Any]): Document metadata
+        chunks (Dict[str, Dict[str, Any]]): Chunk documents keyed by chunk ID
+
+    Returns:
+        Dict[str, Any]: Write statistics (batches, writes, retries, latency_ms)
+    """
+    return await save_documents_bulk([(document_id, data, chunks)])
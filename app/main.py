@@ -5,9 +5,20 @@ import firebase_admin
 import logging
 
 from app.api.router import api_router
+from app.core.admission import upload_admission
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.db.firebase import initialize_firebase
+from app.core.middleware import (
+    AdmissionMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RequestIdMiddleware,
+    UploadSizeLimitMiddleware,
+)
+from app.services.jobs import job_queue
+from app.services.search import search_index
+from app.services.storage import storage
+from app.services.worker_pool import extraction_pool
 
 # Setup logging
 logger = setup_logging()
@@ -22,31 +33,74 @@ app = FastAPI(
     redoc_url=f"{settings.API_PREFIX}/redoc",
 )
 
-# Add CORS middleware
+# Limit upload concurrency, memory and rate per client; inside the size
+# limits, so oversized uploads do not take a slot or a token
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=upload_admission,
+    max_upload_size=settings.MAX_UPLOAD_SIZE,
+    paths=[f"{settings.API_PREFIX}/documents/upload"],
+)
+# Batches hold a slot per document they process at a time
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=upload_admission,
+    max_upload_size=settings.BATCH_MAX_UPLOAD_SIZE,
+    paths=[f"{settings.API_PREFIX}/documents/upload-batch"],
+    slots=settings.BATCH_MAX_PARALLEL,
+)
+
+# Reject oversized uploads before their body is read
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_upload_size=settings.MAX_UPLOAD_SIZE,
+    paths=[f"{settings.API_PREFIX}/documents/upload"],
+)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_upload_size=settings.BATCH_MAX_UPLOAD_SIZE,
+    paths=[f"{settings.API_PREFIX}/documents/upload-batch"],
+)
+
+app.add_middleware(ProfilingMiddleware)
+
+# Add CORS middleware around the admission and size limits, so browsers
+# can read their 413, 429 and 503 responses and Retry-After
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# Outermost, so rejected requests are measured and logged with an id too
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
 
-# Initialize Firebase on startup
+# Initialize storage (Firebase by default) on startup
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting application...")
-    initialize_firebase()
+    await storage.initialize()
+    extraction_pool.start()
+    await job_queue.start()
     logger.info("Application started successfully")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down application...")
-    # Additional cleanup if needed
+    await job_queue.stop()
+    extraction_pool.shutdown()
+    await storage.close()
+    if search_index is not None:
+        search_index.close()
     logger.info("Application shutdown completed")
 
 
@@ -0,0 +1,117 @@
+# app/models/document.py
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+
+@dataclass(slots=True)
+class ParagraphRecord:
+    text: str
+    index: int
+    is_heading: bool = False
+
+    def to_wire(self) -> Dict[str, str]:
+        return {
+            "text": self.text,
+            "index": str(self.index),
+            "is_heading": "true" if self.is_heading else "false",
+        }
+
+
+@dataclass(slots=True)
+class HeaderRecord:
+    text: str
+    level: int
+    index: int
+
+    def to_wire(self) -> Dict[str, str]:
+        return {"text": self.text, "level": str(self.level), "index": str(self.index)}
+
+
+@dataclass(slots=True)
+class PageRecord:
+    page_number: int
+    content: str
+
+    def to_wire(self) -> Dict[str, str]:
+        return {"page_number": str(self.page_number), "content": self.content}
+
+
+@dataclass(slots=True)
+class TableGrid:
+    """
+    Table cells stored row-major in one flat list.
+
+    `row_offsets` holds the position of each row's first cell, so a table
+    costs one list and one machine-word array instead of a list per row.
+    Rows may have different lengths.
+    """
+
+    index: int
+    cells: List[str] = field(default_factory=list)
+    row_offsets: array = field(default_factory=lambda: array("L"))
+
+    @classmethod
+    def from_rows(cls, index: int, rows: Iterable[Sequence[str]]) -> "TableGrid":
+        grid = cls(index)
+        for row in rows:
+            grid.add_row(row)
+        return grid
+
+    def add_row(self, row: Sequence[str]):
+        self.row_offsets.append(len(self.cells))
+        self.cells.extend(row)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.row_offsets)
+
+    def row(self, row_index: int) -> List[str]:
+        start = self.row_offsets[row_index]
+        if row_index + 1 < len(self.row_offsets):
+            return self.cells[start : self.row_offsets[row_index + 1]]
+        return self.cells[start:]
+
+    def rows(self) -> Iterator[List[str]]:
+        for row_index in range(self.num_rows):
+            yield self.row(row_index)
+
+    def to_wire(self) -> Dict[str, Any]:
+        """Firestore-compatible table: indexed rows of indexed string cells"""
+        return {
+            "table_index": str(self.index),
+            "rows": [
+                {
+                    "row_index": str(row_index),
+                    "cells": [
+                        {"cell_index": str(i), "value": value}
+                        for i, value in enumerate(row)
+                    ],
+                }
+                for row_index, row in enumerate(self.rows())
+            ],
+        }
+
+
+@dataclass(slots=True)
+class ExtractedDocument:
+    """
+    Typed result of extracting a document.
+
+    Extractors build this compact form and it is what crosses the worker
+    pool boundary; it is converted to the string-valued wire format once,
+    right before chunks are stored and the response is built.
+    """
+
+    paragraphs: List[ParagraphRecord] = field(default_factory=list)
+    headers: List[HeaderRecord] = field(default_factory=list)
+    pages: List[PageRecord] = field(default_factory=list)
+    tables: List[TableGrid] = field(default_factory=list)
+
+    def to_wire(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            "paragraphs": [p.to_wire() for p in self.paragraphs],
+            "headers": [h.to_wire() for h in self.headers],
+            "pages": [p.to_wire() for p in self.pages],
+            "tables": [t.to_wire() for t in self.tables],
+        }
@@ -53,15 +53,88 @@ class DocumentProcessResponse(BaseModel):
     message: str
     document_id: str
     summary: Dict[str, int]
-    content: Dict[str, List[Dict[str, Any]]]
+    # None when the upload asked for a summary or streamed its content
+    content: Optional[Dict[str, List[Dict[str, Any]]]] = None
     content_preview: ContentPreview
     storage_url: Optional[str] = None
+    version: Optional[int] = None
+
+
+class DocumentContentResponse(BaseModel):
+    document_id: str
+    metadata: Dict[str, Any]
+    content: Dict[str, List[Dict[str, Any]]]
+    totals: Dict[str, int]
+    offset: int
+    limit: Optional[int] = None
+
+
+class SearchHit(BaseModel):
+    document_id: str
+    score: float
+    original_filename: str
+    document_type: str
+    type: str
+    item_index: int
+    snippet: str
+
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    offset: int
+    limit: int
+    took_ms: float
+    results: List[SearchHit]
+
+
+class JobProgress(BaseModel):
+    stage: str = "queued"
+    pages_parsed: int = 0
+    chunks_written: int = 0
+
+
+class JobAcceptedResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    filename: str
+    created_at: str
+    updated_at: str
+    progress: JobProgress
+    result: Optional[DocumentProcessResponse] = None
+    error: Optional[str] = None
+
+
+class BatchFileResult(BaseModel):
+    index: int
+    filename: str
+    status: str
+    status_code: int
+    document_id: Optional[str] = None
+    summary: Optional[Dict[str, int]] = None
+    dedup: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchSummary(BaseModel):
+    done: bool = True
+    total: int
+    succeeded: int
+    failed: int
 
 
 class HealthCheckResponse(BaseModel):
     status: str
     service: str
     version: str
+    # Current load and limits: upload admission, extraction pool, job queue
+    load: Optional[Dict[str, Dict[str, Any]]] = None
 
 
 class DocumentChunk(BaseModel):
@@ -70,7 +143,15 @@ class DocumentChunk(BaseModel):
     type: str
     content: List[Dict[str, Any]]
     total_chunks: str
+    start: Optional[str] = None
+    byte_size: Optional[str] = None
+    part: Optional[str] = None
+    total_parts: Optional[str] = None
     created_at: Optional[datetime] = None
+    # Compressed chunks have empty `content`; their items are in
+    # `compressed_content`, encoded with `codec` (see app.utils.chunk_codec)
+    codec: Optional[str] = None
+    compressed_content: Optional[bytes] = None
 
 
 # Add these utility models if needed
@@ -0,0 +1,124 @@
+# app/services/batch.py
+import asyncio
+import logging
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.metrics import stage
+from app.schemas.document import BatchFileResult, BatchSummary
+from app.services.document_processor import DocumentProcessorService
+from app.services.storage import WriteCoalescer, storage
+from app.services.worker_pool import WorkerPoolSaturated, WorkerPoolTimeout
+from app.utils.uploads import SpooledUpload
+
+logger = logging.getLogger("doc_processor")
+
+
+class BatchItem(NamedTuple):
+    """One document of a batch upload, or the reason it was rejected"""
+
+    filename: str
+    upload: Optional[SpooledUpload]
+    error: Optional[str] = None
+    status_code: int = 400
+
+
+async def _process_item(
+    index: int, item: BatchItem, force: bool, writer: WriteCoalescer
+) -> BatchFileResult:
+    result = {"index": index, "filename": item.filename}
+    try:
+        content_hash = item.upload.sha256
+        dedup_status = "miss"
+        if force or not settings.DEDUP_ENABLED:
+            dedup_status = "bypass"
+        else:
+            with stage("dedup"):
+                duplicate = await DocumentProcessorService.find_duplicate(content_hash)
+            if duplicate is not None:
+                return BatchFileResult(
+                    **result,
+                    status="success",
+                    status_code=200,
+                    document_id=duplicate.document_id,
+                    summary=duplicate.summary,
+                    dedup="hit",
+                )
+
+        response = await DocumentProcessorService.process_document(
+            file_content=item.upload.source(),
+            filename=item.filename,
+            content_hash=content_hash,
+            writer=writer,
+        )
+        return BatchFileResult(
+            **result,
+            status="success",
+            status_code=200,
+            document_id=response.document_id,
+            summary=response.summary,
+            dedup=dedup_status,
+        )
+    except WorkerPoolSaturated as e:
+        logger.warning(f"Rejected batch document {item.filename}: {e}")
+        status_code, error = 503, "Server is busy, try again later"
+    except WorkerPoolTimeout as e:
+        logger.error(f"Batch document {item.filename} timed out: {e}")
+        status_code, error = 504, "Document processing timed out"
+    except ValueError as e:
+        logger.error(f"Error processing batch document {item.filename}: {e}")
+        status_code, error = 422, str(e)
+    except Exception as e:
+        logger.error(f"Unexpected error processing batch document {item.filename}: {e}")
+        status_code, error = 500, "An unexpected error occurred"
+    return BatchFileResult(
+        **result, status="error", status_code=status_code, error=error
+    )
+
+
+async def process_batch(
+    items: List[BatchItem], force: bool = False
+) -> AsyncIterator[str]:
+    """
+    Process the documents of a batch upload concurrently and yield one
+    NDJSON line per document as it finishes, then a summary line.
+
+    At most BATCH_MAX_PARALLEL documents are processed at a time, and their
+    storage writes are coalesced so small documents share write batches.
+    Takes ownership of the item uploads and closes them; if the consumer
+    stops early (client disconnect) the remaining documents are cancelled.
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.BATCH_MAX_PARALLEL))
+    writer = WriteCoalescer(
+        storage, settings.BATCH_WRITE_WINDOW, settings.FIRESTORE_BATCH_SIZE
+    )
+
+    async def run(index: int, item: BatchItem) -> BatchFileResult:
+        if item.upload is None:
+            return BatchFileResult(
+                index=index,
+                filename=item.filename,
+                status="error",
+                status_code=item.status_code,
+                error=item.error,
+            )
+        try:
+            async with semaphore:
+                return await _process_item(index, item, force, writer)
+        finally:
+            item.upload.close()
+
+    tasks = [asyncio.create_task(run(n, item)) for n, item in enumerate(items)]
+    try:
+        succeeded = 0
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            succeeded += result.status == "success"
+            yield result.model_dump_json(exclude_none=True) + "\n"
+        yield BatchSummary(
+            total=len(items), succeeded=succeeded, failed=len(items) - succeeded
+        ).model_dump_json() + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,56 @@
+# app/services/dedup.py
+import logging
+from typing import Any, Dict, Optional
+
+from cachetools import LRUCache
+
+from app.core.config import settings
+from app.services.storage import storage
+
+logger = logging.getLogger("doc_processor")
+
+
+class DedupIndex:
+    """
+    Maps content hashes to documents that were already processed.
+
+    Lookups check a local LRU first and fall back to the hash index in
+    document storage, so duplicates are found across restarts and instances.
+    Index failures never fail an upload; they are treated as misses.
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        self._cache: LRUCache = LRUCache(maxsize=max(1, cache_size))
+
+    async def lookup(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry for a content hash, or None on a miss"""
+        entry = self._cache.get(content_hash)
+        if entry is not None:
+            return entry
+
+        try:
+            entry = await storage.get_document_hash(content_hash)
+        except Exception as e:
+            logger.warning(f"Dedup lookup failed, processing document anyway: {e}")
+            return None
+
+        if entry:
+            entry.pop("created_at", None)
+            self._cache[content_hash] = entry
+        return entry or None
+
+    async def record(self, content_hash: str, entry: Dict[str, Any]):
+        """Remember the document produced for a content hash"""
+        self._cache[content_hash] = entry
+        try:
+            await storage.save_document_hash(content_hash, dict(entry))
+        except Exception as e:
+            logger.warning(f"Could not record content hash: {e}")
+
+    def clear(self):
+        """Drop all locally cached entries"""
+        self._cache.clear()
+
+
+# Shared index used by the upload path
+dedup_index = DedupIndex(cache_size=settings.DEDUP_CACHE_SIZE)
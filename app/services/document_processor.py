@@ -1,353 +1,832 @@
 # app/services/document_processor.py
+import asyncio
 import uuid
 import logging
+import weakref
 from datetime import datetime
-from typing import Dict, Any, List
-import io
+from typing import Dict, Any, List, Awaitable, Callable, Optional, Tuple
 from PyPDF2 import PdfReader
-from docx import Document
 
+from app.core.config import settings
+from app.core.metrics import (
+    DOCUMENT_SIZE_BYTES,
+    DOCUMENTS_IN_PROGRESS,
+    DOCUMENTS_PROCESSED,
+    ITEMS_EXTRACTED,
+    stage,
+)
+from app.core.profiling import profile_document
 from app.schemas.document import (
-    DocumentMetadata,
     ContentPreview,
     DocumentProcessResponse,
     DocumentChunk,
-    Page,
-    Header,
-    Paragraph,
-    TableData,
 )
-from app.db.firebase import save_document, save_document_chunk
+from app.models.document import (
+    ExtractedDocument,
+    HeaderRecord,
+    PageRecord,
+    ParagraphRecord,
+    TableGrid,
+)
+from app.services.dedup import dedup_index
+from app.services.document_reader import document_reader
+from app.services.search import search_index
+from app.services.storage import (
+    DocumentNotFound,
+    WriteCoalescer,
+    manifest_chunk_id,
+    manifest_chunk_ids,
+    storage,
+)
+from app.utils.uploads import DocumentSource, open_document_source, source_size
+from app.utils.chunk_codec import compression_codec, encode_content
+from app.utils.chunking import chunk_digest, plan_chunks
+from app.utils.docx_stream import iter_docx_blocks
+from app.utils.pdf_layout import detect_tables, page_words
+from app.utils.document_parser import format_page_range
+from app.services.worker_pool import (
+    extraction_pool,
+    WorkerPoolSaturated,
+    WorkerPoolTimeout,
+)
 
 logger = logging.getLogger("doc_processor")
 
+# Versions of one document are processed one at a time in this process, so
+# each is compared with the version stored before it
+_version_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
 
-class DocumentProcessorService:
-    """Service for processing document files and saving extracted data."""
+# Entries kept in a document's version history
+MAX_VERSION_HISTORY = 100
 
-    @staticmethod
-    def _chunk_content(content: List[Dict], chunk_size: int = 100) -> List[List[Dict]]:
-        """Split content into smaller chunks"""
-        return [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)]
 
-    @staticmethod
-    def _flatten_table_data(table_data: List[List[str]]) -> List[Dict[str, Any]]:
-        """Convert table data into Firestore-compatible format"""
-        flattened_rows = []
-        for row_idx, row in enumerate(table_data):
-            row_dict = {
-                "row_index": str(row_idx),
-                "cells": [
-                    {"cell_index": str(i), "value": str(v)} for i, v in enumerate(row)
-                ],
-            }
-            flattened_rows.append(row_dict)
-        return flattened_rows
+def _version_lock(document_id: str) -> asyncio.Lock:
+    lock = _version_locks.get(document_id)
+    if lock is None:
+        lock = _version_locks[document_id] = asyncio.Lock()
+    return lock
 
-    @staticmethod
-    def _extract_data_from_pdf(file_content: bytes) -> Dict[str, Any]:
-        """Extract text and structure from a PDF document."""
-        try:
-            pdf_reader = PdfReader(io.BytesIO(file_content))
-            extracted_data = {
-                "paragraphs": [],
-                "tables": [],
-                "headers": [],
-                "pages": [],
-            }
 
-            paragraph_index = 0
+class DocumentProcessorService:
+    """Service for processing document files and saving extracted data."""
 
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                text = page.extract_text()
+    @staticmethod
+    def _split_pdf_page_text(
+        text: str, find_tables: bool = True
+    ) -> Tuple[List[str], List[List[List[str]]]]:
+        """
+        Split the text layer of one page into paragraphs and table candidates
+        in a single pass over its lines.
+
+        Paragraphs are separated by empty lines. Consecutive lines containing
+        runs of spaces or tabs are treated as table rows (minimum two rows),
+        unless find_tables is False.
+        """
+        paragraphs = []
+        tables = []
+        block: List[str] = []
+        current_table: List[List[str]] = []
+
+        for line in text.split("\n"):
+            if line:
+                block.append(line)
+            elif block:
+                paragraphs.append("\n".join(block).strip())
+                block = []
+
+            if not find_tables:
+                continue
+            # If line has multiple spaces or tabs, it might be a table row
+            if line.strip() and ("  " in line or "\t" in line):
+                current_table.append(line.split())
+            elif current_table:
+                if len(current_table) > 1:  # Minimum 2 rows for a table
+                    tables.append(current_table)
+                current_table = []
 
-                # Split text into paragraphs based on double newlines and strip whitespace
-                paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+        if block:
+            paragraphs.append("\n".join(block).strip())
+        if len(current_table) > 1:
+            tables.append(current_table)
 
-                # Process each paragraph
-                for para in paragraphs:
-                    # Skip very short lines or empty lines
-                    if len(para) < 2:
-                        continue
+        return [p for p in paragraphs if p], tables
 
-                    # Simple heuristic for headers:
-                    # 1. All caps
-                    # 2. Less than 100 characters
-                    # 3. No punctuation except : , -
-                    is_heading = (
-                        para.isupper()
-                        and len(para) < 100
-                        and all(c.isalnum() or c in ":-," or c.isspace() for c in para)
-                    )
+    @staticmethod
+    def _count_pdf_pages(file_content: DocumentSource) -> int:
+        """Number of pages in a PDF document"""
+        with open_document_source(file_content) as stream:
+            return len(PdfReader(stream).pages)
 
-                    # Add to paragraphs
-                    extracted_data["paragraphs"].append(
-                        {
-                            "text": str(para),
-                            "index": str(paragraph_index),
-                            "is_heading": str(is_heading).lower(),
-                        }
+    @staticmethod
+    def _extract_data_from_pdf(
+        file_content: DocumentSource,
+        page_range: Optional[Tuple[int, Optional[int]]] = None,
+    ) -> ExtractedDocument:
+        """
+        Extract text and structure from a PDF document (bytes or file path).
+
+        Args:
+            file_content (DocumentSource): PDF content or path
+            page_range (Optional[Tuple[int, Optional[int]]]): First and last
+                page to extract (1-based, inclusive); all pages if None
+
+        Indices of paragraphs, headers and tables start at 0 within the
+        extracted range; page numbers are absolute.
+        """
+        try:
+            with open_document_source(file_content) as stream:
+                pdf_reader = PdfReader(stream)
+                extracted = ExtractedDocument()
+
+                total_pages = len(pdf_reader.pages)
+                first_page, last_page = page_range or (1, None)
+                last_page = min(last_page or total_pages, total_pages)
+
+                layout_tables = settings.PDF_TABLE_DETECTION == "layout"
+                for page_num in range(first_page, last_page + 1):
+                    page = pdf_reader.pages[page_num - 1]
+                    # Word positions for table detection; the content stream
+                    # parsed here is reused by extract_text
+                    words = page_words(page) if layout_tables else None
+
+                    # Extract the text layer once per page
+                    text = page.extract_text()
+                    paragraphs, table_candidates = (
+                        DocumentProcessorService._split_pdf_page_text(
+                            text, find_tables=words is None
+                        )
                     )
-
-                    # If it's a heading, add to headers
-                    if is_heading:
-                        extracted_data["headers"].append(
-                            {
-                                "level": "1",  # Default level for PDF headers
-                                "text": str(para),
-                                "index": str(paragraph_index),
-                            }
+                    if words is not None:
+                        table_candidates = detect_tables(words)
+
+                    # Process each paragraph
+                    for para in paragraphs:
+                        # Skip very short lines or empty lines
+                        if len(para) < 2:
+                            continue
+
+                        # Simple heuristic for headers:
+                        # 1. All caps
+                        # 2. Less than 100 characters
+                        # 3. No punctuation except : , -
+                        is_heading = (
+                            para.isupper()
+                            and len(para) < 100
+                            and all(
+                                c.isalnum() or c in ":-," or c.isspace() for c in para
+                            )
                         )
 
-                    paragraph_index += 1
+                        paragraph_index = len(extracted.paragraphs)
+                        extracted.paragraphs.append(
+                            ParagraphRecord(para, paragraph_index, is_heading)
+                        )
 
-                # Add page information with cleaned content
-                page_content = text.strip()
-                if page_content:  # Only add non-empty pages
-                    extracted_data["pages"].append(
-                        {"page_number": str(page_num), "content": str(page_content)}
-                    )
+                        # If it's a heading, add to headers (level 1 for PDFs)
+                        if is_heading:
+                            extracted.headers.append(
+                                HeaderRecord(para, 1, paragraph_index)
+                            )
 
-                # Try to detect tables (basic detection based on consistent spacing)
-                lines = text.split("\n")
-                table_candidates = []
-                current_table = []
+                    # Add page information with cleaned content
+                    page_content = text.strip()
+                    if page_content:  # Only add non-empty pages
+                        extracted.pages.append(PageRecord(page_num, page_content))
 
-                for line in lines:
-                    # If line has multiple spaces or tabs, it might be a table row
-                    if line.strip() and ("  " in line or "\t" in line):
-                        current_table.append(line.split())
-                    elif current_table:
-                        if len(current_table) > 1:  # Minimum 2 rows for a table
-                            table_candidates.append(current_table)
-                        current_table = []
-
-                # Add detected tables
-                for i, table in enumerate(table_candidates):
-                    table_index = len(extracted_data["tables"])
-                    extracted_data["tables"].append(
-                        {
-                            "table_index": str(table_index),
-                            "rows": [
-                                {
-                                    "row_index": str(row_idx),
-                                    "cells": [
-                                        {
-                                            "cell_index": str(cell_idx),
-                                            "value": str(cell),
-                                        }
-                                        for cell_idx, cell in enumerate(row)
-                                    ],
-                                }
-                                for row_idx, row in enumerate(table)
-                            ],
-                        }
-                    )
+                    # Add detected tables
+                    for table in table_candidates:
+                        extracted.tables.append(
+                            TableGrid.from_rows(len(extracted.tables), table)
+                        )
 
-            return extracted_data
+                return extracted
 
         except Exception as e:
             logger.error(f"Error extracting data from PDF: {e}")
             raise ValueError(f"Failed to extract data from PDF: {str(e)}")
 
     @staticmethod
-    def _extract_data_from_docx(file_content: bytes) -> Dict[str, Any]:
-        """Extract text and structure from a Word document."""
-        doc = Document(io.BytesIO(file_content))
+    def _append_pdf_part(merged: ExtractedDocument, part: ExtractedDocument):
+        """
+        Append the extraction result for the next page range, shifting
+        paragraph, header and table indices so they are global and stable.
+        """
+        paragraph_offset = len(merged.paragraphs)
+        table_offset = len(merged.tables)
+
+        for para in part.paragraphs:
+            para.index += paragraph_offset
+        for header in part.headers:
+            header.index += paragraph_offset
+        for table in part.tables:
+            table.index += table_offset
+        merged.paragraphs.extend(part.paragraphs)
+        merged.headers.extend(part.headers)
+        merged.tables.extend(part.tables)
+        merged.pages.extend(part.pages)
 
-        paragraphs = []
-        headers = []
-        pages = []
-        tables = []
+    @staticmethod
+    def _merge_pdf_parts(parts: List[ExtractedDocument]) -> ExtractedDocument:
+        """Merge PDF extraction results for consecutive page ranges"""
+        merged = ExtractedDocument()
+        for part in parts:
+            DocumentProcessorService._append_pdf_part(merged, part)
+        return merged
+
+    @staticmethod
+    async def _extract_pdf_parallel(
+        file_content: DocumentSource,
+        page_range: Optional[Tuple[int, Optional[int]]] = None,
+        on_part: Optional[Callable[[ExtractedDocument], Awaitable[None]]] = None,
+    ) -> ExtractedDocument:
+        """
+        Extract a PDF on the worker pool, splitting large page ranges into
+        consecutive slices that are extracted concurrently and merged.
+
+        If given, `on_part` is awaited with the result of each slice, in page
+        order and with global indices, as soon as it and the slices before
+        it are extracted.
+        """
+        total_pages = await extraction_pool.run(
+            DocumentProcessorService._count_pdf_pages, file_content
+        )
+        first_page, last_page = page_range or (1, None)
+        last_page = min(last_page or total_pages, total_pages)
+        if first_page > last_page:
+            raise ValueError(
+                f"Page range starts after the last page ({total_pages} pages)"
+            )
+
+        page_count = last_page - first_page + 1
+        if page_count < settings.PDF_PARALLEL_MIN_PAGES:
+            extracted = await extraction_pool.run(
+                DocumentProcessorService._extract_data_from_pdf,
+                file_content,
+                (first_page, last_page),
+            )
+            if on_part:
+                await on_part(extracted)
+            return extracted
+
+        # No more slices than workers, and no slice smaller than the minimum
+        slice_count = min(
+            extraction_pool.max_workers,
+            max(1, page_count // settings.PDF_PAGES_PER_TASK),
+        )
+        slice_size = -(-page_count // slice_count)
+        slices = [
+            (start, min(start + slice_size - 1, last_page))
+            for start in range(first_page, last_page + 1, slice_size)
+        ]
+        tasks = [
+            asyncio.ensure_future(
+                extraction_pool.run(
+                    DocumentProcessorService._extract_data_from_pdf,
+                    file_content,
+                    page_slice,
+                )
+            )
+            for page_slice in slices
+        ]
+        try:
+            merged = ExtractedDocument()
+            for task in tasks:
+                part = await task
+                DocumentProcessorService._append_pdf_part(merged, part)
+                if on_part:
+                    await on_part(part)
+            return merged
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _extract_data_from_docx(file_content: DocumentSource) -> ExtractedDocument:
+        """Extract text and structure from a Word document (bytes or file path)."""
+        extracted = ExtractedDocument()
 
         current_page_content = []
         current_page_number = 1
         char_count = 0
         chars_per_page = 3000
 
-        # Process paragraphs and headers
-        for i, para in enumerate(doc.paragraphs):
-            text = para.text.strip()
-            if text:
-                # Basic paragraph data
-                para_data = {
-                    "text": str(text),
-                    "index": str(i),
-                    "is_heading": "false",  # Store as string for consistency
-                }
+        # Paragraphs and tables arrive in document order from a single pass
+        for block in iter_docx_blocks(file_content):
+            if isinstance(block, TableGrid):
+                block.cells[:] = [value.strip() for value in block.cells]
+                extracted.tables.append(block)
+                continue
+
+            text = block.text.strip()
+            if not text:
+                continue
+
+            # Check for heading
+            is_heading = block.style.startswith("Heading")
+            if is_heading:
+                try:
+                    level = int(block.style.replace("Heading", "").strip())
+                except ValueError:
+                    level = 1
+                extracted.headers.append(HeaderRecord(text, level, block.index))
+
+            extracted.paragraphs.append(ParagraphRecord(text, block.index, is_heading))
+
+            # Page simulation
+            current_page_content.append(text)
+            char_count += len(text)
+
+            if char_count >= chars_per_page:
+                extracted.pages.append(
+                    PageRecord(current_page_number, "\n".join(current_page_content))
+                )
+                current_page_content = []
+                current_page_number += 1
+                char_count = 0
 
-                # Check for heading
-                if para.style.name.startswith("Heading"):
-                    para_data["is_heading"] = "true"
-                    try:
-                        level = int(para.style.name.replace("Heading", "").strip())
-                    except ValueError:
-                        level = 1
+        # Add final page if content exists
+        if current_page_content:
+            extracted.pages.append(
+                PageRecord(current_page_number, "\n".join(current_page_content))
+            )
 
-                    headers.append(
-                        {"text": str(text), "level": str(level), "index": str(i)}
-                    )
+        return extracted
 
-                paragraphs.append(para_data)
+    @staticmethod
+    def _dedup_key(
+        content_hash: str, page_range: Optional[Tuple[int, Optional[int]]] = None
+    ) -> str:
+        """Dedup index key; partial extractions are keyed by their page range"""
+        if page_range is None:
+            return content_hash
+        return f"{content_hash}:pages={format_page_range(page_range)}"
 
-                # Page simulation
-                current_page_content.append(text)
-                char_count += len(text)
+    @staticmethod
+    async def find_duplicate(
+        content_hash: str, page_range: Optional[Tuple[int, Optional[int]]] = None
+    ) -> Optional[DocumentProcessResponse]:
+        """
+        Return the result for an already processed copy of a document, if
+        any. Entries are checked against the stored document, as it may
+        have moved on to another version since they were cached.
+        """
+        entry = await dedup_index.lookup(
+            DocumentProcessorService._dedup_key(content_hash, page_range)
+        )
+        if entry is None:
+            return None
 
-                if char_count >= chars_per_page:
-                    pages.append(
-                        {
-                            "page_number": str(current_page_number),
-                            "content": str("\n".join(current_page_content)),
-                        }
-                    )
-                    current_page_content = []
-                    current_page_number += 1
-                    char_count = 0
+        try:
+            stored = await storage.get_document(entry["document_id"])
+        except Exception as e:
+            logger.warning(f"Could not check duplicate document: {e}")
+            return None
+        expected_range = format_page_range(page_range) if page_range else ""
+        if (
+            stored is None
+            or stored["metadata"].get("content_sha256") != content_hash
+            or (stored["metadata"].get("page_range") or "") != expected_range
+        ):
+            return None
+
+        logger.info(f"Duplicate upload of document {entry['document_id']}")
+        return DocumentProcessResponse(
+            status="success",
+            message="Document already processed",
+            document_id=entry["document_id"],
+            storage_url=None,
+            summary=entry["summary"],
+            content={},
+            content_preview=ContentPreview(**entry["content_preview"]),
+        )
 
-        # Add final page if content exists
-        if current_page_content:
-            pages.append(
-                {
-                    "page_number": str(current_page_number),
-                    "content": str("\n".join(current_page_content)),
-                }
+    @staticmethod
+    def _build_chunks(
+        document_id: str,
+        extracted_data: Dict[str, List[Dict[str, Any]]],
+        previous: Optional[Dict[str, List[Dict[str, str]]]] = None,
+        id_suffix: str = "",
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[Dict[str, str]]]]:
+        """
+        Pack content into chunks by estimated size; oversized items are split
+        across continuation chunks.
+
+        Given the chunk manifest of the `previous` version of the document,
+        chunks are planned on its boundaries, and a chunk whose digest matches
+        a stored one refers to that chunk instead of being written again.
+        New chunk IDs end with `id_suffix`, so they never overwrite chunks
+        the previous version is still served from.
+
+        With CHUNK_COMPRESSION, chunks hold up to CHUNK_COMPRESSED_TARGET_BYTES
+        of content and store it compressed, unless that does not make them
+        smaller. Digests are of the content, so they match either way.
+
+        Returns:
+            Chunk documents to write keyed by chunk ID, and the chunk
+            manifest per content type
+        """
+        previous = previous or {}
+        codec = compression_codec(settings.CHUNK_COMPRESSION)
+        target_bytes = (
+            settings.CHUNK_COMPRESSED_TARGET_BYTES
+            if codec
+            else settings.CHUNK_TARGET_BYTES
+        )
+        chunks = {}
+        chunk_manifest = {}
+        for content_type, content in extracted_data.items():
+            entries = previous.get(content_type, [])
+            stored = {
+                entry["sha256"]: entry for entry in entries if entry.get("sha256")
+            }
+            planned = plan_chunks(
+                content_type,
+                content,
+                target_bytes,
+                anchors={int(entry["start"]) for entry in entries},
             )
-
-        # Process tables with flattened structure
-        for i, table in enumerate(doc.tables):
-            rows_data = []
-            for row_idx, row in enumerate(table.rows):
-                cells = []
-                for cell_idx, cell in enumerate(row.cells):
-                    cells.append(
-                        {"cell_index": str(cell_idx), "value": str(cell.text.strip())}
+            chunk_manifest[content_type] = []
+            for chunk_index, plan in enumerate(planned):
+                digest = chunk_digest(plan)
+                reused = stored.get(digest)
+                if reused is not None:
+                    chunk_id = manifest_chunk_id(document_id, content_type, reused)
+                    byte_size = int(reused.get("byte_size") or plan.byte_size)
+                else:
+                    byte_size = plan.byte_size
+                    chunk_id = f"{document_id}_{content_type}_{chunk_index}{id_suffix}"
+                    items, compressed = plan.items, None
+                    if codec:
+                        compressed = encode_content(codec, plan.items)
+                        if len(compressed) < byte_size:
+                            items, byte_size = [], len(compressed)
+                        else:
+                            compressed = None
+                    # Items come straight from extraction; storage copies or
+                    # serializes them, so they are neither validated nor copied
+                    chunks[chunk_id] = dict(
+                        DocumentChunk.model_construct(
+                            document_id=document_id,
+                            chunk_index=str(chunk_index),
+                            type=content_type,
+                            content=items,
+                            total_chunks=str(len(planned)),
+                            start=str(plan.start),
+                            byte_size=str(byte_size),
+                            part=str(plan.part) if plan.part else None,
+                            total_parts=str(plan.total_parts) if plan.part else None,
+                            codec=codec if compressed else None,
+                            compressed_content=compressed,
+                        )
                     )
-                rows_data.append({"row_index": str(row_idx), "cells": cells})
-
-            tables.append({"table_index": str(i), "rows": rows_data})
+                # Lets readers fetch only the chunks a page needs, in
+                # size-balanced parallel reads
+                chunk_manifest[content_type].append(
+                    {
+                        "chunk_index": str(chunk_index),
+                        "chunk_id": chunk_id,
+                        "sha256": digest,
+                        "start": str(plan.start),
+                        "count": str(len(plan.items)),
+                        "byte_size": str(byte_size),
+                    }
+                )
+        return chunks, chunk_manifest
 
-        return {
-            "paragraphs": paragraphs,
-            "headers": headers,
-            "pages": pages,
-            "tables": tables,
+    @staticmethod
+    def _version_entry(metadata: Dict[str, str], **counts: int) -> Dict[str, str]:
+        """Version history entry for a document's metadata"""
+        entry = {
+            "version": metadata.get("version") or "1",
+            "processed_at": metadata.get("processed_at", ""),
+            "original_filename": metadata.get("original_filename", ""),
+            "content_sha256": metadata.get("content_sha256", ""),
         }
+        entry.update((name, str(count)) for name, count in counts.items())
+        return entry
 
     @staticmethod
     async def process_document(
-        file_content: bytes, filename: str
+        file_content: DocumentSource,
+        filename: str,
+        progress: Optional[Callable[..., Awaitable[None]]] = None,
+        content_hash: Optional[str] = None,
+        page_range: Optional[Tuple[int, Optional[int]]] = None,
+        writer: Optional[WriteCoalescer] = None,
+        version_of: Optional[str] = None,
+        include_content: bool = True,
+        emit: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    ) -> DocumentProcessResponse:
+        """
+        Process a document file, extract data, and save to Firebase.
+
+        `file_content` is either the raw bytes or the path of a spooled
+        upload; paths are passed to the extraction workers as-is.
+
+        If given, `progress` is awaited with keyword updates (stage,
+        pages_parsed, chunks_written) as processing advances, and
+        `content_hash` is recorded in the dedup index once the document
+        has been stored. `page_range` limits PDF extraction to the given
+        first and last page (1-based, inclusive). With a `writer`, the
+        document is saved together with others through its shared batches.
+
+        With `version_of`, the upload is stored as the next version of that
+        document under the same ID. Only chunks whose content changed are
+        written; the metadata document, written last, switches readers to
+        the new chunk manifest and records the version history, and chunks
+        only the previous version used are deleted afterwards.
+
+        Once stored, the content is added to the full-text search index.
+
+        Without `include_content`, the response carries the summary and
+        preview only. If given, `emit` is awaited with stream records: a
+        metadata record once the upload is validated, then records of up to
+        CONTENT_PAGE_SIZE pages, paragraphs, headers or tables each, as
+        extraction produces them (see `_emit_content`).
+
+        The parse, chunk, write and index stages are timed in the metrics
+        and in the Server-Timing header of the current request. Documents
+        may be profiled on request or by sampling, and slow ones reported;
+        see app.core.profiling.
+
+        Raises:
+            DocumentNotFound: If `version_of` is not a stored document
+        """
+        async with profile_document(filename, file_content):
+            if version_of is None:
+                return await DocumentProcessorService._process_document(
+                    file_content,
+                    filename,
+                    progress,
+                    content_hash,
+                    page_range,
+                    writer,
+                    include_content=include_content,
+                    emit=emit,
+                )
+            async with _version_lock(version_of):
+                return await DocumentProcessorService._process_document(
+                    file_content,
+                    filename,
+                    progress,
+                    content_hash,
+                    page_range,
+                    writer,
+                    version_of,
+                    include_content,
+                    emit,
+                )
+
+    @staticmethod
+    async def _emit_content(
+        emit: Callable[[Dict[str, Any]], Awaitable[None]],
+        content: Dict[str, List[Dict[str, Any]]],
+        offsets: Dict[str, int],
+    ):
+        """
+        Emit the wire-format content of one extracted part as records of up
+        to CONTENT_PAGE_SIZE items, e.g. `{"type": "paragraphs", "offset":
+        200, "items": [...]}`. `offsets` counts the items emitted so far per
+        type, so offsets run on across parts.
+        """
+        size = settings.CONTENT_PAGE_SIZE
+        for content_type in ("pages", "paragraphs", "headers", "tables"):
+            items = content[content_type]
+            for start in range(0, len(items), size):
+                await emit(
+                    {
+                        "type": content_type,
+                        "offset": offsets.get(content_type, 0) + start,
+                        "items": items[start : start + size],
+                    }
+                )
+            offsets[content_type] = offsets.get(content_type, 0) + len(items)
+
+    @staticmethod
+    async def _process_document(
+        file_content: DocumentSource,
+        filename: str,
+        progress: Optional[Callable[..., Awaitable[None]]],
+        content_hash: Optional[str],
+        page_range: Optional[Tuple[int, Optional[int]]],
+        writer: Optional[WriteCoalescer],
+        version_of: Optional[str] = None,
+        include_content: bool = True,
+        emit: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
     ) -> DocumentProcessResponse:
-        """Process a document file, extract data, and save to Firebase"""
+        file_extension = filename.lower().split(".")[-1]
+        DOCUMENTS_IN_PROGRESS.inc()
         try:
             logger.info(f"Processing document: {filename}")
 
-            document_id = str(uuid.uuid4())
-            file_extension = filename.lower().split(".")[-1]
-
             # Support both DOCX and PDF
             if file_extension not in ["docx", "pdf"]:
                 raise ValueError(f"Unsupported file type: {file_extension}")
 
-            # Extract content based on file type
-            if file_extension == "pdf":
-                extracted_data = DocumentProcessorService._extract_data_from_pdf(
-                    file_content
-                )
+            previous = None
+            if version_of is None:
+                document_id = str(uuid.uuid4())
+                version = 1
             else:
-                extracted_data = DocumentProcessorService._extract_data_from_docx(
-                    file_content
+                previous = await storage.get_document(version_of)
+                if previous is None:
+                    raise DocumentNotFound(f"Document {version_of} not found")
+                document_id = version_of
+                version = int(previous["metadata"].get("version") or 1) + 1
+
+            file_size = source_size(file_content)
+            DOCUMENT_SIZE_BYTES.observe(file_size, document_type=file_extension)
+
+            if progress:
+                await progress(stage="parsing")
+
+            on_part = None
+            if emit:
+                await emit(
+                    {
+                        "type": "metadata",
+                        "document_id": document_id,
+                        "version": version,
+                        "filename": filename,
+                        "document_type": file_extension,
+                        "file_size": file_size,
+                    }
+                )
+                # Parts are converted to the wire format as they arrive, for
+                # the stream and then for chunks and response
+                wire_parts = []
+                offsets = {}
+
+                async def on_part(part: ExtractedDocument):
+                    wire_parts.append(part.to_wire())
+                    await DocumentProcessorService._emit_content(
+                        emit, wire_parts[-1], offsets
+                    )
+
+            # Extract content based on file type, off the event loop
+            with stage("parse"):
+                if file_extension == "pdf":
+                    extracted = await DocumentProcessorService._extract_pdf_parallel(
+                        file_content, page_range, on_part
+                    )
+                elif page_range is not None:
+                    raise ValueError("Page ranges are only supported for PDF documents")
+                else:
+                    extracted = await extraction_pool.run(
+                        DocumentProcessorService._extract_data_from_docx, file_content
+                    )
+                    if on_part:
+                        await on_part(extracted)
+
+            for kind in ("pages", "paragraphs", "headers", "tables"):
+                ITEMS_EXTRACTED.inc(len(getattr(extracted, kind)), kind=kind)
+
+            if progress:
+                await progress(stage="writing", pages_parsed=len(extracted.pages))
+
+            with stage("chunk"):
+                # Convert to the string-valued wire format once, for chunks
+                # and response
+                if on_part:
+                    extracted_data = {
+                        content_type: [
+                            item for part in wire_parts for item in part[content_type]
+                        ]
+                        for content_type in wire_parts[0]
+                    }
+                else:
+                    extracted_data = extracted.to_wire()
+                chunks, chunk_manifest = DocumentProcessorService._build_chunks(
+                    document_id,
+                    extracted_data,
+                    previous=previous.get("chunks") if previous else None,
+                    # Unique per write, so concurrent versions cannot collide
+                    id_suffix=f"_{uuid.uuid4().hex[:8]}" if previous else "",
                 )
 
-            # Create base document metadata with full content
+            # Create base document metadata; content lives in the chunks only
+            chunk_count = sum(len(entries) for entries in chunk_manifest.values())
+            metadata = {
+                "original_filename": str(filename),
+                "processed_at": datetime.now().isoformat(),
+                "file_size": str(file_size),
+                "document_type": str(file_extension),
+                "total_pages": str(len(extracted.pages)),
+                "total_paragraphs": str(len(extracted.paragraphs)),
+                "total_headers": str(len(extracted.headers)),
+                "total_tables": str(len(extracted.tables)),
+                "content_sha256": str(content_hash or ""),
+                "page_range": format_page_range(page_range) if page_range else "",
+                "version": str(version),
+            }
+            versions = []
+            if previous is not None:
+                versions = previous.get("versions") or [
+                    DocumentProcessorService._version_entry(previous["metadata"])
+                ]
+            versions = versions[-(MAX_VERSION_HISTORY - 1) :] + [
+                DocumentProcessorService._version_entry(
+                    metadata,
+                    chunks_written=len(chunks),
+                    chunks_reused=chunk_count - len(chunks),
+                )
+            ]
             base_doc = {
                 "document_id": document_id,
-                "metadata": {
-                    "original_filename": str(filename),
-                    "processed_at": datetime.now().isoformat(),
-                    "file_size": str(len(file_content)),
-                    "document_type": str(file_extension),
-                    "total_pages": str(len(extracted_data["pages"])),
-                    "total_paragraphs": str(len(extracted_data["paragraphs"])),
-                    "total_headers": str(len(extracted_data["headers"])),
-                    "total_tables": str(len(extracted_data["tables"])),
-                },
-                "content": {
-                    "pages": extracted_data["pages"],
-                    "headers": extracted_data["headers"],
-                    "paragraphs": extracted_data["paragraphs"],
-                    "tables": extracted_data["tables"],
-                },
+                "metadata": metadata,
+                "chunks": chunk_manifest,
+                "versions": versions,
             }
 
-            # Save document metadata
-            save_document(document_id, base_doc)
-
-            # Save content chunks with safety checks
-            chunk_configs = {
-                "pages": (extracted_data["pages"], 50),
-                "paragraphs": (extracted_data["paragraphs"], 100),
-                "headers": (
-                    extracted_data["headers"],
-                    max(1, len(extracted_data["headers"])),
-                ),  # Ensure non-zero
-                "tables": (
-                    extracted_data["tables"],
-                    max(1, min(10, len(extracted_data["tables"]))),
-                ),  # Ensure non-zero and reasonable
-            }
+            # Save metadata and chunks in batched, concurrent commits
+            with stage("write"):
+                save = writer.save if writer else storage.save_document_bulk
+                await save(document_id, base_doc, chunks)
+
+            if previous is not None:
+                document_reader.invalidate(document_id)
+                stale = set(
+                    manifest_chunk_ids(document_id, previous.get("chunks") or {})
+                ) - set(manifest_chunk_ids(document_id, chunk_manifest))
+                try:
+                    await storage.delete_chunks(sorted(stale))
+                except Exception as e:
+                    # Unreferenced chunks only cost storage; they are removed
+                    # with the document
+                    logger.warning(f"Could not delete replaced chunks: {e}")
+                logger.info(
+                    f"Stored version {version} of document {document_id}: "
+                    f"{len(chunks)} of {chunk_count} chunks written, "
+                    f"{len(stale)} replaced"
+                )
 
-            for content_type, (content, chunk_size) in chunk_configs.items():
-                if content:  # Only process if there's content
-                    total_chunks = max(1, (len(content) + chunk_size - 1) // chunk_size)
-
-                    for i in range(0, len(content), max(1, chunk_size)):
-                        chunk = content[i : i + chunk_size]
-                        if chunk:  # Only save if chunk has content
-                            chunk_doc = DocumentChunk(
-                                document_id=document_id,
-                                chunk_index=str(i // max(1, chunk_size)),
-                                type=content_type,
-                                content=chunk,
-                                total_chunks=str(total_chunks),
-                            )
-                            save_document_chunk(
-                                f"{document_id}_{content_type}_{i // max(1, chunk_size)}",
-                                chunk_doc.model_dump(),
-                            )
+            if progress:
+                await progress(chunks_written=len(chunks))
+
+            summary = {
+                "pages_count": len(extracted.pages),
+                "paragraphs_count": len(extracted.paragraphs),
+                "tables_count": len(extracted.tables),
+                "headers_count": len(extracted.headers),
+            }
+            if previous is not None:
+                summary["chunks_written"] = len(chunks)
+                summary["chunks_reused"] = chunk_count - len(chunks)
 
-            # Return full response with all content
-            return DocumentProcessResponse(
+            # Return full response with all content, unless left out. The
+            # content was built here, so it is not validated item by item
+            response = DocumentProcessResponse.model_construct(
                 status="success",
                 message="Document processed successfully",
                 document_id=document_id,
+                version=version,
                 storage_url=None,
-                summary={
-                    "pages_count": len(extracted_data["pages"]),
-                    "paragraphs_count": len(extracted_data["paragraphs"]),
-                    "tables_count": len(extracted_data["tables"]),
-                    "headers_count": len(extracted_data["headers"]),
-                },
-                content=extracted_data,
+                summary=summary,
+                content=extracted_data if include_content else None,
                 content_preview=ContentPreview(
                     first_page_content=(
-                        extracted_data["pages"][0]["content"]
-                        if extracted_data["pages"]
-                        else ""
-                    ),
-                    headers=(
-                        [h["text"] for h in extracted_data["headers"][:10]]
-                        if extracted_data["headers"]
-                        else []
-                    ),
-                    first_paragraphs=(
-                        [p["text"] for p in extracted_data["paragraphs"][:5]]
-                        if extracted_data["paragraphs"]
-                        else []
+                        extracted.pages[0].content if extracted.pages else ""
                     ),
+                    headers=[h.text for h in extracted.headers[:10]],
+                    first_paragraphs=[p.text for p in extracted.paragraphs[:5]],
                 ),
             )
 
+            if content_hash:
+                entry = {
+                    "document_id": document_id,
+                    "original_filename": str(filename),
+                    "summary": response.summary,
+                    "content_preview": response.content_preview.model_dump(),
+                }
+                with stage("index"):
+                    await dedup_index.record(
+                        DocumentProcessorService._dedup_key(content_hash, page_range),
+                        entry,
+                    )
+
+            if search_index is not None:
+                with stage("index"):
+                    await search_index.index_document(
+                        document_id, metadata, extracted_data
+                    )
+
+            DOCUMENTS_PROCESSED.inc(document_type=file_extension, outcome="success")
+            return response
+
+        except DocumentNotFound:
+            DOCUMENTS_PROCESSED.inc(document_type=file_extension, outcome="error")
+            raise
+        except (WorkerPoolSaturated, WorkerPoolTimeout):
+            # Capacity problems are not document errors; let the caller map them
+            DOCUMENTS_PROCESSED.inc(document_type=file_extension, outcome="rejected")
+            raise
         except Exception as e:
+            DOCUMENTS_PROCESSED.inc(document_type=file_extension, outcome="error")
             logger.error(f"Error processing document: {e}")
             raise ValueError(f"Failed to process document: {str(e)}")
+        finally:
+            DOCUMENTS_IN_PROGRESS.dec()
@@ -0,0 +1,124 @@
+# app/services/document_reader.py
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from cachetools import LRUCache, TTLCache
+
+from app.core.config import settings
+from app.services.storage import MissingChunkError, storage
+
+logger = logging.getLogger("doc_processor")
+
+
+class DocumentReader:
+    """
+    Cached, paginated access to stored document content.
+
+    Entries are keyed by document ID and expire after `ttl` seconds. Each
+    entry holds the document metadata, its ETag and the most recently read
+    pages, so repeated and conditional reads avoid storage entirely.
+    """
+
+    def __init__(
+        self, cache_size: int = 256, ttl: int = 300, pages_per_document: int = 16
+    ):
+        self._cache: TTLCache = TTLCache(maxsize=max(1, cache_size), ttl=ttl)
+        self._pages_per_document = pages_per_document
+
+    @staticmethod
+    def compute_etag(document_id: str, metadata: Dict[str, Any]) -> str:
+        """Strong ETag derived from the stored document version"""
+        meta = metadata.get("metadata", {})
+        version = "|".join(
+            [
+                document_id,
+                str(meta.get("processed_at", "")),
+                str(meta.get("content_sha256", "")),
+                str(meta.get("version", "")),
+            ]
+        )
+        return '"' + hashlib.sha256(version.encode("utf-8")).hexdigest()[:32] + '"'
+
+    async def _entry(self, document_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(document_id)
+        if entry is not None:
+            return entry
+
+        metadata = await storage.get_document(document_id)
+        if metadata is None:
+            return None
+
+        entry = {
+            "metadata": metadata,
+            "etag": self.compute_etag(document_id, metadata),
+            "pages": LRUCache(maxsize=self._pages_per_document),
+        }
+        self._cache[document_id] = entry
+        return entry
+
+    async def get_etag(self, document_id: str) -> Optional[str]:
+        """ETag of the current document version, or None if it does not exist"""
+        entry = await self._entry(document_id)
+        return entry["etag"] if entry else None
+
+    async def read(
+        self,
+        document_id: str,
+        content_types: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        Read a page of document content.
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], str]]: The content page and its
+            ETag, or None if the document does not exist
+        """
+        entry = await self._entry(document_id)
+        if entry is None:
+            return None
+
+        key = (tuple(content_types or ()), offset, limit)
+        page = entry["pages"].get(key)
+        if page is None:
+            try:
+                page = await self._read_page(entry, document_id, key)
+            except MissingChunkError:
+                # A new version replaced the chunks of the cached manifest
+                # (possibly written by another instance); read it again
+                self.invalidate(document_id)
+                entry = await self._entry(document_id)
+                if entry is None:
+                    return None
+                page = await self._read_page(entry, document_id, key)
+            entry["pages"][key] = page
+        return page, entry["etag"]
+
+    @staticmethod
+    async def _read_page(
+        entry: Dict[str, Any], document_id: str, key: Tuple
+    ) -> Dict[str, Any]:
+        content_types, offset, limit = key
+        return await storage.get_document_content(
+            document_id,
+            content_types=list(content_types) or None,
+            offset=offset,
+            limit=limit,
+            metadata=entry["metadata"],
+        )
+
+    def invalidate(self, document_id: str):
+        """Drop cached data for a document after it changes"""
+        self._cache.pop(document_id, None)
+
+    def clear(self):
+        """Drop all cached documents"""
+        self._cache.clear()
+
+
+# Shared reader used by the content endpoint
+document_reader = DocumentReader(
+    cache_size=settings.CONTENT_CACHE_SIZE, ttl=settings.CONTENT_CACHE_TTL
+)
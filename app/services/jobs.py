@@ -0,0 +1,571 @@
+# app/services/jobs.py
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import request_id
+from app.core.metrics import JOBS_QUEUED, JOBS_RUNNING
+from app.utils.uploads import DocumentSource, discard_source, move_source
+
+logger = logging.getLogger("doc_processor")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when too many jobs are already waiting to be processed."""
+
+
+class JobStore(ABC):
+    """
+    Persistence for job records and the uploaded files they process.
+
+    Unfinished jobs belong to the job queue (owner) that runs them. Owners
+    refresh a heartbeat on their jobs, and jobs whose owner stopped or
+    stopped refreshing it are claimed by another owner.
+    """
+
+    @abstractmethod
+    def create(
+        self, job: Dict[str, Any], payload: DocumentSource, owner: Optional[str] = None
+    ):
+        """
+        Store a new job record owned by `owner` (any owner may claim it if
+        None) and take ownership of its file content
+        """
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job record, or None if it does not exist"""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields: Any):
+        """Update fields of an existing job record"""
+
+    @abstractmethod
+    def load_payload(self, job_id: str) -> Optional[DocumentSource]:
+        """Return the file content (bytes or path) for a job, or None if it is gone"""
+
+    @abstractmethod
+    def delete_payload(self, job_id: str):
+        """Release the file content once the job has finished"""
+
+    @abstractmethod
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        """Return queued and running jobs, oldest first"""
+
+    @abstractmethod
+    def start(self, job_id: str, owner: str, now: str) -> bool:
+        """
+        Mark a queued job of `owner` as running. Returns False if the job is
+        no longer queued or was claimed by another owner.
+        """
+
+    @abstractmethod
+    def claim_stale(self, owner: str, stale_before: float) -> List[Dict[str, Any]]:
+        """
+        Take over the unfinished jobs that have no owner or whose heartbeat is
+        older than `stale_before`, queue them again and return them, oldest first
+        """
+
+    @abstractmethod
+    def heartbeat(self, owner: str):
+        """Refresh the heartbeat of the unfinished jobs of `owner`"""
+
+    @abstractmethod
+    def release(self, owner: str):
+        """Give up the unfinished jobs of `owner` so another owner resumes them"""
+
+    @abstractmethod
+    def purge(self, finished_before: str) -> int:
+        """
+        Delete finished jobs last updated before `finished_before` (an ISO
+        timestamp) and return how many were deleted
+        """
+
+    def close(self):
+        """Release any resources held by the store"""
+
+
+class InMemoryJobStore(JobStore):
+    """Job store that keeps everything in process memory; lost on restart."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._payloads: Dict[str, DocumentSource] = {}
+        # Job ID -> (owner, heartbeat) of unfinished jobs
+        self._owners: Dict[str, Tuple[Optional[str], float]] = {}
+
+    def create(
+        self, job: Dict[str, Any], payload: DocumentSource, owner: Optional[str] = None
+    ):
+        self._jobs[job["job_id"]] = dict(job)
+        self._payloads[job["job_id"]] = payload
+        self._owners[job["job_id"]] = (owner, time.time())
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def update(self, job_id: str, **fields: Any):
+        self._jobs[job_id].update(fields)
+
+    def load_payload(self, job_id: str) -> Optional[DocumentSource]:
+        return self._payloads.get(job_id)
+
+    def delete_payload(self, job_id: str):
+        payload = self._payloads.pop(job_id, None)
+        if payload is not None:
+            discard_source(payload)
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        return [
+            dict(job)
+            for job in self._jobs.values()
+            if job["status"] in (JOB_QUEUED, JOB_RUNNING)
+        ]
+
+    def start(self, job_id: str, owner: str, now: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != JOB_QUEUED:
+            return False
+        if self._owners.get(job_id, (None, 0))[0] != owner:
+            return False
+        job.update(status=JOB_RUNNING, updated_at=now)
+        return True
+
+    def claim_stale(self, owner: str, stale_before: float) -> List[Dict[str, Any]]:
+        claimed = []
+        for job in self.list_unfinished():
+            current, beat = self._owners.get(job["job_id"], (None, 0))
+            if current is None or beat < stale_before:
+                self._owners[job["job_id"]] = (owner, time.time())
+                self._jobs[job["job_id"]]["status"] = JOB_QUEUED
+                claimed.append(dict(self._jobs[job["job_id"]]))
+        return claimed
+
+    def heartbeat(self, owner: str):
+        now = time.time()
+        for job in self.list_unfinished():
+            if self._owners.get(job["job_id"], (None, 0))[0] == owner:
+                self._owners[job["job_id"]] = (owner, now)
+
+    def release(self, owner: str):
+        for job_id, (current, beat) in list(self._owners.items()):
+            if current == owner:
+                self._owners[job_id] = (None, beat)
+
+    def purge(self, finished_before: str) -> int:
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED and job["updated_at"] < finished_before
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._owners.pop(job_id, None)
+            self.delete_payload(job_id)
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store backed by a local SQLite database so jobs survive restarts.
+
+    Uploaded files are kept next to the database until their job finishes.
+    Several processes can share the database: jobs are claimed with
+    conditional updates, so each one is run by a single owner.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.payload_dir = self.db_path.parent / f"{self.db_path.stem}_payloads"
+        self.payload_dir.mkdir(exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "created_at TEXT NOT NULL, record TEXT NOT NULL, "
+            "owner TEXT, heartbeat REAL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            # Databases created before jobs had owners
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._conn.commit()
+
+    def _payload_path(self, job_id: str) -> Path:
+        return self.payload_dir / job_id
+
+    def create(
+        self, job: Dict[str, Any], payload: DocumentSource, owner: Optional[str] = None
+    ):
+        move_source(payload, str(self._payload_path(job["job_id"])))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs "
+                "(job_id, status, created_at, record, owner, heartbeat) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job["job_id"],
+                    job["status"],
+                    job["created_at"],
+                    json.dumps(job),
+                    owner,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id: str, **fields: Any):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return
+            job = json.loads(row[0])
+            job.update(fields)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, record = ? WHERE job_id = ?",
+                (job["status"], json.dumps(job), job_id),
+            )
+            self._conn.commit()
+
+    def load_payload(self, job_id: str) -> Optional[DocumentSource]:
+        path = self._payload_path(job_id)
+        return str(path) if path.exists() else None
+
+    def delete_payload(self, job_id: str):
+        self._payload_path(job_id).unlink(missing_ok=True)
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def start(self, job_id: str, owner: str, now: str) -> bool:
+        with self._lock:
+            started = self._conn.execute(
+                "UPDATE jobs SET status = ?, "
+                "record = json_set(record, '$.status', ?, '$.updated_at', ?) "
+                "WHERE job_id = ? AND status = ? AND owner = ?",
+                (JOB_RUNNING, JOB_RUNNING, now, job_id, JOB_QUEUED, owner),
+            ).rowcount
+            self._conn.commit()
+        return started == 1
+
+    def claim_stale(self, owner: str, stale_before: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            # A single statement, so two processes never claim the same job
+            rows = self._conn.execute(
+                "UPDATE jobs SET owner = ?, heartbeat = ?, status = ?, "
+                "record = json_set(record, '$.status', ?) "
+                "WHERE status IN (?, ?) AND (owner IS NULL OR heartbeat < ?) "
+                "RETURNING record",
+                (
+                    owner,
+                    time.time(),
+                    JOB_QUEUED,
+                    JOB_QUEUED,
+                    JOB_QUEUED,
+                    JOB_RUNNING,
+                    stale_before,
+                ),
+            ).fetchall()
+            self._conn.commit()
+        jobs = [json.loads(row[0]) for row in rows]
+        return sorted(jobs, key=lambda job: job["created_at"])
+
+    def heartbeat(self, owner: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time(), owner, JOB_QUEUED, JOB_RUNNING),
+            )
+            self._conn.commit()
+
+    def release(self, owner: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET owner = NULL WHERE owner = ? AND status IN (?, ?)",
+                (owner, JOB_QUEUED, JOB_RUNNING),
+            )
+            self._conn.commit()
+
+    def purge(self, finished_before: str) -> int:
+        with self._lock:
+            rows = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) "
+                "AND json_extract(record, '$.updated_at') < ? RETURNING job_id",
+                (*FINISHED, finished_before),
+            ).fetchall()
+            self._conn.commit()
+        for (job_id,) in rows:
+            self.delete_payload(job_id)
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_store(backend: str) -> JobStore:
+    """Create the job store selected in settings"""
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore(settings.JOB_DB_PATH)
+    raise ValueError(f"Unsupported job backend: {backend}")
+
+
+class JobQueue:
+    """
+    Runs document processing jobs in the background.
+
+    Jobs are persisted in a JobStore and processed by a fixed number of
+    asyncio worker tasks. Each started queue is an owner in the store: it
+    keeps a heartbeat on its jobs and, on startup and then periodically,
+    takes over unfinished jobs left by owners that stopped or died. With
+    the SQLite backend this lets several server processes share the jobs
+    without running any of them twice. Finished jobs are deleted after
+    JOB_RETENTION seconds.
+    """
+
+    def __init__(
+        self, backend: str = "memory", workers: int = 2, max_queued: int = 100
+    ):
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.store: Optional[JobStore] = None
+        self.owner: Optional[str] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_store(self) -> JobStore:
+        if self.store is None:
+            self.store = create_job_store(self.backend)
+        return self.store
+
+    async def start(self):
+        """Start the worker tasks and resume unfinished jobs"""
+        if self._tasks:
+            return
+
+        self._ensure_store()
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._queue = asyncio.Queue()
+        await self._claim_stale()
+
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._heartbeat(), name="job-heartbeat"))
+        logger.info(f"Job queue started ({self.backend}, {self.workers} workers)")
+
+    async def stop(self):
+        """
+        Cancel the worker tasks and release the unfinished jobs, which are
+        resumed by another queue or on next start
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        if self.store is not None:
+            self.store.release(self.owner)
+            self.store.close()
+            self.store = None
+        logger.info("Job queue stopped")
+
+    async def _claim_stale(self):
+        stale_before = time.time() - settings.JOB_STALE_AFTER
+        claimed = await asyncio.to_thread(
+            self.store.claim_stale, self.owner, stale_before
+        )
+        for job in claimed:
+            self._queue.put_nowait(job["job_id"])
+        if claimed:
+            logger.info(f"Resumed {len(claimed)} unfinished jobs")
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.owner)
+                await self._claim_stale()
+                await self._purge()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {e}")
+
+    async def _purge(self):
+        if settings.JOB_RETENTION <= 0:
+            return
+        cutoff = datetime.now() - timedelta(seconds=settings.JOB_RETENTION)
+        purged = await asyncio.to_thread(self.store.purge, cutoff.isoformat())
+        if purged:
+            logger.info(f"Deleted {purged} finished jobs")
+
+    async def submit(
+        self,
+        file_content: DocumentSource,
+        filename: str,
+        content_hash: Optional[str] = None,
+        page_range: Optional[Tuple[int, Optional[int]]] = None,
+        version_of: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Queue a document for background processing.
+
+        The job store takes ownership of `file_content`; spooled upload files
+        are moved rather than copied.
+
+        Raises:
+            JobQueueFull: If `max_queued` jobs are already waiting
+        """
+        await self.start()
+        if self.queued >= self.max_queued:
+            raise JobQueueFull(f"Job queue is full ({self.queued} jobs waiting)")
+
+        now = datetime.now().isoformat()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": JOB_QUEUED,
+            "filename": filename,
+            "content_hash": content_hash,
+            "page_range": list(page_range) if page_range else None,
+            "version_of": version_of,
+            "created_at": now,
+            "updated_at": now,
+            "progress": {"stage": "queued", "pages_parsed": 0, "chunks_written": 0},
+            "result": None,
+            "error": None,
+        }
+        await asyncio.to_thread(
+            self._ensure_store().create, job, file_content, self.owner
+        )
+        self._queue.put_nowait(job["job_id"])
+        logger.info(f"Queued job {job['job_id']} for {filename}")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the current record for a job"""
+        return await asyncio.to_thread(self._ensure_store().get, job_id)
+
+    async def _update(self, job_id: str, **fields: Any):
+        fields["updated_at"] = datetime.now().isoformat()
+        await asyncio.to_thread(self.store.update, job_id, **fields)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Unexpected error in job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        # Imported here to avoid a circular import with the processor service
+        from app.services.document_processor import DocumentProcessorService
+
+        # Worker tasks outlive requests; correlate the job's log lines by its id
+        request_id.set(f"job-{job_id}")
+        started = await asyncio.to_thread(
+            self.store.start, job_id, self.owner, datetime.now().isoformat()
+        )
+        if not started:
+            logger.info(f"Job {job_id} was claimed by another worker, skipping")
+            return
+        job = await asyncio.to_thread(self.store.get, job_id)
+        payload = await asyncio.to_thread(self.store.load_payload, job_id)
+        if job is None or payload is None:
+            await self._update(job_id, status=JOB_FAILED, error="Job data is missing")
+            return
+
+        progress = dict(job["progress"])
+
+        async def report_progress(**fields: Any):
+            progress.update(fields)
+            await self._update(job_id, progress=dict(progress))
+
+        try:
+            with JOBS_RUNNING.track_inprogress():
+                result = await DocumentProcessorService.process_document(
+                    file_content=payload,
+                    filename=job["filename"],
+                    progress=report_progress,
+                    content_hash=job.get("content_hash"),
+                    page_range=(
+                        tuple(job["page_range"]) if job.get("page_range") else None
+                    ),
+                    version_of=job.get("version_of"),
+                    # Read through the content endpoint; job records keep
+                    # only the summary of the result
+                    include_content=False,
+                )
+            progress["stage"] = "completed"
+            await self._update(
+                job_id,
+                status=JOB_SUCCEEDED,
+                progress=progress,
+                result=result.model_dump(exclude={"content"}),
+            )
+            logger.info(f"Job {job_id} completed")
+        except asyncio.CancelledError:
+            # Keep the payload so the job is resumed on the next start
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            await self._update(job_id, status=JOB_FAILED, error=str(e))
+        await asyncio.to_thread(self.store.delete_payload, job_id)
+
+
+# Shared job queue used by the upload endpoint
+job_queue = JobQueue(
+    backend=settings.JOB_BACKEND,
+    workers=settings.JOB_WORKERS,
+    max_queued=settings.JOB_MAX_QUEUED,
+)
+JOBS_QUEUED.set_function(lambda: job_queue.queued)
@@ -0,0 +1,478 @@
+# app/services/search.py
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.text_index import (
+    DocumentTerms,
+    decode_positions,
+    document_passages,
+    highlight,
+    index_document,
+    parse_query,
+    phrase_documents,
+)
+
+logger = logging.getLogger("doc_processor")
+
+# BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# SQLite limits the number of parameters in one statement
+SQLITE_MAX_IDS_PER_QUERY = 500
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join("?" * count)
+
+
+class SearchIndex:
+    """
+    Full-text index of processed documents in a local SQLite database.
+
+    Postings hold the frequency of a term per document and are read without
+    touching positions, which are stored in a table of their own, in the
+    same term order, and only decoded to check phrases and pick snippets.
+    Documents are ranked with BM25 in NumPy over the postings of the query
+    terms; document lengths are cached in memory. Queries run in worker
+    threads, serialized by a lock, and the connection is reopened in forked
+    workers.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # Token count of every document by key; keys only ever increase, and
+        # re-indexed documents get a new one, so rows are loaded only once
+        self._lengths = np.zeros(0)
+        self._loaded_key = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_documents ("
+            "doc_key INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "document_id TEXT NOT NULL UNIQUE, document_type TEXT NOT NULL, "
+            "original_filename TEXT NOT NULL, length INTEGER NOT NULL)"
+        )
+        # Terms of each document, to find its postings when it is removed
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_document_terms ("
+            "doc_key INTEGER PRIMARY KEY, terms TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_postings ("
+            "term TEXT NOT NULL, doc_key INTEGER NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, doc_key)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_positions ("
+            "term TEXT NOT NULL, doc_key INTEGER NOT NULL, positions BLOB NOT NULL, "
+            "PRIMARY KEY (term, doc_key)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_passages ("
+            "doc_key INTEGER NOT NULL, first_token INTEGER NOT NULL, "
+            "type TEXT NOT NULL, item_index INTEGER NOT NULL, text TEXT NOT NULL, "
+            "PRIMARY KEY (doc_key, first_token)) WITHOUT ROWID"
+        )
+        conn.commit()
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not be used across fork (gunicorn preloads
+        # the app in the master); each process opens its own. Call with the
+        # lock held.
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = self._connect()
+            self._pid = os.getpid()
+            self._lengths = np.zeros(0)
+            self._loaded_key = 0
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, document_id: str) -> bool:
+        row = conn.execute(
+            "SELECT d.doc_key, t.terms FROM search_documents d "
+            "JOIN search_document_terms t ON t.doc_key = d.doc_key "
+            "WHERE d.document_id = ?",
+            (document_id,),
+        ).fetchone()
+        if row is None:
+            return False
+        doc_key, terms = row
+        keys = [(term, doc_key) for term in terms.split("\n") if term]
+        for table in ("search_postings", "search_positions"):
+            conn.executemany(
+                f"DELETE FROM {table} WHERE term = ? AND doc_key = ?", keys
+            )
+        for table in ("search_passages", "search_document_terms", "search_documents"):
+            conn.execute(f"DELETE FROM {table} WHERE doc_key = ?", (doc_key,))
+        return True
+
+    def _replace(
+        self,
+        document_id: str,
+        document_type: str,
+        original_filename: str,
+        terms: DocumentTerms,
+    ):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                self._delete(conn, document_id)
+                doc_key = conn.execute(
+                    "INSERT INTO search_documents "
+                    "(document_id, document_type, original_filename, length) "
+                    "VALUES (?, ?, ?, ?)",
+                    (document_id, document_type, original_filename, terms.length),
+                ).lastrowid
+                conn.execute(
+                    "INSERT INTO search_document_terms (doc_key, terms) VALUES (?, ?)",
+                    (doc_key, "\n".join(terms.terms)),
+                )
+                conn.executemany(
+                    "INSERT INTO search_postings (term, doc_key, tf) VALUES (?, ?, ?)",
+                    ((term, doc_key, tf) for term, (tf, _) in terms.terms.items()),
+                )
+                conn.executemany(
+                    "INSERT INTO search_positions (term, doc_key, positions) "
+                    "VALUES (?, ?, ?)",
+                    ((term, doc_key, data) for term, (_, data) in terms.terms.items()),
+                )
+                conn.executemany(
+                    "INSERT INTO search_passages "
+                    "(doc_key, first_token, type, item_index, text) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (doc_key, first, p.content_type, p.item_index, p.text)
+                        for first, p in terms.passages
+                    ),
+                )
+
+    def _index(
+        self,
+        document_id: str,
+        metadata: Dict[str, str],
+        content: Dict[str, List[Dict[str, Any]]],
+    ) -> int:
+        terms = index_document(document_passages(content))
+        self._replace(
+            document_id,
+            metadata.get("document_type", ""),
+            metadata.get("original_filename", ""),
+            terms,
+        )
+        return terms.length
+
+    async def index_document(
+        self,
+        document_id: str,
+        metadata: Dict[str, str],
+        content: Dict[str, List[Dict[str, Any]]],
+    ):
+        """
+        Index a document's wire-format content, replacing what was indexed
+        for it before. Failures are logged and never fail the upload.
+        """
+        start = time.perf_counter()
+        try:
+            tokens = await asyncio.to_thread(
+                self._index, document_id, metadata, content
+            )
+        except Exception as e:
+            logger.warning(f"Could not index document {document_id} for search: {e}")
+            return
+        logger.info(
+            f"Indexed document {document_id} for search: {tokens} tokens "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+    def _document_lengths(self, conn: sqlite3.Connection) -> np.ndarray:
+        rows = conn.execute(
+            "SELECT doc_key, length FROM search_documents WHERE doc_key > ?",
+            (self._loaded_key,),
+        ).fetchall()
+        if rows:
+            new = np.array(rows, dtype=np.int64)
+            self._loaded_key = int(new[:, 0].max())
+            if self._loaded_key >= len(self._lengths):
+                grown = np.zeros(max(self._loaded_key + 1, 2 * len(self._lengths)))
+                grown[: len(self._lengths)] = self._lengths
+                self._lengths = grown
+            self._lengths[new[:, 0]] = new[:, 1]
+        return self._lengths
+
+    @staticmethod
+    def _filter_keys(
+        conn: sqlite3.Connection,
+        document_ids: Optional[List[str]],
+        document_type: Optional[str],
+    ) -> List[int]:
+        """Keys of the indexed documents among `document_ids` and of the type"""
+        type_sql, type_params = "", []
+        if document_type:
+            type_sql, type_params = " AND document_type = ?", [document_type]
+        if not document_ids:
+            return [
+                key
+                for key, in conn.execute(
+                    "SELECT doc_key FROM search_documents WHERE 1 = 1" + type_sql,
+                    type_params,
+                )
+            ]
+        ids = list(dict.fromkeys(document_ids))
+        keys = []
+        for start in range(0, len(ids), SQLITE_MAX_IDS_PER_QUERY):
+            batch = ids[start : start + SQLITE_MAX_IDS_PER_QUERY]
+            keys.extend(
+                key
+                for key, in conn.execute(
+                    "SELECT doc_key FROM search_documents "
+                    f"WHERE document_id IN ({_placeholders(len(batch))})" + type_sql,
+                    [*batch, *type_params],
+                )
+            )
+        return keys
+
+    @staticmethod
+    def _positions(
+        conn: sqlite3.Connection, term: str, doc_keys: np.ndarray, frequency: int
+    ) -> List[Tuple[int, bytes]]:
+        """
+        Positions of a term in the documents among `doc_keys` (ascending),
+        given the number of documents containing the term
+        """
+        if len(doc_keys) * 4 >= frequency:
+            # Most of the term's documents: one range scan is cheaper than
+            # looking each of them up
+            rows = conn.execute(
+                "SELECT doc_key, positions FROM search_positions WHERE term = ?",
+                (term,),
+            ).fetchall()
+            return [
+                (key, data)
+                for (key, data), wanted in zip(
+                    rows, np.isin([key for key, _ in rows], doc_keys)
+                )
+                if wanted
+            ]
+        rows = []
+        for start in range(0, len(doc_keys), SQLITE_MAX_IDS_PER_QUERY):
+            batch = doc_keys[start : start + SQLITE_MAX_IDS_PER_QUERY].tolist()
+            rows.extend(
+                conn.execute(
+                    "SELECT doc_key, positions FROM search_positions WHERE term = ? "
+                    f"AND doc_key IN ({_placeholders(len(batch))})",
+                    (term, *batch),
+                )
+            )
+        return rows
+
+    @staticmethod
+    def _snippet(
+        conn: sqlite3.Connection, doc_key: int, terms: List[str]
+    ) -> Tuple[str, int, str]:
+        """Content type, item index and highlighted text of the best passage"""
+        starts = np.array(
+            [
+                first
+                for first, in conn.execute(
+                    "SELECT first_token FROM search_passages WHERE doc_key = ? "
+                    "ORDER BY first_token",
+                    (doc_key,),
+                )
+            ],
+            dtype=np.int64,
+        )
+        rows = conn.execute(
+            "SELECT positions FROM search_positions "
+            f"WHERE term IN ({_placeholders(len(terms))}) AND doc_key = ?",
+            (*terms, doc_key),
+        ).fetchall()
+        # The passage with the most distinct query terms, then the most hits
+        distinct = np.zeros(len(starts))
+        hits = np.zeros(len(starts))
+        for (data,) in rows:
+            passages = np.searchsorted(starts, decode_positions(data), side="right") - 1
+            hits += np.bincount(passages, minlength=len(starts))
+            distinct[np.unique(passages)] += 1
+        best = int(np.lexsort((-hits, -distinct))[0]) if len(starts) else 0
+        row = conn.execute(
+            "SELECT type, item_index, text FROM search_passages "
+            "WHERE doc_key = ? AND first_token = ?",
+            (doc_key, int(starts[best]) if len(starts) else 0),
+        ).fetchone()
+        if row is None:
+            return "", 0, ""
+        content_type, item_index, text = row
+        return (
+            content_type,
+            item_index,
+            highlight(text, set(terms), settings.SEARCH_SNIPPET_CHARS),
+        )
+
+    def _search(
+        self,
+        query: str,
+        document_ids: Optional[List[str]],
+        document_type: Optional[str],
+        offset: int,
+        limit: int,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        parsed = parse_query(query)
+        if not parsed.terms:
+            return 0, []
+
+        with self._lock:
+            conn = self._connection()
+            count, total_length = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM search_documents"
+            ).fetchone()
+            if not count:
+                return 0, []
+            lengths = self._document_lengths(conn)
+            avg_length = max(total_length / count, 1.0)
+
+            allowed = None
+            if document_ids or document_type:
+                allowed = np.array(
+                    self._filter_keys(conn, document_ids, document_type),
+                    dtype=np.int64,
+                )
+
+            # Score the postings of every term, then sum per document
+            matched: Dict[str, np.ndarray] = {}
+            frequency: Dict[str, int] = {}
+            keys_per_term, scores_per_term = [], []
+            for term in parsed.terms:
+                postings = np.array(
+                    conn.execute(
+                        "SELECT doc_key, tf FROM search_postings WHERE term = ?",
+                        (term,),
+                    ).fetchall(),
+                    dtype=np.int64,
+                ).reshape(-1, 2)
+                keys, tf = postings[:, 0], postings[:, 1].astype(float)
+                frequency[term] = len(keys)
+                idf = math.log(1 + (count - len(keys) + 0.5) / (len(keys) + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[keys] / avg_length)
+                scores = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                if allowed is not None:
+                    keep = np.isin(keys, allowed)
+                    keys, scores = keys[keep], scores[keep]
+                matched[term] = keys
+                keys_per_term.append(keys)
+                scores_per_term.append(scores)
+
+            keys, inverse = np.unique(
+                np.concatenate(keys_per_term), return_inverse=True
+            )
+            scores = np.bincount(inverse, weights=np.concatenate(scores_per_term))
+
+            # Phrases are checked on the positions of the documents holding
+            # all of their terms
+            for phrase in parsed.phrases:
+                candidates = keys
+                for term in phrase:
+                    candidates = candidates[np.isin(candidates, matched[term])]
+                found = phrase_documents(
+                    [
+                        self._positions(conn, term, candidates, frequency[term])
+                        for term in phrase
+                    ]
+                )
+                keep = np.isin(keys, found)
+                keys, scores = keys[keep], scores[keep]
+
+            total = len(keys)
+            # Highest scores first; ties in indexing order
+            top = min(offset + limit, total)
+            if top < total:
+                candidates = np.argpartition(-scores, top - 1)[:top]
+            else:
+                candidates = np.arange(total)
+            ranked = candidates[np.lexsort((keys[candidates], -scores[candidates]))]
+
+            results = []
+            for n in ranked[offset:top]:
+                key = int(keys[n])
+                document_id, document_type_, filename = conn.execute(
+                    "SELECT document_id, document_type, original_filename "
+                    "FROM search_documents WHERE doc_key = ?",
+                    (key,),
+                ).fetchone()
+                content_type, item_index, snippet = self._snippet(
+                    conn, key, parsed.terms
+                )
+                results.append(
+                    {
+                        "document_id": document_id,
+                        "score": round(float(scores[n]), 4),
+                        "original_filename": filename,
+                        "document_type": document_type_,
+                        "type": content_type,
+                        "item_index": item_index,
+                        "snippet": snippet,
+                    }
+                )
+        return total, results
+
+    async def search(
+        self,
+        query: str,
+        document_ids: Optional[List[str]] = None,
+        document_type: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 10,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Rank indexed documents for a query with BM25.
+
+        Documents match if they contain any query term; quoted phrases must
+        appear as written. Results can be limited to some `document_ids` or
+        one `document_type`. Each result carries the passage that best
+        matches the query, as a highlighted snippet with the content type and
+        index of the item it comes from.
+
+        Returns:
+            Tuple[int, List[Dict[str, Any]]]: Number of matching documents
+            and the results in [offset, offset + limit)
+        """
+        return await asyncio.to_thread(
+            self._search, query, document_ids, document_type, offset, limit
+        )
+
+
+def create_search_index() -> Optional[SearchIndex]:
+    """Create the search index selected in settings, or None if disabled"""
+    if not settings.SEARCH_ENABLED:
+        return None
+    return SearchIndex(settings.SEARCH_DB_PATH)
+
+
+# Shared index fed by the upload path and read by the search endpoint
+search_index = create_search_index()
@@ -0,0 +1,708 @@
+# app/services/storage.py
+import asyncio
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db import firebase
+from app.utils.chunking import collect_items
+
+logger = logging.getLogger("doc_processor")
+
+CONTENT_TYPES = ("pages", "paragraphs", "headers", "tables")
+
+# (document ID, metadata, chunks keyed by chunk ID)
+SavedDocument = Tuple[str, Dict[str, Any], Dict[str, Dict[str, Any]]]
+
+# SQLite limits the number of parameters in one statement
+SQLITE_MAX_IDS_PER_QUERY = 500
+
+
+class MissingChunkError(ValueError):
+    """A chunk listed in a document's manifest is not stored"""
+
+
+class DocumentNotFound(LookupError):
+    """The stored document an operation refers to does not exist"""
+
+
+def manifest_chunk_id(
+    document_id: str, content_type: str, entry: Dict[str, str]
+) -> str:
+    """
+    ID of the chunk a manifest entry refers to. Entries of documents stored
+    before versioning have no `chunk_id`; their ID follows from the index.
+    """
+    return (
+        entry.get("chunk_id") or f"{document_id}_{content_type}_{entry['chunk_index']}"
+    )
+
+
+def manifest_chunk_ids(
+    document_id: str, manifest: Dict[str, List[Dict[str, str]]]
+) -> List[str]:
+    """IDs of all chunks referenced by a document's chunk manifest"""
+    return [
+        manifest_chunk_id(document_id, content_type, entry)
+        for content_type, entries in manifest.items()
+        for entry in entries
+    ]
+
+
+def _chunk_ids_for_range(
+    document_id: str,
+    content_type: str,
+    manifest: List[Dict[str, str]],
+    offset: int,
+    limit: Optional[int],
+) -> List[Tuple[str, int, int]]:
+    """
+    Select the chunks holding items [offset, offset + limit) with their
+    start index and stored size (0 if unknown)
+    """
+    end = None if limit is None else offset + limit
+    selected = []
+    for entry in manifest:
+        start = int(entry["start"])
+        if start + int(entry["count"]) <= offset:
+            continue
+        if end is not None and start >= end:
+            break
+        selected.append(
+            (
+                manifest_chunk_id(document_id, content_type, entry),
+                start,
+                int(entry.get("byte_size", 0)),
+            )
+        )
+    return selected
+
+
+def _group_by_size(
+    selected: List[Tuple[str, int, int]], group_bytes: int
+) -> List[List[str]]:
+    """Group chunk IDs into reads of roughly `group_bytes` each"""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_size = 0
+    for chunk_id, _, byte_size in selected:
+        if current and current_size + byte_size > group_bytes:
+            groups.append(current)
+            current, current_size = [], 0
+        current.append(chunk_id)
+        current_size += byte_size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class DocumentStorage(ABC):
+    """
+    Persistence for processed documents, their content chunks and the
+    content-hash index used for deduplication.
+
+    All operations are coroutines; backends doing blocking I/O run it in a
+    worker thread. Paginated content reads are built on top of the chunk
+    reads and shared by all backends.
+    """
+
+    async def initialize(self):
+        """Prepare the backend; called once on application startup"""
+
+    async def close(self):
+        """Release any resources held by the backend"""
+
+    @abstractmethod
+    async def save_document_bulk(
+        self, document_id: str, data: Dict[str, Any], chunks: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Save document metadata and all of its chunks.
+
+        The metadata must only become visible once every chunk is stored.
+
+        Returns:
+            Dict[str, Any]: Write statistics (batches, writes, retries, latency_ms)
+        """
+
+    async def save_documents_bulk(
+        self, documents: List[SavedDocument]
+    ) -> Dict[str, Any]:
+        """
+        Save several documents at once. Backends that can share write
+        batches between documents override this.
+
+        Returns:
+            Dict[str, Any]: Combined write statistics
+        """
+        results = await asyncio.gather(
+            *(self.save_document_bulk(*document) for document in documents)
+        )
+        return {
+            "batches": sum(r["batches"] for r in results),
+            "writes": sum(r["writes"] for r in results),
+            "retries": sum(r["retries"] for r in results),
+            "latency_ms": max((r["latency_ms"] for r in results), default=0),
+        }
+
+    @abstractmethod
+    async def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Return a document's metadata, or None if it does not exist"""
+
+    @abstractmethod
+    async def get_chunks(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the stored chunks among `chunk_ids`, keyed by chunk ID"""
+
+    @abstractmethod
+    async def query_chunks(
+        self, document_id: str, content_type: str
+    ) -> List[Dict[str, Any]]:
+        """Return all chunks of one type for a document, ordered by chunk index"""
+
+    @abstractmethod
+    async def delete_document(self, document_id: str) -> bool:
+        """Delete a document and its chunks; False if it did not exist"""
+
+    @abstractmethod
+    async def delete_chunks(self, chunk_ids: List[str]):
+        """Delete chunks no longer referenced by their document"""
+
+    @abstractmethod
+    async def get_document_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Look up the document previously processed for a content hash"""
+
+    @abstractmethod
+    async def save_document_hash(self, content_hash: str, data: Dict[str, Any]):
+        """Record the document produced for a content hash"""
+
+    async def _read_content_type(
+        self,
+        document_id: str,
+        content_type: str,
+        metadata: Dict[str, Any],
+        offset: int,
+        limit: Optional[int],
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Read one content type, fetching only the chunks the requested page needs"""
+        manifest = metadata.get("chunks", {}).get(content_type)
+        total = int(metadata["metadata"].get(f"total_{content_type}", 0))
+        end = None if limit is None else offset + limit
+
+        if manifest is None:
+            # Documents stored before chunk manifests were recorded
+            chunks = await self.query_chunks(document_id, content_type)
+            items = collect_items(content_type, chunks)
+            return items[offset:end], len(items)
+
+        selected = _chunk_ids_for_range(
+            document_id, content_type, manifest, offset, limit
+        )
+        if not selected:
+            return [], total
+
+        # Large pages are fetched as several size-balanced reads in parallel
+        groups = _group_by_size(selected, settings.CONTENT_FETCH_GROUP_BYTES)
+        results = await asyncio.gather(*(self.get_chunks(group) for group in groups))
+        fetched = {
+            chunk_id: chunk for result in results for chunk_id, chunk in result.items()
+        }
+
+        ordered = []
+        for chunk_id, _, _ in selected:
+            chunk = fetched.get(chunk_id)
+            if chunk is None:
+                raise MissingChunkError(f"Chunk {chunk_id} is missing")
+            ordered.append(chunk)
+
+        items = collect_items(content_type, ordered)
+        first_start = selected[0][1]
+        return (
+            items[offset - first_start : None if end is None else end - first_start],
+            total,
+        )
+
+    async def get_document_content(
+        self,
+        document_id: str,
+        content_types: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read a page of a document's content from its chunks.
+
+        Each content type is fetched concurrently, and only the chunks that
+        overlap items [offset, offset + limit) are read.
+
+        Args:
+            document_id (str): ID of the document
+            content_types (Optional[List[str]]): Types to read (all if None)
+            offset (int): Index of the first item to return per type
+            limit (Optional[int]): Maximum number of items per type (all if None)
+            metadata (Optional[Dict[str, Any]]): Already loaded metadata document
+
+        Returns:
+            Optional[Dict[str, Any]]: Metadata, content and per-type totals,
+            or None if the document does not exist
+        """
+        if metadata is None:
+            metadata = await self.get_document(document_id)
+        if metadata is None:
+            return None
+
+        content_types = list(content_types or CONTENT_TYPES)
+        results = await asyncio.gather(
+            *(
+                self._read_content_type(document_id, t, metadata, offset, limit)
+                for t in content_types
+            )
+        )
+
+        return {
+            "document_id": document_id,
+            "metadata": metadata["metadata"],
+            "content": {t: items for t, (items, _) in zip(content_types, results)},
+            "totals": {t: total for t, (_, total) in zip(content_types, results)},
+            "offset": offset,
+            "limit": limit,
+        }
+
+
+class FirestoreStorage(DocumentStorage):
+    """
+    Storage in Cloud Firestore, or the Firestore emulator if configured,
+    through a shared pool of async clients.
+    """
+
+    async def initialize(self):
+        firebase.initialize_firebase()
+        if settings.FIRESTORE_WARMUP:
+            await firebase.warm_up_firestore()
+
+    async def close(self):
+        await firebase.close_firestore_clients()
+
+    async def save_document_bulk(
+        self, document_id: str, data: Dict[str, Any], chunks: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        return await firebase.save_document_bulk(document_id, data, chunks)
+
+    async def save_documents_bulk(
+        self, documents: List[SavedDocument]
+    ) -> Dict[str, Any]:
+        return await firebase.save_documents_bulk(documents)
+
+    async def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        return await firebase.get_document_metadata(document_id)
+
+    async def get_chunks(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return await firebase.get_document_chunks(chunk_ids)
+
+    async def query_chunks(
+        self, document_id: str, content_type: str
+    ) -> List[Dict[str, Any]]:
+        return await firebase.query_document_chunks(document_id, content_type)
+
+    async def delete_document(self, document_id: str) -> bool:
+        return await firebase.delete_document(document_id)
+
+    async def delete_chunks(self, chunk_ids: List[str]):
+        await firebase.delete_document_chunks(chunk_ids)
+
+    async def get_document_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        return await firebase.get_document_hash(content_hash)
+
+    async def save_document_hash(self, content_hash: str, data: Dict[str, Any]):
+        await firebase.save_document_hash(content_hash, data)
+
+
+class InMemoryStorage(DocumentStorage):
+    """Storage in process memory for tests and benchmarks; lost on restart."""
+
+    def __init__(self):
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._chunks: Dict[str, Dict[str, Any]] = {}
+        self._hashes: Dict[str, Dict[str, Any]] = {}
+
+    async def save_document_bulk(
+        self, document_id: str, data: Dict[str, Any], chunks: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        created_at = _timestamp()
+        # Copies keep later changes by the caller out of the stored records
+        for chunk_id, chunk in chunks.items():
+            self._chunks[chunk_id] = {**copy.deepcopy(chunk), "created_at": created_at}
+        self._documents[document_id] = {**copy.deepcopy(data), "created_at": created_at}
+        return {
+            "batches": 1,
+            "writes": len(chunks) + 1,
+            "retries": 0,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    async def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._documents.get(document_id))
+
+    async def get_chunks(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return copy.deepcopy(
+            {c: self._chunks[c] for c in chunk_ids if c in self._chunks}
+        )
+
+    async def query_chunks(
+        self, document_id: str, content_type: str
+    ) -> List[Dict[str, Any]]:
+        chunks = [
+            copy.deepcopy(chunk)
+            for chunk in self._chunks.values()
+            if chunk.get("document_id") == document_id
+            and chunk.get("type") == content_type
+        ]
+        return sorted(chunks, key=lambda chunk: int(chunk["chunk_index"]))
+
+    async def delete_document(self, document_id: str) -> bool:
+        if self._documents.pop(document_id, None) is None:
+            return False
+        for chunk_id in [
+            chunk_id
+            for chunk_id, chunk in self._chunks.items()
+            if chunk.get("document_id") == document_id
+        ]:
+            del self._chunks[chunk_id]
+        return True
+
+    async def delete_chunks(self, chunk_ids: List[str]):
+        for chunk_id in chunk_ids:
+            self._chunks.pop(chunk_id, None)
+
+    async def get_document_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        entry = self._hashes.get(content_hash)
+        return dict(entry) if entry else None
+
+    async def save_document_hash(self, content_hash: str, data: Dict[str, Any]):
+        self._hashes[content_hash] = {**data, "created_at": _timestamp()}
+
+    def clear(self):
+        """Drop all stored documents and hashes"""
+        self._documents.clear()
+        self._chunks.clear()
+        self._hashes.clear()
+
+
+def _chunk_record(record: str, compressed_content: Optional[bytes]) -> Dict[str, Any]:
+    """Chunk stored by SQLiteStorage, with its compressed content restored"""
+    chunk = json.loads(record)
+    if compressed_content is not None:
+        chunk["compressed_content"] = compressed_content
+    return chunk
+
+
+class SQLiteStorage(DocumentStorage):
+    """
+    Storage in a local SQLite database for single-node deployments and
+    load tests that should not depend on Firebase.
+
+    Records are stored as JSON, except the compressed content of chunks,
+    which is kept in a BLOB column. A document and its chunks are written
+    in a single transaction, so readers never see a partially saved
+    document.
+    Queries run in worker threads, serialized by a lock. The connection is
+    opened on first use in each process.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the database consistent; fsync on every commit is not needed
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, record TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "chunk_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, "
+            "type TEXT NOT NULL, chunk_index INTEGER NOT NULL, record TEXT NOT NULL, "
+            "compressed_content BLOB)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+        if "compressed_content" not in columns:
+            # Databases created before chunks could be compressed
+            conn.execute("ALTER TABLE chunks ADD COLUMN compressed_content BLOB")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS chunks_document "
+            "ON chunks (document_id, type, chunk_index)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS document_hashes ("
+            "content_hash TEXT PRIMARY KEY, record TEXT NOT NULL)"
+        )
+        conn.commit()
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not be used across fork (gunicorn preloads
+        # the app in the master); each process opens its own. Call with the
+        # lock held.
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = self._connect()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _fetch(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def _write(self, statements: List[Tuple[str, List[Tuple]]]) -> List[int]:
+        """
+        Run statements with their parameter rows in one transaction and
+        return the number of rows each one changed
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                return [
+                    conn.executemany(sql, rows).rowcount for sql, rows in statements
+                ]
+
+    async def initialize(self):
+        # Open (or reopen after close()) the connection of this process
+        with self._lock:
+            self._connection()
+
+    async def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    async def save_document_bulk(
+        self, document_id: str, data: Dict[str, Any], chunks: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        created_at = _timestamp()
+        try:
+            chunk_rows = [
+                (
+                    chunk_id,
+                    chunk["document_id"],
+                    chunk["type"],
+                    int(chunk["chunk_index"]),
+                    json.dumps(
+                        {
+                            **chunk,
+                            "compressed_content": None,
+                            "created_at": created_at,
+                        },
+                        default=str,
+                    ),
+                    chunk.get("compressed_content"),
+                )
+                for chunk_id, chunk in chunks.items()
+            ]
+            record = json.dumps({**data, "created_at": created_at}, default=str)
+            await asyncio.to_thread(
+                self._write,
+                [
+                    (
+                        "INSERT OR REPLACE INTO chunks (chunk_id, document_id, "
+                        "type, chunk_index, record, compressed_content) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        chunk_rows,
+                    ),
+                    # Written last in the same transaction as its chunks
+                    (
+                        "INSERT OR REPLACE INTO documents (document_id, record) "
+                        "VALUES (?, ?)",
+                        [(document_id, record)],
+                    ),
+                ],
+            )
+        except Exception as e:
+            logger.error(f"Error saving document {document_id} to SQLite: {e}")
+            raise
+        stats = {
+            "batches": 1,
+            "writes": len(chunks) + 1,
+            "retries": 0,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        logger.info(
+            f"Document {document_id} saved to SQLite: {stats['writes']} writes "
+            f"in {stats['latency_ms']} ms"
+        )
+        return stats
+
+    async def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT record FROM documents WHERE document_id = ?",
+            (document_id,),
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    async def get_chunks(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        chunks = {}
+        for start in range(0, len(chunk_ids), SQLITE_MAX_IDS_PER_QUERY):
+            ids = tuple(chunk_ids[start : start + SQLITE_MAX_IDS_PER_QUERY])
+            rows = await asyncio.to_thread(
+                self._fetch,
+                "SELECT chunk_id, record, compressed_content FROM chunks "
+                f"WHERE chunk_id IN ({', '.join('?' * len(ids))})",
+                ids,
+            )
+            chunks.update((row[0], _chunk_record(*row[1:])) for row in rows)
+        return chunks
+
+    async def query_chunks(
+        self, document_id: str, content_type: str
+    ) -> List[Dict[str, Any]]:
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT record, compressed_content FROM chunks "
+            "WHERE document_id = ? AND type = ? ORDER BY chunk_index",
+            (document_id, content_type),
+        )
+        return [_chunk_record(*row) for row in rows]
+
+    async def delete_document(self, document_id: str) -> bool:
+        deleted, _ = await asyncio.to_thread(
+            self._write,
+            [
+                ("DELETE FROM documents WHERE document_id = ?", [(document_id,)]),
+                ("DELETE FROM chunks WHERE document_id = ?", [(document_id,)]),
+            ],
+        )
+        return deleted > 0
+
+    async def delete_chunks(self, chunk_ids: List[str]):
+        await asyncio.to_thread(
+            self._write,
+            [
+                (
+                    "DELETE FROM chunks WHERE chunk_id = ?",
+                    [(chunk_id,) for chunk_id in chunk_ids],
+                )
+            ],
+        )
+
+    async def get_document_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT record FROM document_hashes WHERE content_hash = ?",
+            (content_hash,),
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    async def save_document_hash(self, content_hash: str, data: Dict[str, Any]):
+        record = json.dumps({**data, "created_at": _timestamp()}, default=str)
+        await asyncio.to_thread(
+            self._write,
+            [
+                (
+                    "INSERT OR REPLACE INTO document_hashes (content_hash, record) "
+                    "VALUES (?, ?)",
+                    [(content_hash, record)],
+                )
+            ],
+        )
+
+
+class WriteCoalescer:
+    """
+    Gathers documents saved at about the same time and writes them with a
+    single save_documents_bulk call, so small documents share write batches.
+
+    A group is written once `window` seconds have passed since its first
+    document arrived, or as soon as it holds `max_writes` writes. Each caller
+    waits for the write of its own group; if that write fails, every
+    document in the group fails with the same error.
+    """
+
+    def __init__(self, backend: DocumentStorage, window: float, max_writes: int = 500):
+        self.backend = backend
+        self.window = window
+        self.max_writes = max_writes
+        self._pending: List[Tuple[SavedDocument, asyncio.Future]] = []
+        self._pending_writes = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._writes: set = set()
+
+    async def save(
+        self, document_id: str, data: Dict[str, Any], chunks: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Queue a document for the next group write and wait for it"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(((document_id, data, chunks), future))
+        self._pending_writes += len(chunks) + 1
+        if self._pending_writes >= self.max_writes:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._pending_writes = self._pending, [], 0
+        if pending:
+            task = asyncio.create_task(self._write(pending))
+            # Keep a reference so the task is not garbage collected mid-write
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _write(self, pending: List[Tuple[SavedDocument, asyncio.Future]]):
+        try:
+            stats = await self.backend.save_documents_bulk(
+                [document for document, _ in pending]
+            )
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in pending:
+            if not future.done():
+                future.set_result({**stats, "documents": len(pending)})
+
+
+def create_storage(backend: str) -> DocumentStorage:
+    """Create the storage backend selected in settings"""
+    if backend == "firestore":
+        return FirestoreStorage()
+    if backend == "sqlite":
+        return SQLiteStorage(settings.STORAGE_DB_PATH)
+    if backend == "memory":
+        return InMemoryStorage()
+    raise ValueError(f"Unsupported storage backend: {backend}")
+
+
+# Shared storage used by the upload, dedup and read paths
+storage = create_storage(settings.STORAGE_BACKEND)
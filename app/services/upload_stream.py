@@ -0,0 +1,97 @@
+# app/services/upload_stream.py
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.responses import dumps
+from app.schemas.document import DocumentProcessResponse
+from app.services.document_processor import DocumentProcessorService
+from app.services.storage import DocumentNotFound
+from app.services.worker_pool import WorkerPoolSaturated, WorkerPoolTimeout
+from app.utils.uploads import SpooledUpload
+
+logger = logging.getLogger("doc_processor")
+
+
+def ndjson_line(record: Dict[str, Any]) -> bytes:
+    return dumps(record) + b"\n"
+
+
+def result_line(response: DocumentProcessResponse) -> bytes:
+    """Closing line of a stream: the upload result without content"""
+    fields = dict(response)
+    fields.pop("content", None)
+    return ndjson_line({"type": "result", **fields})
+
+
+def _error(e: Exception) -> Tuple[int, str]:
+    """Status code and detail the upload endpoint returns for an error"""
+    if isinstance(e, DocumentNotFound):
+        return 404, "Document not found"
+    if isinstance(e, WorkerPoolSaturated):
+        logger.warning(f"Rejected upload, extraction pool saturated: {e}")
+        return 503, "Server is busy, try again later"
+    if isinstance(e, WorkerPoolTimeout):
+        logger.error(f"Document extraction timed out: {e}")
+        return 504, "Document processing timed out"
+    if isinstance(e, ValueError):
+        logger.error(f"Document processing error: {e}")
+        return 422, str(e)
+    logger.error(f"Unexpected error in streamed upload: {e}")
+    return 500, "An unexpected error occurred"
+
+
+async def stream_upload(
+    upload: SpooledUpload,
+    filename: str,
+    content_hash: str,
+    page_range: Optional[Tuple[int, Optional[int]]] = None,
+    version_of: Optional[str] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Process an upload and yield its content as NDJSON lines while it is
+    extracted: a `metadata` line, then `pages`, `paragraphs`, `headers` and
+    `tables` lines of up to CONTENT_PAGE_SIZE items each, and finally a
+    `result` line (as the upload endpoint's response, without content) or
+    an `error` line with the status code and detail the endpoint would
+    have returned.
+
+    At most UPLOAD_STREAM_BUFFER lines are buffered for a slow client;
+    extraction waits for it beyond that, so memory stays bounded. Takes
+    ownership of the upload and closes it; if the consumer stops early
+    (client disconnect) processing is cancelled.
+    """
+    lines: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.UPLOAD_STREAM_BUFFER))
+
+    async def emit(record: Dict[str, Any]):
+        await lines.put(ndjson_line(record))
+
+    async def run():
+        try:
+            response = await DocumentProcessorService.process_document(
+                file_content=upload.source(),
+                filename=filename,
+                content_hash=content_hash,
+                page_range=page_range,
+                version_of=version_of,
+                include_content=False,
+                emit=emit,
+            )
+            last = result_line(response)
+        except Exception as e:
+            status_code, detail = _error(e)
+            last = ndjson_line(
+                {"type": "error", "status_code": status_code, "detail": detail}
+            )
+        await lines.put(last)
+        await lines.put(None)
+
+    task = asyncio.create_task(run())
+    try:
+        while (line := await lines.get()) is not None:
+            yield line
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        upload.close()
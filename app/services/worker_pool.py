@@ -0,0 +1,201 @@
+# app/services/worker_pool.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import EXTRACTION_PENDING
+from app.core.profiling import current_session, run_profiled
+
+logger = logging.getLogger("doc_processor")
+
+
+class WorkerPoolSaturated(RuntimeError):
+    """Raised when the extraction queue is full and a job cannot be accepted."""
+
+
+class WorkerPoolTimeout(TimeoutError):
+    """Raised when an extraction job does not finish within the job timeout."""
+
+
+class ExtractionWorkerPool:
+    """
+    Bounded executor for CPU-bound document extraction.
+
+    Jobs run in a process pool by default so that parsing never blocks the
+    event loop or competes with it for the GIL. Worker processes are recycled
+    after a fixed number of jobs to contain memory growth in the parsers.
+
+    Recycling swaps in a fresh executor once the current one has handled
+    `max_jobs_per_worker * max_workers` jobs; the old executor finishes its
+    in-flight jobs and exits. (`max_tasks_per_child` is not used because it
+    can deadlock on Python 3.11 when a worker is replaced.)
+
+    A job that times out cannot be stopped once a worker has picked it up,
+    so it keeps counting against `capacity` until it actually finishes.
+    """
+
+    def __init__(
+        self,
+        mode: str = "process",
+        max_workers: int = 0,
+        max_queue_size: int = 32,
+        job_timeout: float = 120.0,
+        max_jobs_per_worker: int = 0,
+    ):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unsupported extraction pool mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue_size = max(0, max_queue_size)
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._executor: Optional[Executor] = None
+        self._submitted = 0
+        self._pending = 0
+        # Jobs finish on worker threads, which release their slot themselves
+        self._pending_lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of jobs running or waiting at any time"""
+        return self.max_workers + self.max_queue_size
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs currently running or waiting for a worker"""
+        return self._pending
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def _job_done(self, future: Optional[Future] = None):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def _create_executor(self) -> Executor:
+        if self.mode == "thread":
+            return ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="extraction"
+            )
+
+        # Spawn rather than fork: the parent holds gRPC channels and loop threads
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _recycle_if_needed(self):
+        """Replace process workers once they have handled their share of jobs"""
+        if self.mode != "process" or self.max_jobs_per_worker <= 0:
+            return
+        if self._submitted < self.max_jobs_per_worker * self.max_workers:
+            return
+
+        old_executor = self._executor
+        self._executor = self._create_executor()
+        self._submitted = 0
+        # Running jobs complete normally; the old workers exit afterwards
+        old_executor.shutdown(wait=False)
+        logger.info("Extraction pool workers recycled")
+
+    def start(self):
+        """Create the underlying executor. Safe to call more than once."""
+        if self._executor is None:
+            self._executor = self._create_executor()
+            self._submitted = 0
+            logger.info(
+                f"Extraction pool started ({self.mode}, {self.max_workers} workers, "
+                f"queue size {self.max_queue_size})"
+            )
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and release all workers"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logger.info("Extraction pool stopped")
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run fn(*args) on a pool worker and return its result.
+
+        While a document is being profiled, fn runs under the profiler on
+        the worker and its report is added to the profile session.
+
+        Args:
+            fn: Picklable top-level callable (process mode) or any callable
+            *args: Arguments passed to fn
+
+        Raises:
+            WorkerPoolSaturated: If the pool already holds `capacity` jobs
+            WorkerPoolTimeout: If the job exceeds `job_timeout` seconds
+        """
+        if self._executor is None:
+            self.start()
+
+        if self._pending >= self.capacity:
+            raise WorkerPoolSaturated(
+                f"Extraction queue is full ({self._pending} jobs pending)"
+            )
+
+        self._recycle_if_needed()
+        with self._pending_lock:
+            self._pending += 1
+        self._submitted += 1
+        executor = self._executor
+        session = current_session()
+        try:
+            if session is not None:
+                future = executor.submit(
+                    run_profiled, session.mode, session.directory, fn, *args
+                )
+            else:
+                future = executor.submit(fn, *args)
+        except BaseException:
+            self._job_done()
+            raise
+        # Released when the job ends on its worker, not when the caller
+        # stops waiting for it
+        future.add_done_callback(self._job_done)
+
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.job_timeout
+            )
+            return session.collect(result) if session is not None else result
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise WorkerPoolTimeout(
+                f"Extraction did not finish within {self.job_timeout} seconds"
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); replace the pool for later jobs
+            if self._executor is executor:
+                logger.warning("Extraction pool is broken, restarting it")
+                self.shutdown(wait=False)
+                self.start()
+            raise
+
+
+# Shared pool instance used by the document processor
+extraction_pool = ExtractionWorkerPool(
+    mode=settings.EXTRACTION_POOL_MODE,
+    max_workers=settings.EXTRACTION_POOL_WORKERS,
+    max_queue_size=settings.EXTRACTION_QUEUE_SIZE,
+    job_timeout=settings.EXTRACTION_JOB_TIMEOUT,
+    max_jobs_per_worker=settings.EXTRACTION_WORKER_MAX_JOBS,
+)
+EXTRACTION_PENDING.set_function(lambda: extraction_pool.pending)
@@ -0,0 +1,73 @@
+# app/utils/chunk_codec.py
+import functools
+import logging
+import zlib
+from typing import Any, Dict, List, Optional
+
+import msgpack
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("doc_processor")
+
+# Codec markers stored in the `codec` field of compressed chunks. The
+# number is the version of the payload: a msgpack array of content items.
+ZLIB_CODEC = "msgpack+zlib/1"
+ZSTD_CODEC = "msgpack+zstd/1"
+
+COMPRESSION_CODECS = {"zlib": ZLIB_CODEC, "zstd": ZSTD_CODEC}
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+class UnknownCodec(ValueError):
+    """A chunk was stored with a codec this build cannot decode"""
+
+
+@functools.lru_cache(maxsize=None)
+def compression_codec(name: str) -> Optional[str]:
+    """
+    Codec marker for a CHUNK_COMPRESSION setting (`none`, `zlib` or
+    `zstd`), or None for uncompressed chunks. zstd falls back to zlib when
+    the zstandard package is not installed.
+    """
+    if name == "none":
+        return None
+    if name not in COMPRESSION_CODECS:
+        raise ValueError(f"Unknown chunk compression: {name}")
+    if name == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed; compressing chunks with zlib")
+        return ZLIB_CODEC
+    return COMPRESSION_CODECS[name]
+
+
+def encode_content(codec: str, items: List[Dict[str, Any]]) -> bytes:
+    """Pack and compress the content items of a chunk"""
+    packed = msgpack.packb(items, use_bin_type=True)
+    if codec == ZLIB_CODEC:
+        return zlib.compress(packed, ZLIB_LEVEL)
+    if codec == ZSTD_CODEC and zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(packed)
+    raise UnknownCodec(f"Cannot encode chunks with codec {codec}")
+
+
+def decode_content(codec: str, data: bytes) -> List[Dict[str, Any]]:
+    """Decompress and unpack content encoded by encode_content"""
+    if codec == ZLIB_CODEC:
+        packed = zlib.decompress(data)
+    elif codec == ZSTD_CODEC and zstandard is not None:
+        packed = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raise UnknownCodec(f"Cannot decode chunks with codec {codec}")
+    return msgpack.unpackb(packed, raw=False)
+
+
+def chunk_content(chunk: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Content items of a stored chunk, compressed or not"""
+    if not chunk.get("codec"):
+        return chunk["content"]
+    return decode_content(chunk["codec"], bytes(chunk["compressed_content"]))
@@ -0,0 +1,228 @@
+# app/utils/chunking.py
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import AbstractSet, Any, Dict, Iterable, List, Optional
+
+from app.utils.chunk_codec import chunk_content
+
+# Firestore rejects documents larger than 1 MiB; keep room for the chunk's
+# own fields (IDs, counters) on top of its content.
+FIRESTORE_MAX_DOCUMENT_SIZE = 1024 * 1024
+MAX_CHUNK_CONTENT_SIZE = FIRESTORE_MAX_DOCUMENT_SIZE - 16 * 1024
+
+# Field holding the bulk of each content type, used to split oversized items
+SPLIT_FIELDS = {
+    "pages": "content",
+    "paragraphs": "text",
+    "headers": "text",
+    "tables": "rows",
+}
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimated Firestore storage size of a value in bytes.
+
+    Follows Firestore's size rules: strings count their UTF-8 length plus
+    one, map keys count the same way, bytes their length, numbers eight
+    bytes and booleans and nulls one.
+    """
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(
+            len(key.encode("utf-8")) + 1 + estimate_size(item)
+            for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    if value is None or isinstance(value, bool):
+        return 1
+    return 8
+
+
+@dataclass
+class PlannedChunk:
+    """
+    Items stored together in one chunk document.
+
+    `start` is the index of the first item. A chunk holding one piece of
+    an item that was too large on its own has `part` (1-based) and
+    `total_parts` set; its `items` is that single piece.
+    """
+
+    start: int
+    items: List[Dict[str, Any]]
+    byte_size: int
+    part: Optional[int] = None
+    total_parts: Optional[int] = None
+
+
+def _split_text(text: str, budget: int) -> List[str]:
+    """Cut text into pieces of at most `budget` UTF-8 bytes, on character boundaries"""
+    encoded = text.encode("utf-8")
+    pieces = []
+    position = 0
+    while position < len(encoded):
+        end = min(position + max(1, budget), len(encoded))
+        # Never cut inside a multi-byte character
+        while end < len(encoded) and end > position + 1 and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        pieces.append(encoded[position:end].decode("utf-8"))
+        position = end
+    return pieces or [""]
+
+
+def _split_rows(rows: List[Any], budget: int) -> List[List[Any]]:
+    """Group table rows into runs whose estimated size stays within `budget`"""
+    groups: List[List[Any]] = []
+    current: List[Any] = []
+    current_size = 0
+    for row in rows:
+        size = estimate_size(row)
+        if current and current_size + size > budget:
+            groups.append(current)
+            current, current_size = [], 0
+        current.append(row)
+        current_size += size
+    if current or not groups:
+        groups.append(current)
+    return groups
+
+
+def split_item(
+    content_type: str, item: Dict[str, Any], target_bytes: int
+) -> List[Dict[str, Any]]:
+    """
+    Split one oversized item into pieces of roughly `target_bytes` each.
+
+    Every piece keeps the item's other fields; tables are split by rows
+    and text items by their text. Items of unknown types are not split.
+    """
+    field = SPLIT_FIELDS.get(content_type)
+    value = item.get(field) if field else None
+    if value is None:
+        return [item]
+
+    rest = {key: val for key, val in item.items() if key != field}
+    budget = target_bytes - estimate_size(rest) - len(field) - 2
+    if isinstance(value, str):
+        pieces = _split_text(value, budget)
+    else:
+        pieces = _split_rows(value, budget)
+    return [{**rest, field: piece} for piece in pieces]
+
+
+def merge_parts(content_type: str, parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reassemble an item from the pieces produced by split_item"""
+    field = SPLIT_FIELDS[content_type]
+    merged = dict(parts[0])
+    if isinstance(merged[field], str):
+        merged[field] = "".join(part[field] for part in parts)
+    else:
+        merged[field] = [row for part in parts for row in part[field]]
+    return merged
+
+
+def plan_chunks(
+    content_type: str,
+    items: Iterable[Dict[str, Any]],
+    target_bytes: int,
+    anchors: AbstractSet[int] = frozenset(),
+) -> List[PlannedChunk]:
+    """
+    Pack items into chunks of up to `target_bytes` of estimated content.
+
+    Items are kept in order. An item larger than the target on its own is
+    split into continuation chunks, one piece per chunk; a ValueError is
+    raised if a piece that cannot be split further, such as a single table
+    row, is too large for a Firestore document. A new chunk is
+    also started at every item index in `anchors`; passing the chunk starts
+    of a previous version keeps chunk boundaries in place after an edit, so
+    the chunks that follow it come out identical.
+    """
+    target_bytes = max(1024, min(target_bytes, MAX_CHUNK_CONTENT_SIZE))
+    chunks: List[PlannedChunk] = []
+    current: List[Dict[str, Any]] = []
+    current_size = 0
+    current_start = 0
+
+    for index, item in enumerate(items):
+        size = estimate_size(item)
+
+        if current and (current_size + size > target_bytes or index in anchors):
+            chunks.append(PlannedChunk(current_start, current, current_size))
+            current, current_size = [], 0
+
+        if size > target_bytes:
+            pieces = split_item(content_type, item, target_bytes)
+            largest = max(estimate_size(piece) for piece in pieces)
+            if largest > MAX_CHUNK_CONTENT_SIZE:
+                unit = "row of the item" if content_type == "tables" else "item"
+                raise ValueError(
+                    f"Cannot store {content_type} item {index}: a single {unit} "
+                    f"is {largest} bytes, over the {MAX_CHUNK_CONTENT_SIZE} bytes "
+                    "a chunk can hold"
+                )
+            if len(pieces) > 1:
+                for number, piece in enumerate(pieces, start=1):
+                    chunks.append(
+                        PlannedChunk(
+                            start=index,
+                            items=[piece],
+                            byte_size=estimate_size(piece),
+                            part=number,
+                            total_parts=len(pieces),
+                        )
+                    )
+                continue
+
+        if not current:
+            current_start = index
+        current.append(item)
+        current_size += size
+
+    if current:
+        chunks.append(PlannedChunk(current_start, current, current_size))
+    return chunks
+
+
+def chunk_digest(chunk: PlannedChunk) -> str:
+    """
+    SHA-256 of what a chunk holds for readers: its items and split part.
+
+    The chunk's position is not included, so an unchanged chunk keeps its
+    digest when an edit before it adds or removes chunks.
+    """
+    payload = json.dumps(
+        [chunk.items, chunk.part, chunk.total_parts],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def collect_items(
+    content_type: str, chunks: Iterable[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Concatenate the content of stored chunks, decoding compressed ones and
+    reassembling split items
+    """
+    items: List[Dict[str, Any]] = []
+    parts: List[Dict[str, Any]] = []
+    for chunk in chunks:
+        if chunk.get("part") is None:
+            items.extend(chunk_content(chunk))
+            continue
+        parts.extend(chunk_content(chunk))
+        if int(chunk["part"]) == int(chunk["total_parts"]):
+            items.append(merge_parts(content_type, parts))
+            parts = []
+    if parts:
+        raise ValueError(f"Incomplete split item in {content_type} chunks")
+    return items
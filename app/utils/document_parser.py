@@ -1,18 +1,21 @@
 # app/utils/document_parser.py
-import io
 import logging
-from docx import Document
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.models.document import TableGrid
+from app.utils.docx_stream import iter_docx_blocks
+from app.utils.uploads import DocumentSource
 
 logger = logging.getLogger("doc_processor")
 
 
-def extract_data_from_docx(file_content: bytes) -> Dict[str, Any]:
+def extract_data_from_docx(file_content: DocumentSource) -> Dict[str, Any]:
     """
     Extract text and structure from a Word document.
 
     Args:
-        file_content (bytes): Binary content of the Word document
+        file_content (DocumentSource): Binary content of the Word document,
+            or the path of a file holding it
 
     Returns:
         Dict[str, Any]: Extracted document data including paragraphs, tables, and headers
@@ -21,8 +24,6 @@ def extract_data_from_docx(file_content: bytes) -> Dict[str, Any]:
         ValueError: If document parsing fails
     """
     try:
-        doc = Document(io.BytesIO(file_content))
-
         # Initialize data structure
         extracted_data = {
             "paragraphs": [],
@@ -30,24 +31,31 @@ def extract_data_from_docx(file_content: bytes) -> Dict[str, Any]:
             "headers": [],
         }
 
-        # Extract paragraphs
-        for i, para in enumerate(doc.paragraphs):
-            if para.text.strip():  # Skip empty paragraphs
+        for block in iter_docx_blocks(file_content):
+            # Extract tables
+            if isinstance(block, TableGrid):
+                table_data = [[cell.strip() for cell in row] for row in block.rows()]
+                extracted_data["tables"].append(
+                    {"index": block.index, "data": table_data}
+                )
+                continue
+
+            # Extract paragraphs
+            text = block.text.strip()
+            if text:  # Skip empty paragraphs
                 # Determine if paragraph is a header
-                is_heading = para.style.name.startswith("Heading")
+                is_heading = block.style.startswith("Heading")
                 heading_level = 0
 
                 if is_heading:
                     try:
                         # Extract heading level (e.g., "Heading 1" -> 1)
-                        heading_level = int(
-                            para.style.name.replace("Heading", "").strip()
-                        )
+                        heading_level = int(block.style.replace("Heading", "").strip())
                         extracted_data["headers"].append(
                             {
                                 "level": heading_level,
-                                "text": para.text.strip(),
-                                "index": i,
+                                "text": text,
+                                "index": block.index,
                             }
                         )
                     except ValueError:
@@ -56,18 +64,9 @@ def extract_data_from_docx(file_content: bytes) -> Dict[str, Any]:
 
                 # Add to paragraphs regardless of whether it's a heading
                 extracted_data["paragraphs"].append(
-                    {"text": para.text.strip(), "index": i, "is_heading": is_heading}
+                    {"text": text, "index": block.index, "is_heading": is_heading}
                 )
 
-        # Extract tables
-        for i, table in enumerate(doc.tables):
-            table_data = []
-            for row in table.rows:
-                row_data = [cell.text.strip() for cell in row.cells]
-                table_data.append(row_data)
-
-            extracted_data["tables"].append({"index": i, "data": table_data})
-
         return extracted_data
 
     except Exception as e:
@@ -75,6 +74,38 @@ def extract_data_from_docx(file_content: bytes) -> Dict[str, Any]:
         raise ValueError(f"Failed to extract data from document: {str(e)}")
 
 
+def parse_page_range(value: str) -> Tuple[int, Optional[int]]:
+    """
+    Parse a page range such as "1-20", "5" or "10-".
+
+    Args:
+        value (str): Page range, 1-based and inclusive; an open end means
+            "to the last page"
+
+    Returns:
+        Tuple[int, Optional[int]]: First and last page (None for open end)
+
+    Raises:
+        ValueError: If the range is malformed
+    """
+    first, sep, last = value.strip().partition("-")
+    try:
+        first_page = int(first)
+        last_page = (int(last) if last.strip() else None) if sep else first_page
+    except ValueError:
+        raise ValueError(f"Invalid page range: {value}")
+
+    if first_page < 1 or (last_page is not None and last_page < first_page):
+        raise ValueError(f"Invalid page range: {value}")
+    return first_page, last_page
+
+
+def format_page_range(page_range: Tuple[int, Optional[int]]) -> str:
+    """Format a page range the way parse_page_range accepts it"""
+    first_page, last_page = page_range
+    return f"{first_page}-{last_page if last_page is not None else ''}"
+
+
 def count_words(text: str) -> int:
     """Count words in text."""
     return len(text.split())
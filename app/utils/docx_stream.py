@@ -0,0 +1,268 @@
+# app/utils/docx_stream.py
+import posixpath
+import zipfile
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from lxml import etree
+
+from app.models.document import TableGrid
+from app.utils.uploads import DocumentSource, open_document_source
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+OFFICE_DOCUMENT_REL = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+)
+STYLES_REL = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+)
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+BODY = _w("body")
+P = _w("p")
+R = _w("r")
+TBL = _w("tbl")
+TR = _w("tr")
+TC = _w("tc")
+HYPERLINK = _w("hyperlink")
+VAL = _w("val")
+
+# Run children that contribute text, as in python-docx's `Run.text`
+_RUN_TEXT = {
+    _w("t"): None,
+    _w("tab"): "\t",
+    _w("ptab"): "\t",
+    _w("cr"): "\n",
+    _w("noBreakHyphen"): "-",
+}
+_BR = _w("br")
+
+# Built-in styles whose names are stored in lower case in styles.xml
+_UI_STYLE_NAMES = {
+    name.lower(): name
+    for name in ["Caption", "Footer", "Header"]
+    + [f"Heading {level}" for level in range(1, 10)]
+}
+
+_PARSER_OPTIONS = {"resolve_entities": False, "no_network": True, "huge_tree": True}
+
+
+class DocxParagraph(NamedTuple):
+    """A top-level paragraph; `index` counts all body paragraphs, empty ones included"""
+
+    index: int
+    text: str
+    style: str
+
+
+# Tables are yielded as TableGrids; merged cells repeat their text in every
+# grid column they cover
+DocxBlock = Union[DocxParagraph, TableGrid]
+
+
+def _relationship_target(
+    archive: zipfile.ZipFile, rels_path: str, rel_type: str, default: str
+) -> str:
+    """Resolve the first relationship of `rel_type` to a path inside the archive"""
+    try:
+        rels = etree.fromstring(archive.read(rels_path))
+    except (KeyError, etree.XMLSyntaxError):
+        return default
+
+    base = posixpath.dirname(posixpath.dirname(rels_path))
+    for rel in rels.iter(f"{{{REL_NS}}}Relationship"):
+        if rel.get("Type") == rel_type and rel.get("TargetMode") != "External":
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join(base, target))
+    return default
+
+
+def _part_paths(archive: zipfile.ZipFile) -> Tuple[str, str]:
+    """Locate the main document part and its styles part"""
+    document_path = _relationship_target(
+        archive, "_rels/.rels", OFFICE_DOCUMENT_REL, "word/document.xml"
+    )
+    directory, name = posixpath.split(document_path)
+    styles_path = _relationship_target(
+        archive,
+        posixpath.join(directory, "_rels", f"{name}.rels"),
+        STYLES_REL,
+        posixpath.join(directory, "styles.xml"),
+    )
+    return document_path, styles_path
+
+
+def load_paragraph_styles(
+    archive: zipfile.ZipFile, styles_path: str
+) -> Tuple[Dict[str, str], str]:
+    """
+    Read paragraph style names from styles.xml.
+
+    Returns:
+        Tuple[Dict[str, str], str]: Style names by style ID, and the name of
+        the default paragraph style
+    """
+    try:
+        root = etree.fromstring(archive.read(styles_path))
+    except KeyError:
+        return {}, ""
+
+    names: Dict[str, str] = {}
+    default = ""
+    for style in root.iterchildren(_w("style")):
+        if style.get(_w("type")) != "paragraph":
+            continue
+        name_el = style.find(_w("name"))
+        name = name_el.get(VAL, "") if name_el is not None else ""
+        name = _UI_STYLE_NAMES.get(name, name)
+        names[style.get(_w("styleId"), "")] = name
+        if style.get(_w("default")) in ("1", "true", "on"):
+            default = name
+    return names, default
+
+
+def _run_text(run: etree._Element) -> str:
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag in _RUN_TEXT:
+            text = _RUN_TEXT[tag]
+            parts.append((child.text or "") if text is None else text)
+        elif tag == _BR:
+            if child.get(_w("type"), "textWrapping") == "textWrapping":
+                parts.append("\n")
+    return "".join(parts)
+
+
+def _paragraph_text(paragraph: etree._Element) -> str:
+    parts = []
+    for child in paragraph:
+        if child.tag == R:
+            parts.append(_run_text(child))
+        elif child.tag == HYPERLINK:
+            parts.extend(_run_text(run) for run in child.iterchildren(R))
+    return "".join(parts)
+
+
+def _paragraph_style_id(paragraph: etree._Element) -> Optional[str]:
+    p_style = paragraph.find(f"{_w('pPr')}/{_w('pStyle')}")
+    return p_style.get(VAL) if p_style is not None else None
+
+
+def _int_property(element: Optional[etree._Element], path: str, default: int) -> int:
+    if element is None:
+        return default
+    prop = element.find(path)
+    try:
+        return int(prop.get(VAL)) if prop is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _row_cells(
+    row: etree._Element, above: Dict[int, Tuple[str, int]]
+) -> Tuple[List[str], Dict[int, Tuple[str, int]]]:
+    """
+    Cell texts of a table row, one per grid column covered.
+
+    `above` maps grid offsets in the previous row to (text, span), which is
+    what vertically merged continuation cells repeat.
+    """
+    cells: List[str] = []
+    offsets: Dict[int, Tuple[str, int]] = {}
+    offset = _int_property(row.find(_w("trPr")), _w("gridBefore"), 0)
+
+    for tc in row.iterchildren(TC):
+        tc_pr = tc.find(_w("tcPr"))
+        span = max(1, _int_property(tc_pr, _w("gridSpan"), 1))
+        v_merge = tc_pr.find(_w("vMerge")) if tc_pr is not None else None
+
+        if v_merge is not None and v_merge.get(VAL, "continue") == "continue":
+            text, span = above.get(offset, ("", span))
+        else:
+            text = "\n".join(_paragraph_text(p) for p in tc.iterchildren(P))
+
+        offsets[offset] = (text, span)
+        cells.extend([text] * span)
+        offset += span
+    return cells, offsets
+
+
+def _release(element: etree._Element):
+    """Free an element that has been consumed, along with its earlier siblings"""
+    element.clear()
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+
+def iter_docx_blocks(file_content: DocumentSource) -> Iterator[DocxBlock]:
+    """
+    Stream the top-level paragraphs and tables of a Word document in order.
+
+    `word/document.xml` is read straight from the archive with iterparse and
+    every block is released once it has been yielded, so memory stays flat
+    regardless of document length. Style names are resolved from styles.xml
+    once, the same way python-docx reports them.
+
+    Args:
+        file_content (DocumentSource): Binary content of the Word document,
+            or the path of a file holding it
+
+    Yields:
+        DocxBlock: DocxParagraph and TableGrid records in document order
+    """
+    with open_document_source(file_content) as stream, zipfile.ZipFile(
+        stream
+    ) as archive:
+        document_path, styles_path = _part_paths(archive)
+        style_names, default_style = load_paragraph_styles(archive, styles_path)
+
+        paragraph_index = 0
+        table = TableGrid(0)
+        above: Dict[int, Tuple[str, int]] = {}
+
+        with archive.open(document_path) as document:
+            events = etree.iterparse(
+                document, events=("end",), tag=(P, TR, TBL), **_PARSER_OPTIONS
+            )
+            for _, element in events:
+                parent = element.getparent()
+                if parent is None:
+                    continue
+
+                if element.tag == TR:
+                    # Rows of top-level tables are consumed as they complete
+                    table_parent = parent.getparent()
+                    if table_parent is not None and table_parent.tag == BODY:
+                        cells, above = _row_cells(element, above)
+                        table.add_row(cells)
+                        _release(element)
+                    continue
+
+                if parent.tag != BODY:
+                    continue
+
+                if element.tag == P:
+                    style_id = _paragraph_style_id(element)
+                    yield DocxParagraph(
+                        index=paragraph_index,
+                        text=_paragraph_text(element),
+                        style=(
+                            style_names.get(style_id, default_style)
+                            if style_id
+                            else default_style
+                        ),
+                    )
+                    paragraph_index += 1
+                else:
+                    yield table
+                    table = TableGrid(table.index + 1)
+                    above = {}
+                _release(element)
@@ -0,0 +1,444 @@
+# app/utils/pdf_layout.py
+"""
+Layout-aware table detection for PDF pages.
+
+The page content stream is walked once to place every word of the text
+layer on the page. Words are then grouped into lines and cells, and runs of
+lines with several cells become table regions. The columns of a region are
+the vertical strips of the page that none of its cells cover, found with a
+single sweep over all cell extents, so rows with empty or multi-word cells
+still line up.
+"""
+import logging
+import re
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from PyPDF2 import PageObject
+from PyPDF2._cmap import build_char_map
+from PyPDF2.generic import ContentStream, NameObject
+
+logger = logging.getLogger("doc_processor")
+
+# Glyph advance, in font sizes, for the standard 14 fonts, which PDFs may use
+# without listing their widths, and for codes missing from a width table
+DEFAULT_CHAR_WIDTH = 0.5
+STANDARD_FONTS = {
+    "/Courier",
+    "/Courier-Bold",
+    "/Courier-BoldOblique",
+    "/Courier-Oblique",
+    "/Helvetica",
+    "/Helvetica-Bold",
+    "/Helvetica-BoldOblique",
+    "/Helvetica-Oblique",
+    "/Symbol",
+    "/Times-Bold",
+    "/Times-BoldItalic",
+    "/Times-Italic",
+    "/Times-Roman",
+    "/ZapfDingbats",
+}
+# Baselines closer than this many font sizes belong to the same line
+LINE_TOLERANCE = 0.5
+# Horizontal gap, in font sizes, between two cells of a line; a single space
+# is about a quarter of the font size, a column gap is wider
+CELL_GAP = 0.75
+# Gap, in font sizes, below which two pieces of text are part of one word
+WORD_GAP = 0.15
+# Vertical distance between lines, in font sizes, that ends a table
+ROW_GAP = 2.0
+
+_WORD = re.compile(r"\S+")
+# Dot leaders of tables of contents and indexes: a run of dots, or one of
+# the dots or colons TeX sets as separate words
+_LEADER = re.compile(r"[.:·]|[.·…]{4,}")
+
+Matrix = Tuple[float, float, float, float, float, float]
+IDENTITY: Matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+Table = List[List[str]]
+
+
+class PageWords(NamedTuple):
+    """
+    Words of a page with their extent along the baseline, in user space.
+    `measured` is False when some text was shown in a font without glyph
+    widths, so the extents are guesses.
+    """
+
+    text: List[str]
+    x0: np.ndarray
+    x1: np.ndarray
+    y: np.ndarray
+    size: np.ndarray
+    measured: bool = True
+
+
+def _multiply(m: Matrix, n: Matrix) -> Matrix:
+    return (
+        m[0] * n[0] + m[1] * n[2],
+        m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2],
+        m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4],
+        m[4] * n[1] + m[5] * n[3] + n[5],
+    )
+
+
+def _translate(m: Matrix, tx: float, ty: float) -> Matrix:
+    return _multiply((1.0, 0.0, 0.0, 1.0, tx, ty), m)
+
+
+def _cid_widths(font: Dict[str, Any]) -> Tuple[Dict[int, float], float]:
+    """
+    Glyph widths of a CIDFont by CID from its /W array, and its default
+    width (/DW), in font sizes
+    """
+    widths: Dict[int, float] = {}
+    entries = list(font.get("/W", []))
+    n = 0
+    while n + 1 < len(entries):
+        first = int(entries[n])
+        if isinstance(entries[n + 1].get_object(), list):
+            # c [w1 w2 ...]: consecutive CIDs from c
+            for offset, w in enumerate(entries[n + 1].get_object()):
+                widths[first + offset] = float(w) / 1000
+            n += 2
+        elif n + 2 < len(entries):
+            # c_first c_last w: the same width for a range of CIDs
+            for cid in range(first, int(entries[n + 1]) + 1):
+                widths[cid] = float(entries[n + 2]) / 1000
+            n += 3
+        else:
+            break
+    return widths, float(font.get("/DW", 1000)) / 1000
+
+
+class _Font:
+    """Decoding and glyph widths of one font resource"""
+
+    def __init__(self, name: str, page: PageObject):
+        try:
+            _, _, self.encoding, self.map_dict, font = build_char_map(name, 200.0, page)
+        except Exception:
+            self.encoding, self.map_dict, font = "charmap", {}, {}
+        # Widths by character code in font sizes. Simple fonts list them in
+        # /Widths, in thousandths of the font size or, for Type3 fonts, in
+        # glyph space units scaled by the /FontMatrix
+        self.widths: Optional[Dict[int, float]] = None
+        # Composite fonts with the Identity-H encoding show 2-byte CIDs,
+        # whose widths their descendant CIDFont lists in /W and /DW
+        self.cid_widths: Optional[Tuple[Dict[int, float], float]] = None
+        subtype = font.get("/Subtype")
+        if subtype == "/Type0":
+            descendants = font.get("/DescendantFonts")
+            if font.get("/Encoding") == "/Identity-H" and descendants:
+                self.cid_widths = _cid_widths(descendants[0].get_object())
+        elif "/Widths" in font and self.map_dict.get(-1, 1) == 1:
+            unit = 1 / 1000
+            if subtype == "/Type3":
+                unit = float(font.get("/FontMatrix", [0.001])[0])
+            first = int(font["/FirstChar"]) if "/FirstChar" in font else 0
+            self.widths = {
+                first + n: float(w) * unit for n, w in enumerate(font["/Widths"])
+            }
+        # Whether advances are real widths rather than guesses
+        self.measured = (
+            self.widths is not None
+            or self.cid_widths is not None
+            or font.get("/BaseFont") in STANDARD_FONTS
+        )
+
+    def decode(self, value: Any) -> Tuple[str, float]:
+        """
+        Text of a string operand and its advance in font sizes (before
+        character and word spacing), decoded the way PyPDF2 does.
+        """
+        if isinstance(value, str):
+            text = value
+            codes = value.encode("latin-1", "replace")
+        else:
+            codes = bytes(value)
+            if isinstance(self.encoding, str):
+                try:
+                    text = codes.decode(self.encoding, "surrogatepass")
+                except Exception:
+                    text = codes.decode(
+                        "utf-16-be" if self.encoding == "charmap" else "charmap",
+                        "replace",
+                    )
+            else:
+                text = "".join(
+                    self.encoding[c] if c in self.encoding else chr(c) for c in codes
+                )
+        if self.map_dict:
+            text = "".join(self.map_dict.get(c, c) for c in text)
+
+        if self.cid_widths is not None:
+            widths, default = self.cid_widths
+            advance = sum(
+                widths.get(codes[n] << 8 | codes[n + 1], default)
+                for n in range(0, len(codes) - 1, 2)
+            )
+        elif self.widths is not None:
+            advance = sum(self.widths.get(c, DEFAULT_CHAR_WIDTH) for c in codes)
+        else:
+            advance = len(text) * DEFAULT_CHAR_WIDTH
+        return text, advance
+
+
+def parse_content(page: PageObject) -> Optional[ContentStream]:
+    """
+    Parse the content stream of a page once.
+
+    The parsed stream is stored back on the page, so page.extract_text()
+    reuses it instead of parsing the stream a second time.
+    """
+    try:
+        content = page["/Contents"].get_object()
+    except KeyError:
+        return None
+    if not isinstance(content, ContentStream):
+        content = ContentStream(content, page.pdf, "bytes")
+        page[NameObject("/Contents")] = content
+    return content
+
+
+def _no_words(measured: bool = True) -> PageWords:
+    return PageWords([], *(np.empty(0) for _ in range(4)), measured=measured)
+
+
+def page_words(page: PageObject) -> PageWords:
+    """
+    Words of the horizontal text on a page, in content stream order.
+
+    Each shown string is placed with the text and graphics matrices; words
+    within it are placed in proportion to their character offsets. Text in
+    form XObjects is not read. A page whose content stream cannot be walked
+    has no words, and is logged; its text is still extracted separately.
+    """
+    try:
+        return _page_words(page)
+    except Exception as e:
+        logger.warning(f"Could not place the words of a PDF page: {e}")
+        return _no_words(measured=False)
+
+
+def _page_words(page: PageObject) -> PageWords:
+    text: List[str] = []
+    x0: List[float] = []
+    x1: List[float] = []
+    y: List[float] = []
+    size: List[float] = []
+
+    content = parse_content(page)
+    if content is None:
+        return _no_words()
+
+    fonts: Dict[str, _Font] = {}
+    font: Optional[_Font] = None
+    ctm = IDENTITY
+    stack: List[Tuple[Matrix, Optional[_Font], float]] = []
+    tm = line = IDENTITY
+    font_size = 0.0
+    leading = char_spacing = word_spacing = 0.0
+    scale = 1.0
+    measured = True
+
+    def show(value: Any):
+        nonlocal tm, measured
+        if font is None:
+            return
+        string, advance = font.decode(value)
+        measured = measured and font.measured
+        width = (
+            advance * font_size
+            + char_spacing * len(string)
+            + word_spacing * string.count(" ")
+        ) * scale
+        m = _multiply(tm, ctm)
+        tm = _translate(tm, width, 0)
+        if abs(m[1]) > 1e-6 or abs(m[2]) > 1e-6 or m[0] <= 0 or not string:
+            return  # rotated, mirrored or empty text
+        start, extent = m[4], width * m[0]
+        step = extent / len(string)
+        for match in _WORD.finditer(string):
+            text.append(match.group())
+            x0.append(start + match.start() * step)
+            x1.append(start + match.end() * step)
+            y.append(m[5])
+            size.append(font_size * m[3])
+
+    for operands, operator in content.operations:
+        if operator == b"TJ":
+            for item in operands[0]:
+                if isinstance(item, (str, bytes)):
+                    show(item)
+                else:
+                    tm = _translate(tm, -float(item) / 1000 * font_size * scale, 0)
+        elif operator == b"Tj":
+            show(operands[0])
+        elif operator in (b"Td", b"TD", b"T*", b"'", b'"'):
+            if operator == b"TD":
+                leading = -float(operands[1])
+            if operator in (b"Td", b"TD"):
+                tx, ty = float(operands[0]), float(operands[1])
+            else:
+                tx, ty = 0.0, -leading
+            tm = line = _translate(line, tx, ty)
+            if operator == b"'":
+                show(operands[0])
+            elif operator == b'"':
+                word_spacing, char_spacing = float(operands[0]), float(operands[1])
+                show(operands[2])
+        elif operator == b"Tm":
+            tm = line = tuple(float(v) for v in operands)
+        elif operator == b"BT":
+            tm = line = IDENTITY
+        elif operator == b"Tf":
+            name = operands[0]
+            if name not in fonts:
+                fonts[name] = _Font(name, page)
+            font, font_size = fonts[name], float(operands[1])
+        elif operator == b"TL":
+            leading = float(operands[0])
+        elif operator == b"Tc":
+            char_spacing = float(operands[0])
+        elif operator == b"Tw":
+            word_spacing = float(operands[0])
+        elif operator == b"Tz":
+            scale = float(operands[0]) / 100
+        elif operator == b"cm":
+            ctm = _multiply(tuple(float(v) for v in operands), ctm)
+        elif operator == b"q":
+            stack.append((ctm, font, font_size))
+        elif operator == b"Q" and stack:
+            ctm, font, font_size = stack.pop()
+
+    return PageWords(
+        text,
+        np.array(x0),
+        np.array(x1),
+        np.array(y),
+        np.abs(np.array(size)),
+        measured,
+    )
+
+
+def _join(words: List[str], joined: np.ndarray, start: int, end: int) -> str:
+    parts = [words[start]]
+    for n in range(start + 1, end):
+        parts.append(words[n] if joined[n] else " " + words[n])
+    return "".join(parts)
+
+
+def _columns(x0: np.ndarray, x1: np.ndarray) -> np.ndarray:
+    """
+    Column boundaries of a table region: the middle of every gap in the
+    union of the cell extents.
+    """
+    order = np.argsort(x0, kind="stable")
+    starts = x0[order]
+    reach = np.maximum.accumulate(x1[order])
+    gaps = starts[1:] > reach[:-1]
+    return (reach[:-1][gaps] + starts[1:][gaps]) / 2
+
+
+def detect_tables(words: PageWords) -> List[Table]:
+    """
+    Tables on a page, as rows of cell texts from top to bottom.
+
+    Lines are words with nearly the same baseline; a line splits into cells
+    wherever the gap between words is wider than CELL_GAP font sizes. A
+    table is a run of close lines that starts and ends with lines of at
+    least two cells. When the cells of a table line up in columns, every row
+    has one entry per column, with "" for empty cells; otherwise rows keep
+    their cells in order.
+
+    Pages with text in fonts without glyph widths have no tables: their
+    word gaps are guesses, and prose would split into false cells.
+    """
+    if len(words.text) < 4 or not words.measured:
+        return []
+    em = float(np.median(words.size))
+    if em <= 0:
+        return []
+
+    # Lines, top to bottom, with their words left to right
+    order = np.argsort(-words.y, kind="stable")
+    y = words.y[order]
+    new_line = np.empty(len(order), dtype=bool)
+    new_line[0] = True
+    new_line[1:] = y[:-1] - y[1:] > LINE_TOLERANCE * em
+    line_of = np.cumsum(new_line) - 1
+    order = order[np.lexsort((words.x0[order], line_of))]
+    x0, x1 = words.x0[order], words.x1[order]
+    text = [words.text[n] for n in order]
+
+    # Cells: runs of words separated by less than CELL_GAP
+    gap = np.empty(len(order))
+    gap[0] = np.inf
+    gap[1:] = x0[1:] - x1[:-1]
+    new_cell = new_line | (gap > CELL_GAP * em)
+    joined = ~new_cell & (gap < WORD_GAP * em)
+    cell_start = np.flatnonzero(new_cell)
+    cell_end = np.append(cell_start[1:], len(order))
+    cell_x0 = np.minimum.reduceat(x0, cell_start)
+    cell_x1 = np.maximum.reduceat(x1, cell_start)
+    cell_line = line_of[cell_start]
+
+    # Blocks of lines without a wide vertical gap between them. Lines with
+    # dot leaders (contents and index entries) are never table rows
+    line_y = y[new_line]
+    first_cell = np.searchsorted(cell_line, np.arange(len(line_y) + 1))
+    leaders = np.array([_LEADER.fullmatch(t) is not None for t in text], dtype=int)
+    leader_line = np.add.reduceat(leaders, np.flatnonzero(new_line)) >= 3
+    is_row = (np.diff(first_cell) >= 2) & ~leader_line
+    line_gap = np.empty(len(line_y))
+    line_gap[0] = np.inf
+    line_gap[1:] = line_y[:-1] - line_y[1:]
+    block_of = np.cumsum(line_gap > ROW_GAP * em)
+
+    def regions(lines: np.ndarray) -> Iterator[Table]:
+        # A table starts and ends with a line of several cells; lines with
+        # one cell in between are rows with empty cells, as long as that
+        # cell stays within one column
+        rows_at = lines[is_row[lines]]
+        if len(rows_at) < 2:
+            return
+        lines = lines[(lines >= rows_at[0]) & (lines <= rows_at[-1])]
+        cells = np.arange(first_cell[lines[0]], first_cell[lines[-1] + 1])
+        line = cell_line[cells]
+        in_row = is_row[line]
+        boundaries = _columns(cell_x0[cells][in_row], cell_x1[cells][in_row])
+        if not len(boundaries):
+            return  # no gap runs through all rows: prose, not columns
+        column = np.searchsorted(boundaries, cell_x0[cells])
+        spans = column != np.searchsorted(boundaries, cell_x1[cells])
+        misfits = np.unique(line[spans & ~in_row])
+        if len(misfits):
+            for part in np.split(lines, np.searchsorted(lines, misfits)):
+                yield from regions(part[~np.isin(part, misfits)])
+            return
+
+        same_line = line[1:] == line[:-1]
+        aligned = not np.any(same_line & (column[1:] == column[:-1]))
+        rows: Table = []
+        for n in lines:
+            row_cells = range(first_cell[n], first_cell[n + 1])
+            values = [
+                _join(text, joined, cell_start[c], cell_end[c]) for c in row_cells
+            ]
+            if aligned:
+                row = [""] * (len(boundaries) + 1)
+                for c, value in zip(row_cells, values):
+                    row[column[c - cells[0]]] = value
+                values = row
+            rows.append(values)
+        yield rows
+
+    tables = []
+    for block in np.unique(block_of[is_row]):
+        tables.extend(regions(np.flatnonzero(block_of == block)))
+    return tables
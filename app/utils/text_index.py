@@ -0,0 +1,243 @@
+# app/utils/text_index.py
+"""
+Tokenizing and position coding for the full-text search index.
+
+Text is split into case-folded word tokens. The passages of a document (its
+headers, paragraphs and table rows) are numbered with consecutive token
+positions, leaving a one-position gap between passages so phrases never
+match across them. The positions of a term within a document are stored as
+delta-coded varints; all terms of a document are encoded at once with NumPy.
+"""
+import html
+import re
+from collections import defaultdict
+from itertools import chain
+from typing import (
+    AbstractSet,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+# Longer runs of word characters (hashes, encoded data) are not indexed
+MAX_TOKEN_LENGTH = 64
+
+_TOKEN = re.compile(r"\w+")
+_PHRASE = re.compile(r'"([^"]*)"?')
+
+
+class Passage(NamedTuple):
+    """Searchable text of one content item"""
+
+    content_type: str
+    item_index: int
+    text: str
+
+
+class DocumentTerms(NamedTuple):
+    """Inverted index entries of one document"""
+
+    length: int  # tokens in the document
+    passages: List[Tuple[int, Passage]]  # passages by their first position
+    terms: Dict[str, Tuple[int, bytes]]  # term frequency and encoded positions
+
+
+class ParsedQuery(NamedTuple):
+    terms: List[str]  # distinct terms in query order
+    phrases: List[List[str]]  # quoted runs of terms that must appear in order
+
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded word tokens of a text"""
+    return [
+        token.casefold()
+        for token in _TOKEN.findall(text)
+        if len(token) <= MAX_TOKEN_LENGTH
+    ]
+
+
+def document_passages(content: Dict[str, List[Dict[str, Any]]]) -> Iterator[Passage]:
+    """
+    Passages of a document's wire-format content: headers, paragraphs that
+    are not headings (those are indexed as headers) and table rows, with
+    cells separated by " | ".
+    """
+    for n, header in enumerate(content.get("headers", [])):
+        yield Passage("headers", n, header["text"])
+    for n, paragraph in enumerate(content.get("paragraphs", [])):
+        if paragraph.get("is_heading") != "true":
+            yield Passage("paragraphs", n, paragraph["text"])
+    for n, table in enumerate(content.get("tables", [])):
+        for row in table["rows"]:
+            yield Passage(
+                "tables", n, " | ".join(cell["value"] for cell in row["cells"])
+            )
+
+
+def _varints(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """LEB128 bytes of unsigned 32-bit values, and the byte count of each"""
+    sizes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 5):
+        sizes += values >= 1 << (7 * k)
+    starts = np.cumsum(sizes) - sizes
+    out = np.empty(int(sizes.sum()), dtype=np.uint8)
+    for k in range(5):
+        has = sizes > k
+        low = (values[has] >> (7 * k)) & 0x7F
+        more = (sizes[has] > k + 1).astype(values.dtype) << 7
+        out[starts[has] + k] = low | more
+    return out, sizes
+
+
+def encode_positions(positions: Sequence[Sequence[int]]) -> List[bytes]:
+    """Delta-coded varints of several ascending position lists"""
+    counts = np.fromiter(map(len, positions), dtype=np.int64, count=len(positions))
+    if not counts.sum():
+        return [b"" for _ in positions]
+    flat = np.fromiter(
+        chain.from_iterable(positions), dtype=np.uint32, count=int(counts.sum())
+    )
+    first = np.cumsum(counts) - counts
+    deltas = np.diff(flat, prepend=np.uint32(0))
+    deltas[first[counts > 0]] = flat[first[counts > 0]]
+    data, sizes = _varints(deltas)
+    ends = np.append(0, np.cumsum(sizes))[np.cumsum(counts)]
+    starts = np.append(0, ends[:-1])
+    raw = data.tobytes()
+    return [raw[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+def decode_position_lists(encoded: Sequence[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Positions of several lists encoded by encode_positions, decoded in one
+    pass: all positions in list order, and the number in each list
+    """
+    raw = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    if not len(raw):
+        return np.empty(0, dtype=np.int64), np.zeros(len(encoded), dtype=np.int64)
+    is_end = raw < 0x80
+    ends = np.flatnonzero(is_end)
+    starts = np.append(0, ends[:-1] + 1)
+    shift = 7 * (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1))
+    values = np.add.reduceat((raw & 0x7F).astype(np.int64) << shift, starts)
+
+    # Undo the delta coding within each list
+    sizes = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    ends_before = np.append(0, np.cumsum(is_end))[np.cumsum(sizes) - sizes]
+    counts = np.diff(np.append(ends_before, len(values)))
+    totals = np.cumsum(values)
+    offsets = np.append(0, totals)[ends_before]
+    return totals - np.repeat(offsets, counts), counts
+
+
+def decode_positions(data: bytes) -> np.ndarray:
+    """Positions encoded by encode_positions"""
+    return decode_position_lists([data])[0]
+
+
+def index_document(passages: Iterable[Passage]) -> DocumentTerms:
+    """Token positions of every term in a document's passages"""
+    positions: Dict[str, List[int]] = defaultdict(list)
+    kept = []
+    position = length = 0
+    for passage in passages:
+        tokens = tokenize(passage.text)
+        if not tokens:
+            continue
+        kept.append((position, passage))
+        for token in tokens:
+            positions[token].append(position)
+            position += 1
+        length += len(tokens)
+        position += 1  # phrases never span two passages
+    terms = list(positions)
+    encoded = encode_positions([positions[term] for term in terms])
+    return DocumentTerms(
+        length,
+        kept,
+        {term: (len(positions[term]), data) for term, data in zip(terms, encoded)},
+    )
+
+
+def parse_query(text: str) -> ParsedQuery:
+    """
+    Terms of a search query. Quoted text is a phrase: its terms count like
+    the others, and matching documents must contain them next to each other.
+    """
+    phrases = []
+    terms = []
+    for match in _PHRASE.finditer(text):
+        tokens = tokenize(match.group(1))
+        if len(tokens) > 1:
+            phrases.append(tokens)
+        terms.extend(tokens)
+    terms.extend(tokenize(_PHRASE.sub(" ", text)))
+    return ParsedQuery(list(dict.fromkeys(terms)), phrases)
+
+
+def phrase_documents(postings: Sequence[Sequence[Tuple[int, bytes]]]) -> np.ndarray:
+    """
+    Keys of the documents in which the terms of a phrase occur in a row.
+
+    `postings` holds, for every term of the phrase in order, the key of each
+    document containing it with the encoded positions there. Every
+    occurrence becomes a (document, position - offset in phrase) pair; the
+    phrase occurs where a pair is found for all of its terms.
+    """
+    pairs = None
+    for offset, rows in enumerate(postings):
+        positions, counts = decode_position_lists([data for _, data in rows])
+        keys = np.repeat(np.array([key for key, _ in rows], dtype=np.int64), counts)
+        start = positions >= offset
+        term_pairs = (keys[start] << 32) | (positions[start] - offset)
+        # Positions are unique within a document, and so are the pairs
+        pairs = (
+            term_pairs
+            if pairs is None
+            else np.intersect1d(pairs, term_pairs, assume_unique=True)
+        )
+    if pairs is None:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(pairs >> 32)
+
+
+def highlight(text: str, terms: AbstractSet[str], max_chars: int) -> str:
+    """
+    Snippet of a passage around its first matching term, at most about
+    `max_chars` long. The text is HTML-escaped and matching words are
+    wrapped in <mark> tags.
+    """
+    matches = [m for m in _TOKEN.finditer(text) if m.group().casefold() in terms]
+    start, end = 0, len(text)
+    if end > max_chars:
+        first = matches[0].start() if matches else 0
+        start = max(0, min(first - max_chars // 4, end - max_chars))
+        end = start + max_chars
+        # Cut at word boundaries where there is one nearby
+        if start > 0:
+            space = text.find(" ", start, first if matches else end)
+            if space != -1:
+                start = space + 1
+        if end < len(text):
+            space = text.rfind(" ", start, end)
+            if space > start:
+                end = space
+
+    parts = ["…" if start > 0 else ""]
+    cursor = start
+    for match in matches:
+        if match.start() < start or match.end() > end:
+            continue
+        parts.append(html.escape(text[cursor : match.start()], quote=False))
+        parts.append(f"<mark>{html.escape(match.group(), quote=False)}</mark>")
+        cursor = match.end()
+    parts.append(html.escape(text[cursor:end], quote=False))
+    parts.append("…" if end < len(text) else "")
+    return "".join(parts)
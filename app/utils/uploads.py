@@ -0,0 +1,303 @@
+# app/utils/uploads.py
+import hashlib
+import io
+import logging
+import mmap
+import os
+import posixpath
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from fastapi import UploadFile
+
+logger = logging.getLogger("doc_processor")
+
+# Document content as passed to the parsers: raw bytes or a path to a file.
+# Paths keep large uploads out of memory and can be handed to worker processes.
+DocumentSource = Union[bytes, str]
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the maximum allowed size."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"Upload exceeds maximum allowed size of {max_size} bytes")
+
+
+class SpooledUpload:
+    """
+    Uploaded file content that stays in memory while it is small and is
+    spooled to a temporary file once it grows past `memory_threshold`.
+
+    A SHA-256 digest of the content is computed as chunks are written.
+    """
+
+    def __init__(self, memory_threshold: int, spool_dir: Optional[str] = None):
+        self.memory_threshold = memory_threshold
+        self.spool_dir = spool_dir
+        self.size = 0
+        self.path: Optional[str] = None
+        self._chunks: List[bytes] = []
+        self._file: Optional[BinaryIO] = None
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        """Hex digest of the content written so far"""
+        return self._hash.hexdigest()
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    def write(self, data: bytes):
+        """Append a chunk of the upload"""
+        self.size += len(data)
+        self._hash.update(data)
+        if self._file is None and self.size > self.memory_threshold:
+            if self.spool_dir:
+                os.makedirs(self.spool_dir, exist_ok=True)
+            self._file = tempfile.NamedTemporaryFile(
+                prefix="upload-", dir=self.spool_dir, delete=False
+            )
+            self.path = self._file.name
+            for chunk in self._chunks:
+                self._file.write(chunk)
+            self._chunks = []
+
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._chunks.append(data)
+
+    def finish(self):
+        """Flush the spool file once all chunks have been written"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        elif len(self._chunks) > 1:
+            self._chunks = [b"".join(self._chunks)]
+
+    def source(self) -> DocumentSource:
+        """Return the content as bytes (in memory) or as a file path (spooled)"""
+        if self.path is not None:
+            return self.path
+        return self._chunks[0] if self._chunks else b""
+
+    def detach(self) -> DocumentSource:
+        """Hand the content over to a new owner; close() will no longer delete it"""
+        source = self.source()
+        self.path = None
+        self._chunks = []
+        return source
+
+    def close(self):
+        """Release memory and delete the spool file, if any"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self._chunks = []
+
+
+async def spool_upload(
+    upload: UploadFile,
+    max_size: int,
+    memory_threshold: int,
+    chunk_size: int = 1024 * 1024,
+    spool_dir: Optional[str] = None,
+) -> SpooledUpload:
+    """
+    Read an upload in chunks, rejecting it as soon as it exceeds `max_size`.
+
+    Args:
+        upload (UploadFile): Incoming file
+        max_size (int): Maximum allowed size in bytes
+        memory_threshold (int): Size above which content is spooled to disk
+        chunk_size (int): Number of bytes read per chunk
+        spool_dir (Optional[str]): Directory for spool files (system default if None)
+
+    Returns:
+        SpooledUpload: The buffered upload; the caller must close() it
+
+    Raises:
+        UploadTooLarge: If the upload is larger than `max_size`
+    """
+    spooled = SpooledUpload(memory_threshold, spool_dir)
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            if spooled.size + len(chunk) > max_size:
+                raise UploadTooLarge(max_size)
+            spooled.write(chunk)
+        spooled.finish()
+        return spooled
+    except BaseException:
+        spooled.close()
+        raise
+
+
+def source_size(source: DocumentSource) -> int:
+    """Size in bytes of a document source"""
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    return len(source)
+
+
+def read_source(source: DocumentSource) -> bytes:
+    """Load a document source fully into memory"""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    return source
+
+
+def move_source(source: DocumentSource, destination: str):
+    """Store a document source at `destination`, moving spool files instead of copying"""
+    if isinstance(source, str):
+        shutil.move(source, destination)
+    else:
+        with open(destination, "wb") as f:
+            f.write(source)
+
+
+class _MappedFile(mmap.mmap):
+    """Read-only memory map with the file-object methods zipfile expects"""
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return False
+
+
+def discard_source(source: DocumentSource):
+    """Delete the spool file behind a detached document source, if any"""
+    if isinstance(source, str):
+        try:
+            os.unlink(source)
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def open_document_source(source: DocumentSource) -> Iterator[BinaryIO]:
+    """
+    Open a document source as a seekable binary stream without copying it.
+
+    Bytes are wrapped in a BytesIO (which shares the buffer) and files are
+    memory-mapped, so parsers read pages on demand instead of from a copy.
+    """
+    if not isinstance(source, str):
+        yield io.BytesIO(source)
+        return
+
+    with open(source, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.BytesIO(b"")
+            return
+        with _MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+class ArchiveMember(NamedTuple):
+    """A file extracted from an uploaded zip archive, or why it was not"""
+
+    filename: str
+    upload: Optional[SpooledUpload]
+    error: Optional[str] = None
+
+
+def extract_archive(
+    source: DocumentSource,
+    allowed_extensions: Iterable[str],
+    max_size: int,
+    max_members: int,
+    memory_threshold: int,
+    chunk_size: int = 1024 * 1024,
+    spool_dir: Optional[str] = None,
+) -> List[ArchiveMember]:
+    """
+    Extract the documents in a zip archive into spooled uploads.
+
+    Directories, hidden files and macOS metadata are skipped. Members with
+    other extensions or larger than `max_size` are returned with an error
+    instead of content. Sizes are enforced while decompressing rather than
+    trusted from the archive headers.
+
+    Returns:
+        List[ArchiveMember]: Members in archive order; the caller must
+        close() their uploads
+
+    Raises:
+        ValueError: If the archive is invalid or holds more than `max_members` files
+    """
+    allowed = {extension.lower() for extension in allowed_extensions}
+    members: List[ArchiveMember] = []
+    try:
+        with open_document_source(source) as stream, zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                name = posixpath.basename(info.filename)
+                if (
+                    info.is_dir()
+                    or not name
+                    or name.startswith(".")
+                    or info.filename.startswith("__MACOSX/")
+                ):
+                    continue
+                if len(members) >= max_members:
+                    raise ValueError(f"Archive contains more than {max_members} files")
+
+                if os.path.splitext(name)[1].lower() not in allowed:
+                    members.append(
+                        ArchiveMember(
+                            info.filename,
+                            None,
+                            f"Only {', '.join(sorted(allowed))} files are supported",
+                        )
+                    )
+                    continue
+
+                spooled = SpooledUpload(memory_threshold, spool_dir)
+                try:
+                    if info.file_size > max_size:
+                        raise UploadTooLarge(max_size)
+                    with archive.open(info) as member:
+                        while True:
+                            chunk = member.read(chunk_size)
+                            if not chunk:
+                                break
+                            if spooled.size + len(chunk) > max_size:
+                                raise UploadTooLarge(max_size)
+                            spooled.write(chunk)
+                    spooled.finish()
+                except UploadTooLarge as e:
+                    spooled.close()
+                    members.append(ArchiveMember(info.filename, None, str(e)))
+                    continue
+                except BaseException:
+                    spooled.close()
+                    raise
+                members.append(ArchiveMember(info.filename, spooled))
+        return members
+    except BaseException as e:
+        for member in members:
+            if member.upload is not None:
+                member.upload.close()
+        if isinstance(e, zipfile.BadZipFile):
+            raise ValueError(f"Invalid zip archive: {e}") from e
+        raise
@@ -0,0 +1,87 @@
+"""
+Measure chunk compression: stored size, chunk count and encode/decode cost.
+
+A synthetic document is extracted once and chunked with each available
+codec. Encoding is the time to build the chunks; decoding the time to read
+every item back from them, as the content endpoint does.
+
+    python -m benchmarks.chunk_compression --pages 200 --tables 20
+"""
+
+import argparse
+import statistics
+import time
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.services.document_processor import DocumentProcessorService
+from app.utils import chunk_codec
+from app.utils.chunking import collect_items, estimate_size
+from benchmarks.corpus import CorpusSpec, build_docx
+
+
+def timed(run, repeat: int):
+    """Result of the last run and the median time in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    spec = CorpusSpec(pages=args.pages, tables=args.tables, rows=args.rows)
+    extracted = DocumentProcessorService._extract_data_from_docx(build_docx(spec))
+    wire = extracted.to_wire()
+    raw_size = estimate_size(wire)
+    print(
+        f"{len(extracted.paragraphs)} paragraphs, {len(extracted.tables)} tables, "
+        f"{raw_size / 1024:.0f} KiB of content"
+    )
+
+    codecs = ["none", "zlib"] + (["zstd"] if chunk_codec.zstandard else [])
+    print(
+        f"{'codec':<6} {'chunks':>7} {'stored KiB':>11} {'ratio':>6} "
+        f"{'encode ms':>10} {'decode ms':>10}"
+    )
+    for name in codecs:
+        with patch.object(settings, "CHUNK_COMPRESSION", name):
+            (chunks, _), encode_ms = timed(
+                lambda: DocumentProcessorService._build_chunks("benchmark", wire),
+                args.repeat,
+            )
+
+        by_type = {}
+        for chunk in chunks.values():
+            by_type.setdefault(chunk["type"], []).append(chunk)
+
+        def decode():
+            return {
+                content_type: collect_items(content_type, type_chunks)
+                for content_type, type_chunks in by_type.items()
+            }
+
+        decoded, decode_ms = timed(decode, args.repeat)
+        if any(decoded[t] != wire[t] for t in decoded):
+            raise RuntimeError(f"{name} chunks do not decode to the original content")
+
+        stored = sum(
+            estimate_size(chunk["compressed_content"] or chunk["content"])
+            for chunk in chunks.values()
+        )
+        print(
+            f"{name:<6} {len(chunks):>7} {stored / 1024:>11.0f} "
+            f"{raw_size / stored:>6.2f} {encode_ms:>10.1f} {decode_ms:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Reproducible synthetic DOCX and PDF documents for benchmarks.
+
+The same CorpusSpec always produces the same text, headings and tables, so
+results from different runs and machines are comparable.
+
+    python -m benchmarks.corpus --out /tmp/corpus --count 5 --pages 50 --tables 4
+"""
+
+import argparse
+import io
+import os
+import random
+from dataclasses import asdict, dataclass, replace
+from typing import List
+
+from docx import Document
+
+WORDS = (
+    "aircraft crew flight safety report schedule maintenance engine cabin "
+    "runway inspection procedure manual training weather fuel checklist "
+    "operations pilot station cargo passenger delay route approval system"
+).split()
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    """Shape of a synthetic document"""
+
+    pages: int = 10
+    paragraphs_per_page: int = 8
+    words_per_paragraph: int = 40
+    tables: int = 2
+    rows: int = 20
+    cols: int = 4
+    heading_every: int = 5  # one heading per N paragraphs; 0 for none
+    seed: int = 1234
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _table_rows(rng: random.Random, spec: CorpusSpec, table: int) -> List[List[str]]:
+    header = [f"Column{c + 1}" for c in range(spec.cols)]
+    body = [
+        [f"{rng.choice(WORDS)}{table}x{r}x{c}" for c in range(spec.cols)]
+        for r in range(spec.rows - 1)
+    ]
+    return [header] + body
+
+
+def _layout(spec: CorpusSpec):
+    """
+    Yield ("heading" | "paragraph", text) and ("table", rows) items per page.
+
+    Tables are spread evenly over the pages.
+    """
+    rng = random.Random(spec.seed)
+    table_pages = {
+        (t * spec.pages) // max(1, spec.tables): t for t in range(spec.tables)
+    }
+    counter = 0
+    pages = []
+    for page in range(spec.pages):
+        items = []
+        for _ in range(spec.paragraphs_per_page):
+            if spec.heading_every and counter % spec.heading_every == 0:
+                items.append(("heading", f"SECTION {counter // spec.heading_every}"))
+            else:
+                items.append(("paragraph", _sentence(rng, spec.words_per_paragraph)))
+            counter += 1
+        if page in table_pages:
+            items.append(("table", _table_rows(rng, spec, table_pages[page])))
+        pages.append(items)
+    # Tables that did not get their own page go on the last one
+    for t in range(len(table_pages), spec.tables):
+        pages[-1].append(("table", _table_rows(rng, spec, t)))
+    return pages
+
+
+def build_docx(spec: CorpusSpec) -> bytes:
+    """Build a Word document with headings, body text, tables and page breaks"""
+    doc = Document()
+    for number, items in enumerate(_layout(spec)):
+        if number:
+            doc.add_page_break()
+        for kind, value in items:
+            if kind == "heading":
+                doc.add_heading(value.title(), level=1 + len(value) % 3)
+            elif kind == "paragraph":
+                doc.add_paragraph(value)
+            else:
+                table = doc.add_table(rows=len(value), cols=spec.cols)
+                for row, cells in zip(table.rows, value):
+                    for cell, text in zip(row.cells, cells):
+                        cell.text = text
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def _pdf_lines(items) -> List[str]:
+    """Lines of one PDF page; blank lines separate paragraphs and tables"""
+    lines: List[str] = []
+    for kind, value in items:
+        if kind == "table":
+            lines.extend("  ".join(cells) for cells in value)
+        else:
+            lines.append(value)
+        lines.append("")
+    return lines
+
+
+def assemble_pdf(streams: List[bytes]) -> bytes:
+    """
+    Build a PDF with one page per content stream; the streams use Helvetica
+    as font /F1
+    """
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", None]
+    kids = []
+    for stream in streams:
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 1 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        " ".join(f"{kid} 0 R" for kid in kids).encode(),
+        len(kids),
+    )
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        len(objects),
+        xref,
+    )
+    return bytes(pdf)
+
+
+def pdf_string(text: str) -> str:
+    """Escape text for a PDF literal string"""
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(spec: CorpusSpec) -> bytes:
+    """
+    Build a PDF whose text layer has headings (all caps), paragraphs and
+    space-aligned tables, one text line per Tj operator.
+    """
+    streams = []
+    for items in _layout(spec):
+        lines = _pdf_lines(items)
+        ops = []
+        for n, line in enumerate(lines):
+            if not line:
+                continue
+            text = pdf_string(line)
+            if n > 0 and not lines[n - 1]:
+                # A leading newline makes the text layer report a blank line
+                text = "\\n" + text
+            ops.append(f"BT /F1 8 Tf 30 {820 - 10 * n} Td ({text}) Tj ET")
+        streams.append("\n".join(ops).encode("latin-1"))
+    return assemble_pdf(streams)
+
+
+def write_corpus(directory: str, spec: CorpusSpec, count: int) -> List[str]:
+    """Write `count` DOCX and PDF pairs, each with its own seed"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for n in range(count):
+        doc_spec = replace(spec, seed=spec.seed + n)
+        for extension, build in (("docx", build_docx), ("pdf", build_pdf)):
+            path = os.path.join(directory, f"doc-{n:04d}.{extension}")
+            with open(path, "wb") as f:
+                f.write(build(doc_spec))
+            paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--count", type=int, default=1)
+    for name, value in asdict(CorpusSpec()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    args = parser.parse_args()
+
+    spec = CorpusSpec(**{name: getattr(args, name) for name in asdict(CorpusSpec())})
+    paths = write_corpus(args.out, spec, args.count)
+    print(f"wrote {len(paths)} documents to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compare the streaming DOCX parser with python-docx.
+
+Each parser runs in a fresh process so peak RSS is not shared between them.
+
+    python -m benchmarks.docx_parse --pages 2500 --rows 5000
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+from docx import Document
+
+from benchmarks.corpus import CorpusSpec, build_docx
+
+
+def parse_python_docx(path: str) -> int:
+    doc = Document(path)
+    count = sum(1 for p in doc.paragraphs if p.style.name and p.text.strip())
+    for table in doc.tables:
+        count += sum(len([c.text for c in row.cells]) for row in table.rows)
+    return count
+
+
+def parse_streaming(path: str) -> int:
+    from app.models.document import TableGrid
+    from app.utils.docx_stream import iter_docx_blocks
+
+    count = 0
+    for block in iter_docx_blocks(path):
+        if isinstance(block, TableGrid):
+            count += len(block.cells)
+        elif block.text.strip():
+            count += 1
+    return count
+
+
+PARSERS = {"python-docx": parse_python_docx, "streaming": parse_streaming}
+
+
+def _measure(name: str, path: str, repeat: int, results):
+    from app.utils import docx_stream  # noqa: F401  (import cost is not measured)
+
+    parse = PARSERS[name]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = parse(path)
+        timings.append(time.perf_counter() - start)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((items, timings, rss_before, rss_after))
+
+
+def run(name: str, path: str, repeat: int):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(name, path, repeat, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"{name} failed (exit code {process.exitcode})")
+    return results.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2500)
+    parser.add_argument("--tables", type=int, default=1)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = build_docx(CorpusSpec(pages=args.pages, tables=args.tables, rows=args.rows))
+    with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as f:
+        f.write(data)
+        path = f.name
+
+    try:
+        print(f"document: {len(data) / 1024:.0f} KiB zipped")
+        print(
+            f"{'parser':<12} {'items':>8} {'median s':>9} {'peak RSS growth MiB':>20}"
+        )
+        for name in PARSERS:
+            items, timings, rss_before, rss_after = run(name, path, args.repeat)
+            # ru_maxrss is reported in KiB on Linux
+            print(
+                f"{name:<12} {items:>8} {statistics.median(timings):>9.3f} "
+                f"{(rss_after - rss_before) / 1024:>20.1f}"
+            )
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
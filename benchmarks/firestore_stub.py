@@ -0,0 +1,134 @@
+"""
+In-memory stand-in for the Firestore AsyncClient used by app.db.firebase.
+
+It implements only the calls the service makes (document get/set, batched
+writes and deletes, get_all and equality queries), so end-to-end benchmarks measure
+the service itself rather than network latency.
+"""
+
+import copy
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+
+class _Snapshot:
+    def __init__(self, ref: "_DocumentRef", data: Optional[Dict[str, Any]]):
+        self.id = ref.id
+        self.reference = ref
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+
+class _DocumentRef:
+    def __init__(self, store: "InMemoryFirestore", collection: str, doc_id: str):
+        self._store = store
+        self.collection_name = collection
+        self.id = doc_id
+
+    async def set(self, data: Dict[str, Any], **options: Any):
+        self._store._write(self.collection_name, self.id, data)
+
+    async def get(self, **options: Any) -> _Snapshot:
+        return _Snapshot(self, self._store._read(self.collection_name, self.id))
+
+
+class _Query:
+    def __init__(self, store: "InMemoryFirestore", collection: str, filters=()):
+        self._store = store
+        self._collection = collection
+        self._filters = tuple(filters)
+
+    def where(self, filter) -> "_Query":
+        if filter.op_string != "==":
+            raise NotImplementedError(f"Unsupported operator {filter.op_string}")
+        return _Query(
+            self._store,
+            self._collection,
+            self._filters + ((filter.field_path, filter.value),),
+        )
+
+    async def stream(self, **options: Any) -> AsyncIterator[_Snapshot]:
+        with self._store._lock:
+            documents = list(self._store.data.get(self._collection, {}).items())
+        for doc_id, data in documents:
+            if all(data.get(field) == value for field, value in self._filters):
+                yield _Snapshot(
+                    _DocumentRef(self._store, self._collection, doc_id), data
+                )
+
+
+class _Collection(_Query):
+    def document(self, doc_id: str) -> _DocumentRef:
+        return _DocumentRef(self._store, self._collection, doc_id)
+
+
+class _WriteBatch:
+    def __init__(self, store: "InMemoryFirestore"):
+        self._store = store
+        self._writes: List[tuple] = []
+
+    def set(self, ref: _DocumentRef, data: Dict[str, Any]):
+        self._writes.append((ref.collection_name, ref.id, data))
+
+    def delete(self, ref: _DocumentRef):
+        self._writes.append((ref.collection_name, ref.id, None))
+
+    async def commit(self, **options: Any):
+        if len(self._writes) > 500:
+            raise ValueError("maximum 500 writes allowed per request")
+        with self._store._lock:
+            for collection, doc_id, data in self._writes:
+                documents = self._store.data.setdefault(collection, {})
+                if data is None:
+                    documents.pop(doc_id, None)
+                else:
+                    documents[doc_id] = data
+        self._store.commits += 1
+
+
+class InMemoryFirestore:
+    """Firestore client substitute that keeps documents in dictionaries"""
+
+    def __init__(self):
+        self.data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.commits = 0
+        self._lock = threading.Lock()
+
+    def _write(self, collection: str, doc_id: str, data: Dict[str, Any]):
+        with self._lock:
+            self.data.setdefault(collection, {})[doc_id] = data
+
+    def _read(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.data.get(collection, {}).get(doc_id)
+
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self, name)
+
+    def batch(self) -> _WriteBatch:
+        return _WriteBatch(self)
+
+    async def get_all(
+        self, refs: List[_DocumentRef], **options: Any
+    ) -> AsyncIterator[_Snapshot]:
+        for ref in refs:
+            yield await ref.get()
+
+    def clear(self):
+        with self._lock:
+            self.data.clear()
+
+
+@contextmanager
+def firestore_stub() -> Iterator[InMemoryFirestore]:
+    """Route all Firestore access, including startup initialization, to memory"""
+    client = InMemoryFirestore()
+    with patch("app.db.firebase.get_firestore_client", return_value=client), patch(
+        "app.db.firebase.initialize_firebase"
+    ):
+        yield client
@@ -0,0 +1,88 @@
+"""
+Compare the typed extraction IR with the string-valued wire dicts.
+
+For each document the IR is extracted once, then the retained memory,
+allocated blocks and pickled size (what crosses the worker pool) are
+measured for the IR and for its wire-format conversion.
+
+    python -m benchmarks.ir_memory --rows 5000
+"""
+
+import argparse
+import gc
+import glob
+import os
+import pickle
+import sys
+import tempfile
+import tracemalloc
+from typing import Callable, Tuple
+
+from app.services.document_processor import DocumentProcessorService
+from benchmarks.corpus import CorpusSpec, build_docx
+
+
+def measure(build: Callable[[], object]) -> Tuple[object, int, int, int]:
+    """Build an object and return it with its retained bytes, peak bytes and blocks"""
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    return result, retained, peak, sys.getallocatedblocks() - blocks_before
+
+
+def report(label: str, path: str):
+    extracted = DocumentProcessorService._extract_data_from_docx(path)
+    rows = sum(table.num_rows for table in extracted.tables)
+    print(
+        f"\n{label}: {len(extracted.paragraphs)} paragraphs, "
+        f"{len(extracted.tables)} tables, {rows} rows"
+    )
+    print(
+        f"{'format':<6} {'retained KiB':>13} {'peak KiB':>9} "
+        f"{'blocks':>9} {'pickle KiB':>11}"
+    )
+
+    # Re-extract under tracemalloc so the IR measurement includes its construction
+    ir, retained, peak, blocks = measure(
+        lambda: DocumentProcessorService._extract_data_from_docx(path)
+    )
+    print(
+        f"{'ir':<6} {retained / 1024:>13.1f} {peak / 1024:>9.1f} {blocks:>9} "
+        f"{len(pickle.dumps(ir)) / 1024:>11.1f}"
+    )
+
+    wire, retained, peak, blocks = measure(ir.to_wire)
+    print(
+        f"{'wire':<6} {retained / 1024:>13.1f} {peak / 1024:>9.1f} {blocks:>9} "
+        f"{len(pickle.dumps(wire)) / 1024:>11.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--cols", type=int, default=4)
+    args = parser.parse_args()
+
+    for path in sorted(glob.glob("docs/*.docx")):
+        report(os.path.basename(path), path)
+
+    data = build_docx(
+        CorpusSpec(
+            pages=1, paragraphs_per_page=0, tables=1, rows=args.rows, cols=args.cols
+        )
+    )
+    with tempfile.NamedTemporaryFile(suffix=".docx", delete=False) as f:
+        f.write(data)
+    try:
+        report(f"synthetic {args.rows}x{args.cols} table", f.name)
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Compare PDF table detection from word positions with the text heuristic.
+
+Pages hold several tables with multi-word and empty cells, laid out either
+as one space-padded string per row or with every cell placed on its own.
+Each detector runs over all pages of a freshly opened document; accuracy is
+the share of tables whose grid matches the source exactly.
+
+    python -m benchmarks.pdf_tables --pages 50 --tables-per-page 4 --rows 15
+"""
+
+import argparse
+import io
+import random
+import statistics
+import time
+from typing import Callable, List
+
+from PyPDF2 import PageObject, PdfReader
+
+from app.services.document_processor import DocumentProcessorService
+from app.utils.pdf_layout import detect_tables, page_words
+from benchmarks.corpus import WORDS, assemble_pdf, pdf_string
+
+FONT_SIZE = 8
+LINE_HEIGHT = 10
+COLUMN_WIDTH = 26  # characters; Helvetica without /Widths is read as 0.5 em each
+
+
+def _tables(rng: random.Random, count: int, rows: int, cols: int):
+    tables = []
+    for t in range(count):
+        grid = [[f"Column {c + 1}" for c in range(cols)]]
+        for r in range(rows - 1):
+            row = []
+            for c in range(cols):
+                roll = rng.random()
+                if c and roll < 0.1:
+                    row.append("")
+                elif roll < 0.4:
+                    row.append(f"{rng.choice(WORDS)} {rng.choice(WORDS)}")
+                else:
+                    row.append(f"{rng.choice(WORDS)}{t}x{r}")
+            grid.append(row)
+        tables.append(grid)
+    return tables
+
+
+def _page_stream(tables, positioned: bool) -> bytes:
+    ops = []
+    y = 820
+    for grid in tables:
+        for row in grid:
+            if positioned:
+                for c, cell in enumerate(row):
+                    if cell:
+                        x = 30 + c * COLUMN_WIDTH * FONT_SIZE // 2
+                        ops.append(
+                            f"BT /F1 {FONT_SIZE} Tf {x} {y} Td "
+                            f"({pdf_string(cell)}) Tj ET"
+                        )
+            else:
+                line = "".join(cell.ljust(COLUMN_WIDTH) for cell in row).rstrip()
+                ops.append(
+                    f"BT /F1 {FONT_SIZE} Tf 30 {y} Td ({pdf_string(line)}) Tj ET"
+                )
+            y -= LINE_HEIGHT
+        y -= 3 * LINE_HEIGHT
+    return "\n".join(ops).encode("latin-1")
+
+
+def build(args, positioned: bool):
+    """The PDF and the expected tables of every page"""
+    rng = random.Random(args.seed)
+    pages = [
+        _tables(rng, args.tables_per_page, args.rows, args.cols)
+        for _ in range(args.pages)
+    ]
+    return assemble_pdf([_page_stream(t, positioned) for t in pages]), pages
+
+
+def text_heuristic(page: PageObject) -> List[List[List[str]]]:
+    return DocumentProcessorService._split_pdf_page_text(page.extract_text())[1]
+
+
+def layout(page: PageObject) -> List[List[List[str]]]:
+    return detect_tables(page_words(page))
+
+
+def layout_with_text(page: PageObject) -> List[List[List[str]]]:
+    # What extraction does per page: the text layer is still needed for
+    # paragraphs, and reuses the content stream parsed for the words
+    words = page_words(page)
+    page.extract_text()
+    return detect_tables(words)
+
+
+DETECTORS = {
+    "text": text_heuristic,
+    "layout": layout,
+    "layout+text": layout_with_text,
+}
+
+
+def run(detect: Callable, data: bytes, expected, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        reader = PdfReader(io.BytesIO(data))
+        start = time.perf_counter()
+        found = [detect(page) for page in reader.pages]
+        timings.append(time.perf_counter() - start)
+    total = sum(len(tables) for tables in expected)
+    correct = sum(
+        sum(1 for table in tables if table in page_found)
+        for tables, page_found in zip(expected, found)
+    )
+    return statistics.median(timings), correct / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--tables-per-page", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=15)
+    parser.add_argument("--cols", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    print(
+        f"{'layout':<11} {'detector':<12} {'median s':>9} {'ms/page':>8} "
+        f"{'exact tables':>13}"
+    )
+    for name, positioned in (("spaced", False), ("positioned", True)):
+        data, expected = build(args, positioned)
+        for detector, detect in DETECTORS.items():
+            seconds, accuracy = run(detect, data, expected, args.repeat)
+            print(
+                f"{name:<11} {detector:<12} {seconds:>9.3f} "
+                f"{seconds / args.pages * 1000:>8.2f} {accuracy:>12.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Benchmark the extraction and persistence pipeline on a synthetic corpus.
+
+Every scenario runs in a fresh process and reports throughput (docs/sec),
+p50/p99 latency and peak RSS growth. Results are compared with the stored
+baseline for the profile; the run exits non-zero when a scenario regresses
+past the threshold.
+
+    python -m benchmarks.run --profile quick
+    python -m benchmarks.run --profile standard --save-baseline
+    python -m benchmarks.run --only extract_pdf,upload_pdf --threshold 0.3
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Iterator, List
+
+from benchmarks.corpus import CorpusSpec, build_docx, build_pdf
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# Small values are noisy; allow this much on top of the relative threshold
+P99_SLACK_MS = 2.0
+RSS_SLACK_MB = 8.0
+
+# Each scenario runs at least `iterations` times and for at least
+# `min_seconds`, so fast scenarios still collect enough samples for a p99
+PROFILES = {
+    "quick": {
+        "spec": CorpusSpec(pages=10, tables=2, rows=20),
+        "iterations": 5,
+        "min_seconds": 2.0,
+    },
+    "standard": {
+        "spec": CorpusSpec(pages=100, tables=10, rows=100),
+        "iterations": 10,
+        "min_seconds": 3.0,
+    },
+}
+
+
+@contextmanager
+def _extract_pdf(corpus) -> Iterator[Callable[[], Any]]:
+    from app.services.document_processor import DocumentProcessorService
+
+    yield lambda: DocumentProcessorService._extract_data_from_pdf(corpus["pdf"])
+
+
+@contextmanager
+def _extract_docx(corpus) -> Iterator[Callable[[], Any]]:
+    from app.services.document_processor import DocumentProcessorService
+
+    yield lambda: DocumentProcessorService._extract_data_from_docx(corpus["docx"])
+
+
+@contextmanager
+def _parse_docx(corpus) -> Iterator[Callable[[], Any]]:
+    from app.utils.document_parser import extract_data_from_docx
+
+    yield lambda: extract_data_from_docx(corpus["docx"])
+
+
+@contextmanager
+def _chunk(corpus) -> Iterator[Callable[[], Any]]:
+    from app.core.config import settings
+    from app.services.document_processor import DocumentProcessorService
+    from app.utils.chunking import plan_chunks
+
+    wire = DocumentProcessorService._extract_data_from_docx(corpus["docx"]).to_wire()
+
+    def run():
+        for content_type, items in wire.items():
+            plan_chunks(content_type, items, settings.CHUNK_TARGET_BYTES)
+
+    yield run
+
+
+@contextmanager
+def _serialize(corpus) -> Iterator[Callable[[], Any]]:
+    from app.services.document_processor import DocumentProcessorService
+
+    extracted = DocumentProcessorService._extract_data_from_docx(corpus["docx"])
+    yield lambda: json.dumps(extracted.to_wire())
+
+
+def _upload(kind: str, backend: str = "firestore"):
+    """
+    Upload through the API. The "firestore" backend writes to an in-memory
+    Firestore stub through the real batching code; other backends are
+    selected with STORAGE_BACKEND before the app is imported.
+    """
+
+    @contextmanager
+    def scenario(corpus) -> Iterator[Callable[[], Any]]:
+        with ExitStack() as stack:
+            if backend != "firestore":
+                directory = stack.enter_context(tempfile.TemporaryDirectory())
+                os.environ["STORAGE_BACKEND"] = backend
+                os.environ["STORAGE_DB_PATH"] = os.path.join(directory, "storage.db")
+
+            from fastapi.testclient import TestClient
+
+            from app.main import app
+            from benchmarks.firestore_stub import firestore_stub
+
+            if backend == "firestore":
+                stack.enter_context(firestore_stub())
+            yield _upload_runner(stack.enter_context(TestClient(app)), kind, corpus)
+
+    return scenario
+
+
+def _upload_runner(client, kind: str, corpus) -> Callable[[], Any]:
+    from app.core.config import settings
+
+    content_type = {
+        "docx": "application/vnd.openxmlformats-officedocument."
+        "wordprocessingml.document",
+        "pdf": "application/pdf",
+    }[kind]
+    files = {"file": (f"benchmark.{kind}", corpus[kind], content_type)}
+    url = f"{settings.API_PREFIX}/documents/upload"
+
+    def run():
+        # force skips the dedup index so every upload is processed
+        response = client.post(url, files=files, params={"force": "true"})
+        if response.status_code != 200:
+            raise RuntimeError(f"Upload failed: {response.text}")
+
+    return run
+
+
+SCENARIOS = {
+    "extract_pdf": _extract_pdf,
+    "extract_docx": _extract_docx,
+    "parse_docx": _parse_docx,
+    "chunk": _chunk,
+    "serialize": _serialize,
+    "upload_docx": _upload("docx"),
+    "upload_pdf": _upload("pdf"),
+    "upload_docx_sqlite": _upload("docx", backend="sqlite"),
+}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def _measure(
+    name: str,
+    corpus: Dict[str, bytes],
+    iterations: int,
+    min_seconds: float,
+    results,
+):
+    with SCENARIOS[name](corpus) as run:
+        run()  # warm up imports, caches and worker processes
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        latencies = []
+        while len(latencies) < iterations or sum(latencies) < min_seconds:
+            start = time.perf_counter()
+            run()
+            latencies.append(time.perf_counter() - start)
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    results.put(
+        {
+            "samples": len(latencies),
+            "docs_per_sec": round(len(latencies) / sum(latencies), 3),
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+            # ru_maxrss is reported in KiB on Linux
+            "peak_rss_mb": round((rss_after - rss_before) / 1024, 2),
+        }
+    )
+
+
+def run_scenario(
+    name: str, corpus: Dict[str, bytes], iterations: int, min_seconds: float = 0.0
+) -> Dict:
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(
+        target=_measure, args=(name, corpus, iterations, min_seconds, results)
+    )
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Scenario {name} failed (exit code {process.exitcode})")
+    return results.get()
+
+
+def find_regressions(
+    results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float
+) -> Dict[str, List[str]]:
+    """Compare results with a baseline; returns the regressed metrics per scenario"""
+    regressions: Dict[str, List[str]] = {}
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        problems = []
+        if current["docs_per_sec"] < base["docs_per_sec"] * (1 - threshold):
+            problems.append("docs_per_sec")
+        if current["p99_ms"] > base["p99_ms"] * (1 + threshold) + P99_SLACK_MS:
+            problems.append("p99_ms")
+        if current["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold) + (
+            RSS_SLACK_MB
+        ):
+            problems.append("peak_rss_mb")
+        if problems:
+            regressions[name] = problems
+    return regressions
+
+
+def _environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", help="Comma-separated scenarios to run")
+    parser.add_argument("--iterations", type=int, help="Override the profile")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.35,
+        help="Allowed relative regression before the run fails (default 0.35)",
+    )
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    spec: CorpusSpec = profile["spec"]
+    iterations = args.iterations or profile["iterations"]
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Scenario processes inherit the environment; keep request logs out of the
+    # report unless LOG_LEVEL is set explicitly
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    corpus = {"docx": build_docx(spec), "pdf": build_pdf(spec)}
+    print(
+        f"profile {args.profile}: {spec.pages} pages, {spec.tables} tables x "
+        f"{spec.rows} rows; docx {len(corpus['docx']) // 1024} KiB, "
+        f"pdf {len(corpus['pdf']) // 1024} KiB; at least {iterations} iterations "
+        f"and {profile['min_seconds']}s per scenario"
+    )
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+    baseline = baselines.get(args.profile, {}).get("results", {})
+
+    results = {}
+    print(
+        f"{'scenario':<18} {'docs/sec':>9} {'p50 ms':>9} {'p99 ms':>9} "
+        f"{'RSS MiB':>8}  baseline docs/sec"
+    )
+    for name in names:
+        result = run_scenario(name, corpus, iterations, profile["min_seconds"])
+        results[name] = result
+        base = baseline.get(name)
+        print(
+            f"{name:<18} {result['docs_per_sec']:>9.2f} {result['p50_ms']:>9.1f} "
+            f"{result['p99_ms']:>9.1f} {result['peak_rss_mb']:>8.1f}  "
+            + (f"{base['docs_per_sec']:.2f}" if base else "-")
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"profile": args.profile, "results": results}, f, indent=2)
+
+    if args.save_baseline:
+        baselines[args.profile] = {
+            "environment": _environment(),
+            "spec": asdict(spec),
+            "iterations": iterations,
+            "results": {**baseline, **results},
+        }
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved to {BASELINE_PATH}")
+        return
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for name, metrics in regressions.items():
+        print(f"REGRESSION {name}: {', '.join(metrics)}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measure full-text indexing throughput and search latency.
+
+Documents are paragraphs and table rows drawn from a Zipf-distributed
+vocabulary, so a few terms occur in almost every document and most are
+rare. They are indexed into a fresh SQLite database, then each query shape
+is run repeatedly and its median and 95th percentile latency reported.
+
+    python -m benchmarks.search --documents 20000 --paragraphs 10
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.search import SearchIndex
+from benchmarks.corpus import WORDS
+
+
+def vocabulary(size: int):
+    words = list(WORDS)
+    n = 0
+    while len(words) < size:
+        words.append(f"{WORDS[n % len(WORDS)]}{n // len(WORDS)}")
+        n += 1
+    return words[:size]
+
+
+def documents(args, words):
+    """Wire-format content of every document"""
+    rng = np.random.default_rng(args.seed)
+    weights = 1 / np.arange(1, len(words) + 1)
+    weights /= weights.sum()
+    for _ in range(args.documents):
+        picks = rng.choice(
+            len(words), size=(args.paragraphs + 1, args.words), p=weights
+        )
+        paragraphs = [" ".join(words[w] for w in row) for row in picks[:-1]]
+        cells = [words[w] for w in picks[-1]]
+        yield {
+            "paragraphs": [
+                {"text": text, "index": str(n), "is_heading": "false"}
+                for n, text in enumerate(paragraphs)
+            ],
+            "headers": [],
+            "tables": [
+                {
+                    "table_index": "0",
+                    "rows": [
+                        {
+                            "row_index": str(r),
+                            "cells": [
+                                {"cell_index": str(c), "value": value}
+                                for c, value in enumerate(cells[r * 4 : r * 4 + 4])
+                            ],
+                        }
+                        for r in range(len(cells) // 4)
+                    ],
+                }
+            ],
+        }
+
+
+def queries(words):
+    return {
+        "common term": {"query": words[0]},
+        "rare term": {"query": words[-1]},
+        "three terms": {"query": f"{words[1]} {words[50]} {words[500]}"},
+        "phrase": {"query": f'"{words[2]} {words[3]}"'},
+        "filtered": {"query": words[0], "document_type": "docx"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--words", type=int, default=30)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    words = vocabulary(args.vocabulary)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(os.path.join(tmp, "search.sqlite3"))
+        start = time.perf_counter()
+        tokens = 0
+        for n, content in enumerate(documents(args, words)):
+            metadata = {
+                "document_type": "docx" if n % 10 == 0 else "pdf",
+                "original_filename": f"doc{n}.pdf",
+            }
+            tokens += index._index(f"doc-{n}", metadata, content)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(index.db_path) + os.path.getsize(index.db_path + "-wal")
+        print(
+            f"indexed {args.documents} documents ({tokens} tokens) in "
+            f"{elapsed:.1f} s: {args.documents / elapsed:.0f} docs/s, "
+            f"{size / 1024 / 1024:.1f} MiB"
+        )
+
+        print(f"{'query':<12} {'matches':>8} {'median ms':>10} {'p95 ms':>8}")
+        for name, kwargs in queries(words).items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                total, _ = index._search(
+                    kwargs["query"], None, kwargs.get("document_type"), 0, 10
+                )
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(
+                f"{name:<12} {total:>8} {statistics.median(timings):>10.2f} "
+                f"{timings[int(len(timings) * 0.95) - 1]:>8.2f}"
+            )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compare validated and trusted serialization of a processed document.
+
+The document is extracted and chunked once. Each path then builds the chunk
+records and renders the upload response:
+
+- validated: `DocumentChunk(...).model_dump()` per chunk, a validated
+  `DocumentProcessResponse`, FastAPI's response model validation and
+  serialization, and `JSONResponse`
+- trusted: `DocumentChunk.model_construct()` per chunk, a constructed
+  response and `FastJSONResponse`
+
+    python -m benchmarks.serialization --paragraphs 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.config import settings
+from app.core.responses import FastJSONResponse, orjson
+from app.schemas.document import ContentPreview, DocumentChunk, DocumentProcessResponse
+from app.services.document_processor import DocumentProcessorService
+from app.utils.chunking import plan_chunks
+from benchmarks.corpus import CorpusSpec, build_docx
+
+
+def chunk_fields(document_id, wire):
+    """Constructor arguments of every chunk record of a document"""
+    for content_type, items in wire.items():
+        planned = plan_chunks(content_type, items, settings.CHUNK_TARGET_BYTES)
+        for chunk_index, plan in enumerate(planned):
+            yield {
+                "document_id": document_id,
+                "chunk_index": str(chunk_index),
+                "type": content_type,
+                "content": plan.items,
+                "total_chunks": str(len(planned)),
+                "start": str(plan.start),
+                "byte_size": str(plan.byte_size),
+            }
+
+
+def response_fields(extracted, wire):
+    return {
+        "status": "success",
+        "message": "Document processed successfully",
+        "document_id": "benchmark",
+        "version": 1,
+        "summary": {
+            kind: len(getattr(extracted, kind))
+            for kind in ("pages", "paragraphs", "headers", "tables")
+        },
+        "content": wire,
+        "content_preview": ContentPreview(
+            first_page_content=extracted.pages[0].content,
+            headers=[h.text for h in extracted.headers[:10]],
+            first_paragraphs=[p.text for p in extracted.paragraphs[:5]],
+        ),
+    }
+
+
+def validated(chunks, fields, loop, response_field) -> int:
+    records = [DocumentChunk(**chunk).model_dump() for chunk in chunks]
+    response = DocumentProcessResponse(**fields)
+    content = loop.run_until_complete(
+        serialize_response(field=response_field, response_content=response)
+    )
+    return len(records) + len(JSONResponse(content).body)
+
+
+def trusted(chunks, fields) -> int:
+    records = [dict(DocumentChunk.model_construct(**chunk)) for chunk in chunks]
+    response = DocumentProcessResponse.model_construct(**fields)
+    return len(records) + len(FastJSONResponse(response).body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--tables", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    spec = CorpusSpec(
+        pages=max(1, args.paragraphs // 8),
+        paragraphs_per_page=8,
+        tables=args.tables,
+        rows=args.rows,
+    )
+    extracted = DocumentProcessorService._extract_data_from_docx(build_docx(spec))
+    wire = extracted.to_wire()
+    chunks = list(chunk_fields("benchmark", wire))
+    fields = response_fields(extracted, wire)
+    print(
+        f"{len(extracted.paragraphs)} paragraphs, {len(extracted.tables)} tables, "
+        f"{len(chunks)} chunks; encoder: {'orjson' if orjson else 'json'}"
+    )
+
+    loop = asyncio.new_event_loop()
+    response_field = create_model_field(
+        "Response", DocumentProcessResponse, mode="serialization"
+    )
+    paths = {
+        "validated": lambda: validated(chunks, fields, loop, response_field),
+        "trusted": lambda: trusted(chunks, fields),
+    }
+    medians = {}
+    print(f"{'path':<10} {'median ms':>10} {'p95 ms':>8}")
+    for name, run in paths.items():
+        run()
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        medians[name] = statistics.median(timings)
+        print(
+            f"{name:<10} {medians[name]:>10.2f} "
+            f"{timings[int(len(timings) * 0.95) - 1]:>8.2f}"
+        )
+    loop.close()
+    print(
+        f"saved {medians['validated'] - medians['trusted']:.2f} ms per document "
+        f"({medians['validated'] / medians['trusted']:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
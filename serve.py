@@ -0,0 +1,125 @@
+# serve.py
+"""
+Production entry point: gunicorn with uvicorn workers.
+
+The application and the heavy parsing and Firebase modules are imported
+once in the master process and shared copy-on-write by the forked workers.
+Workers are recycled after SERVER_MAX_REQUESTS requests, and on SIGTERM each
+worker stops accepting connections and drains in-flight requests for up to
+SERVER_GRACEFUL_TIMEOUT seconds before exiting.
+
+    python serve.py
+"""
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+# Loaded before fork so their code and data pages are shared by all workers
+import docx  # noqa: F401
+import firebase_admin  # noqa: F401
+import lxml.etree  # noqa: F401
+import PyPDF2  # noqa: F401
+
+from app.core.config import settings
+from app.core.logging import share_log_file
+from app.main import app
+from app.services.worker_pool import extraction_pool
+
+logger = logging.getLogger("doc_processor")
+
+
+# Time left after draining for the application's shutdown hooks
+SHUTDOWN_MARGIN = 5
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    """
+    Uvicorn worker that stops draining requests before gunicorn's graceful
+    timeout expires, so storage and job queue shutdown still get to run
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(
+            1, self.cfg.graceful_timeout - SHUTDOWN_MARGIN
+        )
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, which respects container CPU sets"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def server_options() -> dict:
+    """Gunicorn settings derived from Settings"""
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": settings.SERVER_WORKERS or available_cpus(),
+        "worker_class": DrainingUvicornWorker,
+        "preload_app": True,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "timeout": settings.SERVER_TIMEOUT,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        # Client addresses (used for rate limits) come from X-Forwarded-For
+        # when the request arrives through one of these proxies
+        "forwarded_allow_ips": settings.SERVER_FORWARDED_ALLOW_IPS,
+        "loglevel": settings.LOG_LEVEL.lower(),
+    }
+
+
+class ProductionServer(BaseApplication):
+    """Gunicorn application serving an already imported ASGI app"""
+
+    def __init__(self, application, options: dict):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def main():
+    options = server_options()
+    workers = options["workers"]
+
+    if not settings.EXTRACTION_POOL_WORKERS:
+        # Split the CPUs between server workers instead of giving each one
+        # an extraction process per CPU
+        extraction_pool.max_workers = max(1, available_cpus() // workers)
+
+    if workers > 1 and settings.JOB_BACKEND == "memory":
+        logger.warning(
+            "JOB_BACKEND=memory keeps jobs per worker; job status requests "
+            "may reach a worker that does not know the job"
+        )
+    elif workers > 1:
+        logger.info(
+            "Workers share the SQLite job store; each job is claimed by one "
+            "worker, and jobs of a worker that stops are resumed by another "
+            f"(after {settings.JOB_STALE_AFTER:g}s if it died)"
+        )
+
+    # Workers inherit the log handlers; rotation is left to logrotate
+    share_log_file()
+
+    logger.info(
+        f"Starting {workers} workers on {options['bind']} "
+        f"({extraction_pool.max_workers} extraction processes each)"
+    )
+    ProductionServer(app, options).run()
+
+
+if __name__ == "__main__":
+    main()
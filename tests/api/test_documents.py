@@ -0,0 +1,279 @@
+# tests/api/test_documents.py
+import hashlib
+import io
+import json
+import time
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.document import ContentPreview, DocumentProcessResponse
+from app.services.storage import InMemoryStorage
+from app.services.worker_pool import ExtractionWorkerPool
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+@pytest.fixture
+def app_client():
+    """TestClient that runs the startup and shutdown hooks."""
+    with patch("app.db.firebase.initialize_firebase"), TestClient(app) as client:
+        yield client
+
+
+def test_async_upload_returns_job(app_client, mock_document_processor):
+    """Async uploads return 202 and the job can be polled to completion."""
+    mock_document_processor.return_value = DocumentProcessResponse(
+        status="success",
+        message="Document processed successfully",
+        document_id="test-document-id",
+        summary={"paragraphs_count": 5},
+        content={},
+        content_preview=ContentPreview(
+            first_page_content="", headers=[], first_paragraphs=[]
+        ),
+    )
+    test_file = {"file": ("test_document.docx", b"content", DOCX_TYPE)}
+
+    response = app_client.post("/api/documents/upload?mode=async", files=test_file)
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job_id = response.json()["job_id"]
+    assert response.headers["location"] == f"/api/documents/jobs/{job_id}"
+
+    for _ in range(100):
+        job = app_client.get(f"/api/documents/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.01)
+    assert job["status"] == "succeeded"
+    assert job["result"]["document_id"] == "test-document-id"
+    assert job["result"]["content"] is None
+    mock_document_processor.assert_called_once()
+    assert mock_document_processor.call_args.kwargs["include_content"] is False
+
+
+def test_unknown_job_returns_404(client):
+    """Polling an unknown job ID returns 404."""
+    response = client.get("/api/documents/jobs/does-not-exist")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_upload_rejected_from_content_length(client):
+    """Declared bodies above the limit are rejected before being read."""
+    response = client.post(
+        "/api/documents/upload",
+        content=b"",
+        headers={"content-length": str(100 * 1024 * 1024)},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def test_duplicate_upload_skips_processing(client, mock_document_processor):
+    """Re-uploading known content returns the stored document."""
+    entry = {
+        "document_id": "existing-document-id",
+        "summary": {"paragraphs_count": 5},
+        "content_preview": {
+            "first_page_content": "",
+            "headers": [],
+            "first_paragraphs": [],
+        },
+    }
+    stored = {"metadata": {"content_sha256": hashlib.sha256(b"content").hexdigest()}}
+    test_file = {"file": ("test_document.docx", b"content", DOCX_TYPE)}
+
+    with patch("app.db.firebase.get_document_hash", return_value=entry), patch(
+        "app.db.firebase.get_document_metadata", return_value=stored
+    ):
+        response = client.post("/api/documents/upload", files=test_file)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["x-dedup-cache"] == "hit"
+    assert response.json()["document_id"] == "existing-document-id"
+    mock_document_processor.assert_not_called()
+
+
+def test_force_bypasses_dedup(client, mock_document_processor):
+    """force=true processes the document even if it is known."""
+    mock_document_processor.side_effect = ValueError("processed")
+    test_file = {"file": ("test_document.docx", b"content", DOCX_TYPE)}
+
+    with patch("app.db.firebase.get_document_hash") as lookup:
+        response = client.post("/api/documents/upload?force=true", files=test_file)
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    lookup.assert_not_called()
+    mock_document_processor.assert_called_once()
+
+
+def test_document_content_supports_etags(client):
+    """Content responses carry an ETag and honour If-None-Match."""
+    metadata = {
+        "metadata": {"processed_at": "2025-01-01T00:00:00", "total_headers": "1"},
+        "chunks": {"headers": [{"chunk_index": "0", "start": "0", "count": "1"}]},
+    }
+    chunks = {"doc_headers_0": {"content": [{"text": "Title", "level": "1"}]}}
+
+    with patch("app.db.firebase.get_document_metadata", return_value=metadata), patch(
+        "app.db.firebase.get_document_chunks", return_value=chunks
+    ) as fetch:
+        response = client.get("/api/documents/doc/content?type=headers")
+        etag = response.headers["etag"]
+        cached = client.get(
+            "/api/documents/doc/content?type=headers",
+            headers={"If-None-Match": etag},
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["content"]["headers"][0]["text"] == "Title"
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    fetch.assert_called_once()
+
+
+def test_document_content_not_found(client):
+    """Unknown documents return 404."""
+    with patch("app.db.firebase.get_document_metadata", return_value=None):
+        response = client.get("/api/documents/missing/content")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_new_version_of_unknown_document_returns_404(client, mock_document_processor):
+    """Version uploads must name a stored document."""
+    test_file = {"file": ("test_document.docx", b"content", DOCX_TYPE)}
+
+    with patch("app.db.firebase.get_document_metadata", return_value=None):
+        response = client.post(
+            "/api/documents/upload?version_of=missing", files=test_file
+        )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    mock_document_processor.assert_not_called()
+
+
+def test_uploaded_documents_are_searchable(client, build_pdf):
+    """Processed content is indexed and found through the search endpoint."""
+    pool = ExtractionWorkerPool(mode="thread", max_workers=1)
+    files = {"file": ("doc.pdf", build_pdf([["Engine fuel pump report"]]), "x")}
+
+    with patch("app.services.document_processor.extraction_pool", pool), patch(
+        "app.services.document_processor.storage", InMemoryStorage()
+    ):
+        upload = client.post("/api/documents/upload", files=files)
+    pool.shutdown()
+    response = client.get("/api/documents/search", params={"q": '"fuel pump"'})
+    other_type = client.get("/api/documents/search?q=fuel&document_type=docx")
+
+    body = response.json()
+    assert response.status_code == status.HTTP_200_OK
+    assert body["total"] == 1
+    assert body["results"][0]["document_id"] == upload.json()["document_id"]
+    assert "<mark>fuel</mark> <mark>pump</mark>" in body["results"][0]["snippet"]
+    assert other_type.json()["total"] == 0
+
+
+def test_upload_streams_content_as_it_is_extracted(client, build_pdf):
+    """Stream lines run metadata, content per page slice, result."""
+    pool = ExtractionWorkerPool(mode="thread", max_workers=2)
+    pages = [[f"Page {n} text"] for n in range(1, 5)]
+    files = {"file": ("doc.pdf", build_pdf(pages), "x")}
+
+    with patch("app.services.document_processor.extraction_pool", pool), patch(
+        "app.services.document_processor.storage", InMemoryStorage()
+    ), patch.multiple(
+        "app.services.document_processor.settings",
+        PDF_PARALLEL_MIN_PAGES=2,
+        PDF_PAGES_PER_TASK=1,
+        CONTENT_PAGE_SIZE=1,
+    ):
+        response = client.post("/api/documents/upload?response=stream", files=files)
+    pool.shutdown()
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert lines[0]["type"] == "metadata"
+    assert lines[-1]["type"] == "result"
+    assert "content" not in lines[-1]
+    assert lines[-1]["document_id"] == lines[0]["document_id"]
+    page_lines = [line for line in lines if line["type"] == "pages"]
+    assert [line["offset"] for line in page_lines] == [0, 1, 2, 3]
+    assert [line["items"][0]["content"] for line in page_lines] == [
+        f"Page {n} text" for n in range(1, 5)
+    ]
+
+
+def test_summary_upload_leaves_out_content(client, mock_document_processor):
+    mock_document_processor.return_value = DocumentProcessResponse(
+        status="success",
+        message="Document processed successfully",
+        document_id="doc-1",
+        summary={"paragraphs_count": 1},
+        content_preview=ContentPreview(
+            first_page_content="", headers=[], first_paragraphs=[]
+        ),
+    )
+    files = {"file": ("a.docx", b"PK", "x")}
+
+    response = client.post("/api/documents/upload?response=summary", files=files)
+    rejected = client.post(
+        "/api/documents/upload?response=summary&mode=async", files=files
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["content"] is None
+    assert mock_document_processor.call_args.kwargs["include_content"] is False
+    assert rejected.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_batch_upload_streams_results_per_file(client, mock_document_processor):
+    """Each file, including zip members, gets its own NDJSON result line."""
+    mock_document_processor.return_value = DocumentProcessResponse(
+        status="success",
+        message="Document processed successfully",
+        document_id="test-document-id",
+        summary={"paragraphs_count": 5},
+        content={},
+        content_preview=ContentPreview(
+            first_page_content="", headers=[], first_paragraphs=[]
+        ),
+    )
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("reports/a.pdf", b"%PDF-a")
+        zf.writestr("reports/notes.txt", b"text")
+        zf.writestr("__MACOSX/reports/._a.pdf", b"")
+    files = [
+        ("files", ("one.docx", b"docx", DOCX_TYPE)),
+        ("files", ("bundle.zip", archive.getvalue(), "application/zip")),
+    ]
+
+    response = client.post("/api/documents/upload-batch?force=true", files=files)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results = {line["filename"]: line for line in lines[:-1]}
+    assert set(results) == {"one.docx", "reports/a.pdf", "reports/notes.txt"}
+    assert results["reports/a.pdf"]["document_id"] == "test-document-id"
+    assert results["reports/a.pdf"]["dedup"] == "bypass"
+    assert results["reports/notes.txt"]["status_code"] == 400
+    assert lines[-1] == {"done": True, "total": 3, "succeeded": 2, "failed": 1}
+    assert mock_document_processor.call_count == 2
+
+
+def test_batch_upload_rejects_invalid_archive(client, mock_document_processor):
+    """An unreadable zip fails the request before anything is processed."""
+    files = [("files", ("bundle.zip", b"not a zip", "application/zip"))]
+
+    response = client.post("/api/documents/upload-batch", files=files)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    mock_document_processor.assert_not_called()
@@ -0,0 +1,84 @@
+# tests/api/test_health.py
+from unittest.mock import patch
+
+from fastapi import status
+
+from app.core.admission import upload_admission
+
+
+def test_health_reports_load_and_limits(client):
+    response = client.get("/api/health")
+
+    body = response.json()
+    assert response.status_code == status.HTTP_200_OK
+    assert body["status"] == "healthy"
+    assert body["load"]["admission"]["processing"] == 0
+    assert body["load"]["admission"]["max_concurrent"] >= 1
+    assert {"pending", "capacity"} <= body["load"]["extraction"].keys()
+    assert {"queued", "max_queued"} <= body["load"]["jobs"].keys()
+
+
+def test_upload_over_rate_limit_gets_429(client, mock_document_processor):
+    """
+    Rejected uploads are answered before processing, with Retry-After.
+    Clients are keyed by IP, so varying unvalidated headers does not help.
+    """
+    files = {"file": ("a.docx", b"PK", "x")}
+
+    with patch.object(upload_admission, "rate", 0.1), patch.object(
+        upload_admission, "burst", 1
+    ):
+        accepted = client.post(
+            "/api/documents/upload", files=files, headers={"X-API-Key": "key-1"}
+        )
+        rejected = client.post(
+            "/api/documents/upload", files=files, headers={"X-API-Key": "key-2"}
+        )
+
+    assert accepted.status_code == status.HTTP_200_OK
+    assert rejected.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert mock_document_processor.call_count == 1
+
+
+def test_rejected_uploads_carry_cors_headers(client, mock_document_processor):
+    """Browsers can read admission rejections and their Retry-After."""
+    files = {"file": ("a.docx", b"PK", "x")}
+    headers = {"Origin": "https://app.example.com"}
+
+    with patch.object(upload_admission, "rate", 0.1), patch.object(
+        upload_admission, "burst", 1
+    ):
+        client.post("/api/documents/upload", files=files, headers=headers)
+        rejected = client.post("/api/documents/upload", files=files, headers=headers)
+
+    assert rejected.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert rejected.headers["Access-Control-Allow-Origin"]
+    assert "Retry-After" in rejected.headers["Access-Control-Expose-Headers"]
+
+
+def test_batch_uploads_go_through_admission(client, mock_document_processor):
+    """
+    A saturated server turns batches away too, and an admitted batch pays
+    one token per document.
+    """
+    files = [
+        ("files", ("a.docx", b"PK", "x")),
+        ("files", ("b.docx", b"PK", "x")),
+    ]
+
+    with patch.object(upload_admission, "_active", 8), patch.object(
+        upload_admission, "max_concurrent", 8
+    ), patch.object(upload_admission, "max_waiting", 0):
+        saturated = client.post("/api/documents/upload-batch", files=files)
+    with patch.object(upload_admission, "rate", 0.1), patch.object(
+        upload_admission, "burst", 2
+    ):
+        accepted = client.post("/api/documents/upload-batch", files=files)
+        rejected = client.post("/api/documents/upload", files=[files[0]])
+
+    assert saturated.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert int(saturated.headers["Retry-After"]) >= 1
+    assert accepted.status_code == status.HTTP_200_OK
+    assert rejected.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(rejected.headers["Retry-After"]) >= 1
@@ -0,0 +1,52 @@
+# tests/api/test_metrics.py
+from unittest.mock import patch
+
+from fastapi import status
+
+from app.core.metrics import ITEMS_EXTRACTED, Histogram
+from app.services.storage import InMemoryStorage
+from app.services.worker_pool import ExtractionWorkerPool
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Buckets are cumulative and end with +Inf, followed by sum and count."""
+    histogram = Histogram("test_seconds", "Test", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage="parse")
+
+    assert histogram.render().splitlines()[2:] == [
+        'test_seconds_bucket{stage="parse",le="0.1"} 1',
+        'test_seconds_bucket{stage="parse",le="1"} 2',
+        'test_seconds_bucket{stage="parse",le="+Inf"} 3',
+        'test_seconds_sum{stage="parse"} 5.55',
+        'test_seconds_count{stage="parse"} 3',
+    ]
+
+
+def test_upload_reports_stage_timings(client, build_pdf):
+    """Uploads carry a Server-Timing header and update the metrics."""
+    pool = ExtractionWorkerPool(mode="thread", max_workers=1)
+    pages_before = ITEMS_EXTRACTED.value(kind="pages")
+    files = {"file": ("doc.pdf", build_pdf([["TITLE", "", "Text."]] * 2), "x")}
+
+    with patch("app.services.document_processor.extraction_pool", pool), patch(
+        "app.services.document_processor.storage", InMemoryStorage()
+    ):
+        response = client.post("/api/documents/upload?force=true", files=files)
+    pool.shutdown()
+
+    assert response.status_code == status.HTTP_200_OK
+    timings = [
+        part.split(";")[0] for part in response.headers["server-timing"].split(", ")
+    ]
+    assert timings == ["read", "parse", "chunk", "write", "index", "total"]
+    assert ITEMS_EXTRACTED.value(kind="pages") == pages_before + 2
+
+    metrics = client.get("/api/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'doc_processor_stage_duration_seconds_count{stage="parse"}' in metrics.text
+    assert (
+        'doc_processor_http_request_duration_seconds_count{method="POST",'
+        'route="/api/documents/upload",status="200"}' in metrics.text
+    )
+    assert "doc_processor_documents_in_progress 0" in metrics.text
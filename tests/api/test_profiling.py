@@ -0,0 +1,73 @@
+# tests/api/test_profiling.py
+import json
+import pstats
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+
+from app.core.config import settings
+from app.services.storage import InMemoryStorage
+from app.services.worker_pool import ExtractionWorkerPool
+
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    """Process documents for real, writing profiles to a temporary directory."""
+    pool = ExtractionWorkerPool(mode="thread", max_workers=1)
+    with patch.object(settings, "PROFILE_DIR", str(tmp_path)), patch.object(
+        settings, "PROFILE_ADMIN_TOKEN", "secret"
+    ), patch("app.services.document_processor.extraction_pool", pool), patch(
+        "app.services.document_processor.storage", InMemoryStorage()
+    ):
+        yield tmp_path
+    pool.shutdown()
+
+
+def _upload(client, build_pdf, headers):
+    files = {"file": ("report.pdf", build_pdf([["TITLE", "", "Text."]]), "x")}
+    return client.post("/api/documents/upload?force=true", files=files, headers=headers)
+
+
+@pytest.mark.parametrize("mode", ["cpu", "memory"])
+def test_admin_header_profiles_upload(client, build_pdf, profile_dir, mode):
+    """X-Profile with the admin token writes a profile covering extraction."""
+    response = _upload(
+        client, build_pdf, {"X-Profile": mode, "X-Admin-Token": "secret"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    (report_path,) = profile_dir.glob("*.json")
+    report = json.loads(report_path.read_text())
+    assert report["mode"] == mode
+    assert report["reason"] == "requested"
+    assert set(report["stages"]) >= {"parse", "chunk", "write"}
+    summary = report_path.with_suffix(".txt").read_text()
+    assert "report.pdf" in summary
+    if mode == "cpu":
+        # The summary only lists the top functions; the stats have them all
+        stats = pstats.Stats(str(report_path.with_suffix(".prof")))
+        assert any(name == "_extract_data_from_pdf" for _, _, name in stats.stats)
+
+
+def test_profile_header_needs_admin_token(client, build_pdf, profile_dir):
+    """Without the right token the header is ignored."""
+    response = _upload(client, build_pdf, {"X-Profile": "cpu", "X-Admin-Token": "x"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert list(profile_dir.iterdir()) == []
+
+
+def test_slow_upload_is_reported(client, build_pdf, profile_dir):
+    """Documents over the latency threshold get a report and a copy."""
+    with patch.object(settings, "PROFILE_SLOW_UPLOAD_SECONDS", 1e-9), patch.object(
+        settings, "PROFILE_KEEP_SLOW_DOCUMENTS", True
+    ):
+        response = _upload(client, build_pdf, {})
+
+    assert response.status_code == status.HTTP_200_OK
+    (report_path,) = profile_dir.glob("*.json")
+    report = json.loads(report_path.read_text())
+    assert report["reason"] == "slow"
+    assert "parse" in report["stages"]
+    assert report_path.with_suffix(".pdf").read_bytes().startswith(b"%PDF")
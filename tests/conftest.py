@@ -4,7 +4,11 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 
+from app.core.admission import upload_admission
 from app.main import app
+from app.services.dedup import dedup_index
+from app.services.document_reader import document_reader
+from app.services.search import SearchIndex
 
 
 @pytest.fixture
@@ -25,10 +29,36 @@ def mock_firebase():
     """Mock Firebase initialization and Firestore operations."""
     with patch("app.db.firebase.initialize_firebase"), patch(
         "app.db.firebase.get_firestore_client"
-    ), patch("app.db.firebase.save_document", return_value="test-document-id"):
+    ), patch("app.db.firebase.warm_up_firestore"), patch(
+        "app.db.firebase.save_document", return_value="test-document-id"
+    ), patch(
+        "app.db.firebase.get_document_hash", return_value=None
+    ), patch(
+        "app.db.firebase.save_document_hash"
+    ):
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Keep hashes, documents and rate limits from leaking into the next test."""
+    yield
+    dedup_index.clear()
+    document_reader.clear()
+    upload_admission.reset()
+
+
+@pytest.fixture(autouse=True)
+def search_index():
+    """Index documents processed by a test in memory, not in the data directory."""
+    index = SearchIndex(":memory:")
+    with patch("app.services.document_processor.search_index", index), patch(
+        "app.api.endpoints.documents.search_index", index
+    ):
+        yield index
+    index.close()
+
+
 @pytest.fixture
 def mock_document_processor():
     """Mock document processor service."""
@@ -66,3 +96,67 @@ def mock_extract_data():
             "headers": [{"level": 1, "text": "Test Header", "index": 1}],
         }
         yield mock
+
+
+def _build_pdf(pages):
+    """
+    Build a minimal PDF with a text layer.
+
+    Each page is a list of lines; an empty string leaves a blank line, which
+    the text layer reports as a paragraph break. A line may also be a list of
+    (x, text) cells, each placed on its own at that horizontal position.
+    """
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", None]
+    kids = []
+    for lines in pages:
+        ops = []
+        for n, line in enumerate(lines):
+            if not line:
+                continue
+            if isinstance(line, list):
+                ops.extend(
+                    f"BT /F1 10 Tf {x} {800 - 14 * n} Td ({text}) Tj ET"
+                    for x, text in line
+                )
+                continue
+            text = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            if n > 0 and not lines[n - 1]:
+                text = "\\n" + text
+            ops.append(f"BT /F1 10 Tf 50 {800 - 14 * n} Td ({text}) Tj ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 1 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        " ".join(f"{kid} 0 R" for kid in kids).encode(),
+        len(kids),
+    )
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        len(objects),
+        xref,
+    )
+    return bytes(pdf)
+
+
+@pytest.fixture
+def build_pdf():
+    """Return a function that builds a PDF from lists of lines per page."""
+    return _build_pdf
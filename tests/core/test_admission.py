@@ -0,0 +1,125 @@
+# tests/core/test_admission.py
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.core.admission import AdmissionController, AdmissionRejected
+
+
+def _controller(**kwargs):
+    limits = dict(
+        max_concurrent=2,
+        memory_budget=100,
+        max_waiting=1,
+        wait_timeout=0.2,
+        rate=0,
+        burst=1,
+        retry_after=7,
+    )
+    return AdmissionController(**{**limits, **kwargs})
+
+
+def test_clients_are_rate_limited_separately():
+    """Each client gets its burst, then 429 until a token is refilled."""
+    controller = _controller(rate=0.5, burst=2, max_concurrent=10)
+
+    async def admit(client):
+        controller.release(await controller.acquire(client, 1))
+
+    with patch("app.core.admission.time.monotonic", return_value=100.0):
+        asyncio.run(admit("ip:a"))
+        asyncio.run(admit("ip:a"))
+        with pytest.raises(AdmissionRejected) as rejected:
+            asyncio.run(admit("ip:a"))
+        asyncio.run(admit("ip:b"))
+    with patch("app.core.admission.time.monotonic", return_value=102.0):
+        asyncio.run(admit("ip:a"))
+
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after == 2
+
+
+def test_uploads_wait_for_slots_and_memory():
+    """Uploads over the slot or memory limits wait, then get 503 when full."""
+    controller = _controller()
+
+    async def scenario():
+        first = await controller.acquire("a", 60)
+        # Fits a slot but not the memory budget, so it waits
+        waiting = asyncio.ensure_future(controller.acquire("b", 60))
+        await asyncio.sleep(0)
+        stats = controller.stats()
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire("c", 10)
+        controller.release(first)
+        second = await waiting
+        controller.release(second)
+        return stats, full.value
+
+    stats, full = asyncio.run(scenario())
+
+    assert (stats["processing"], stats["waiting"]) == (1, 1)
+    assert stats["memory_in_flight"] == 60
+    assert (full.status_code, full.retry_after) == (503, 7)
+    assert controller.stats()["processing"] == 0
+
+
+def test_waiting_times_out_and_frees_the_queue():
+    controller = _controller(max_concurrent=1)
+
+    async def scenario():
+        reserved = await controller.acquire("a", 1)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("b", 1)
+        assert controller.stats()["waiting"] == 0
+        controller.release(reserved)
+        # Larger than the whole budget: admitted alone, capped to the budget
+        assert await controller.acquire("c", 1000) == 100
+
+    asyncio.run(scenario())
+
+
+def test_saturated_uploads_do_not_use_up_tokens():
+    """A 503 leaves the client's allowance for when the server has room."""
+    controller = _controller(rate=0.01, burst=1, max_concurrent=1, max_waiting=1)
+
+    async def scenario():
+        reserved = await controller.acquire("a", 1)
+        # Waits for the slot, times out and gives its token back
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await controller.acquire("b", 1)
+        waiting = asyncio.ensure_future(controller.acquire("c", 1))
+        await asyncio.sleep(0)
+        # Queue full: rejected before the rate limit is checked
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire("b", 1)
+        controller.release(reserved)
+        controller.release(await waiting)
+        controller.release(await controller.acquire("b", 1))
+        return timed_out.value, full.value
+
+    timed_out, full = asyncio.run(scenario())
+
+    assert timed_out.status_code == full.status_code == 503
+
+
+def test_batches_hold_several_slots():
+    controller = _controller(max_concurrent=3, max_waiting=1)
+
+    async def scenario():
+        batch = await controller.acquire("a", 10, slots=2)
+        single = await controller.acquire("b", 10)
+        # No slot left for another batch until the first one is released
+        waiting = asyncio.ensure_future(controller.acquire("c", 10, slots=2))
+        await asyncio.sleep(0)
+        stats = controller.stats()
+        controller.release(batch, slots=2)
+        controller.release(await waiting, slots=2)
+        controller.release(single)
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert (stats["processing"], stats["waiting"]) == (3, 1)
+    assert controller.stats()["processing"] == 0
@@ -0,0 +1,83 @@
+# tests/core/test_logging.py
+import json
+import logging
+import queue
+from logging.handlers import QueueListener, RotatingFileHandler, WatchedFileHandler
+from unittest.mock import patch
+
+from app.core import logging as app_logging
+from app.core.logging import BufferedQueueHandler, JsonFormatter, request_id
+from app.core.metrics import LOG_RECORDS_DROPPED
+
+
+def _record(message, *args, **extra):
+    record = logging.makeLogRecord(
+        {"name": "doc_processor", "levelno": logging.INFO, "levelname": "INFO"}
+    )
+    record.msg, record.args = message, args
+    record.__dict__.update(extra)
+    return record
+
+
+def test_records_carry_request_id_as_json():
+    """Queued records keep the correlation id and format as one JSON line."""
+    handler = BufferedQueueHandler(queue.Queue())
+    token = request_id.set("abc123")
+    try:
+        handler.emit(_record("Saved %d chunks", 3, document_id="doc"))
+    finally:
+        request_id.reset(token)
+
+    line = JsonFormatter().format(handler.queue.get_nowait())
+    entry = json.loads(line)
+    assert entry["message"] == "Saved 3 chunks"
+    assert entry["request_id"] == "abc123"
+    assert entry["document_id"] == "doc"
+    assert entry["level"] == "INFO"
+
+
+def test_full_queue_drops_records():
+    """A full buffer drops records instead of blocking the caller."""
+    handler = BufferedQueueHandler(queue.Queue(maxsize=1))
+    before = LOG_RECORDS_DROPPED.value()
+
+    for n in range(3):
+        handler.emit(_record(f"line {n}"))
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
+    assert LOG_RECORDS_DROPPED.value() == before + 2
+
+
+def test_request_id_is_echoed(client):
+    """Valid client ids are kept; others are replaced by a generated id."""
+    kept = client.get("/api/health", headers={"X-Request-ID": "req-1"})
+    generated = client.get("/api/health", headers={"X-Request-ID": "bad id!"})
+
+    assert kept.headers["x-request-id"] == "req-1"
+    assert len(generated.headers["x-request-id"]) == 32
+
+
+def test_shared_log_file_is_not_rotated_in_process(tmp_path):
+    """Before workers fork, the rotating file handler becomes a watched one."""
+    log_file = tmp_path / "app.log"
+    handler = BufferedQueueHandler(queue.Queue())
+    rotating = RotatingFileHandler(log_file, maxBytes=100)
+    rotating.setFormatter(JsonFormatter())
+    listener = QueueListener(handler.queue, logging.NullHandler(), rotating)
+    listener.start()
+
+    with patch.object(app_logging, "_listener", listener), patch.object(
+        app_logging, "_queue_handler", handler
+    ):
+        app_logging.share_log_file()
+        shared = app_logging._listener
+        handler.emit(_record("after the switch"))
+        app_logging.stop_logging()
+
+    watched = [h for h in shared.handlers if isinstance(h, WatchedFileHandler)]
+    assert not any(isinstance(h, RotatingFileHandler) for h in shared.handlers)
+    assert len(shared.handlers) == 2 and len(watched) == 1
+    assert isinstance(watched[0].formatter, JsonFormatter)
+    assert "after the switch" in log_file.read_text()
+    watched[0].close()
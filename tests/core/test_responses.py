@@ -0,0 +1,45 @@
+# tests/core/test_responses.py
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app.core import responses
+from app.core.responses import FastJSONResponse
+from app.schemas.document import ContentPreview, DocumentProcessResponse
+
+
+def _response():
+    return DocumentProcessResponse.model_construct(
+        status="success",
+        message="Document processed successfully",
+        document_id="doc-1",
+        summary={"paragraphs_count": 1},
+        content={"paragraphs": [{"text": "Überblick", "index": "0"}]},
+        content_preview=ContentPreview(
+            first_page_content="Überblick", headers=[], first_paragraphs=[]
+        ),
+        storage_url=None,
+        version=1,
+    )
+
+
+def test_constructed_models_render_like_model_dump():
+    """Shallow encoding matches pydantic's own JSON, with or without orjson."""
+    response = _response()
+    expected = json.loads(response.model_dump_json())
+
+    fast = FastJSONResponse(response)
+    with patch.object(responses, "orjson", None):
+        fallback = FastJSONResponse(response)
+
+    assert json.loads(fast.body) == expected
+    assert fast.body == fallback.body
+    assert "Überblick".encode() in fast.body
+
+
+def test_datetimes_render_as_iso_strings():
+    created = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+    body = FastJSONResponse({"created_at": created}).body
+
+    assert json.loads(body) == {"created_at": created.isoformat()}
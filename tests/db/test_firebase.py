@@ -0,0 +1,142 @@
+# tests/db/test_firebase.py
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.core.config import settings
+from app.db import firebase
+
+# The autouse Firebase mock replaces get_firestore_client during tests
+real_get_firestore_client = firebase.get_firestore_client
+
+
+@pytest.fixture
+def committed():
+    """Record committed batches instead of talking to Firestore."""
+    batches = []
+    with patch.object(settings, "FIRESTORE_RETRY_BACKOFF", 0), patch(
+        "app.db.firebase._commit_writes", side_effect=batches.append
+    ):
+        yield batches
+
+
+def _chunks(count):
+    return {f"doc_paragraphs_{i}": {"chunk_index": str(i)} for i in range(count)}
+
+
+def test_small_document_is_a_single_atomic_batch(committed):
+    """Metadata and chunks share one batch when they fit."""
+    stats = asyncio.run(firebase.save_document_bulk("doc", {}, _chunks(3)))
+
+    assert len(committed) == 1
+    assert [doc_id for _, doc_id, _ in committed[0]][-1] == "doc"
+    assert stats["batches"] == 1
+    assert stats["writes"] == 4
+    assert stats["retries"] == 0
+
+
+def test_large_document_respects_batch_limit(committed):
+    """Chunks are split into batches of at most 500 writes, metadata last."""
+    stats = asyncio.run(firebase.save_document_bulk("doc", {}, _chunks(1200)))
+
+    assert [len(batch) for batch in committed] == [500, 500, 200, 1]
+    assert committed[-1][0][0] == settings.FIREBASE_COLLECTION_NAME
+    assert stats["batches"] == 4
+    assert stats["writes"] == 1201
+
+
+def test_batches_stay_within_the_commit_size_limit(committed):
+    """Large chunks close a batch by size long before it has 500 writes."""
+    chunks = {
+        f"doc_pages_{i}": {"chunk_index": str(i), "byte_size": str(1000 * 1024)}
+        for i in range(20)
+    }
+
+    stats = asyncio.run(firebase.save_document_bulk("doc", {}, chunks))
+
+    assert [len(batch) for batch in committed] == [9, 9, 2, 1]
+    assert all(
+        sum(map(firebase._write_size, batch)) <= firebase.MAX_BATCH_BYTES
+        for batch in committed
+    )
+    assert committed[-1][0][1] == "doc"
+    assert stats["writes"] == 21
+
+
+def test_documents_with_large_chunks_do_not_share_a_batch(committed):
+    """Documents are packed together only while their total size fits."""
+    documents = [
+        (f"doc{n}", {}, {f"doc{n}_pages_0": {"byte_size": str(5 * 1024 * 1024)}})
+        for n in range(2)
+    ]
+
+    asyncio.run(firebase.save_documents_bulk(documents))
+
+    assert [[doc_id for _, doc_id, _ in batch] for batch in committed] == [
+        ["doc0_pages_0", "doc0"],
+        ["doc1_pages_0", "doc1"],
+    ]
+
+
+def test_small_documents_share_batches(committed):
+    """Several small documents are packed into one batch, each metadata last."""
+    documents = [(f"doc{n}", {}, _chunks(2)) for n in range(3)]
+
+    stats = asyncio.run(firebase.save_documents_bulk(documents))
+
+    assert len(committed) == 1
+    assert [doc_id for _, doc_id, _ in committed[0]][2::3] == ["doc0", "doc1", "doc2"]
+    assert stats["writes"] == 9
+
+
+def test_only_failed_batches_are_retried(committed):
+    """A transient failure retries just the batch that failed."""
+    attempts = []
+
+    def flaky_commit(writes):
+        attempts.append(writes[0][1])
+        if writes[0][1] == "doc_paragraphs_500" and attempts.count(writes[0][1]) == 1:
+            raise google_exceptions.ServiceUnavailable("unavailable")
+        committed.append(writes)
+
+    with patch("app.db.firebase._commit_writes", side_effect=flaky_commit):
+        stats = asyncio.run(firebase.save_document_bulk("doc", {}, _chunks(1000)))
+
+    assert attempts.count("doc_paragraphs_0") == 1
+    assert attempts.count("doc_paragraphs_500") == 2
+    assert stats["retries"] == 1
+
+
+def test_non_retryable_errors_are_raised(committed):
+    """Permanent errors are not retried."""
+    with patch(
+        "app.db.firebase._commit_writes",
+        side_effect=google_exceptions.InvalidArgument("too big"),
+    ) as commit:
+        with pytest.raises(google_exceptions.InvalidArgument):
+            asyncio.run(firebase.save_document_bulk("doc", {}, _chunks(1)))
+
+    assert commit.call_count == 1
+
+
+def test_clients_are_pooled_round_robin_and_closed():
+    """Clients are created once per channel, reused and closed on shutdown."""
+
+    def new_client(**kwargs):
+        client = MagicMock()
+        client._firestore_api_internal.transport.close = AsyncMock()
+        return client
+
+    with patch("app.db.firebase.firebase_admin.get_app"), patch(
+        "app.db.firebase.AsyncClient", side_effect=new_client
+    ) as client_class, patch.object(settings, "FIRESTORE_CHANNEL_POOL_SIZE", 2):
+        clients = [real_get_firestore_client() for _ in range(4)]
+        asyncio.run(firebase.close_firestore_clients())
+
+    assert client_class.call_count == 2
+    assert clients[0] is clients[2] and clients[1] is clients[3]
+    assert clients[0] is not clients[1]
+    clients[0]._firestore_api_internal.transport.close.assert_awaited_once()
+    assert firebase._clients == []
@@ -0,0 +1,60 @@
+# tests/models/test_document.py
+import pickle
+
+from app.models.document import (
+    ExtractedDocument,
+    HeaderRecord,
+    PageRecord,
+    ParagraphRecord,
+    TableGrid,
+)
+
+
+def test_table_grid_keeps_ragged_rows():
+    """Rows of different lengths round-trip through the flat cell list."""
+    grid = TableGrid.from_rows(0, [["a", "b", "c"], ["d"], [], ["e", "f"]])
+
+    assert grid.num_rows == 4
+    assert grid.cells == ["a", "b", "c", "d", "e", "f"]
+    assert list(grid.rows()) == [["a", "b", "c"], ["d"], [], ["e", "f"]]
+    assert grid.row(3) == ["e", "f"]
+
+
+def test_wire_format_uses_string_values():
+    """Conversion to the wire format produces the stored string-typed dicts."""
+    extracted = ExtractedDocument(
+        paragraphs=[ParagraphRecord("Intro", 0, True)],
+        headers=[HeaderRecord("Intro", 2, 0)],
+        pages=[PageRecord(1, "Intro")],
+        tables=[TableGrid.from_rows(3, [["x", "y"]])],
+    )
+
+    assert extracted.to_wire() == {
+        "paragraphs": [{"text": "Intro", "index": "0", "is_heading": "true"}],
+        "headers": [{"text": "Intro", "level": "2", "index": "0"}],
+        "pages": [{"page_number": "1", "content": "Intro"}],
+        "tables": [
+            {
+                "table_index": "3",
+                "rows": [
+                    {
+                        "row_index": "0",
+                        "cells": [
+                            {"cell_index": "0", "value": "x"},
+                            {"cell_index": "1", "value": "y"},
+                        ],
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def test_records_survive_pickling():
+    """The IR crosses the process pool boundary intact."""
+    extracted = ExtractedDocument(
+        paragraphs=[ParagraphRecord("p", 0)],
+        tables=[TableGrid.from_rows(0, [["a"], ["b", "c"]])],
+    )
+
+    assert pickle.loads(pickle.dumps(extracted)) == extracted
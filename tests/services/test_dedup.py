@@ -0,0 +1,42 @@
+# tests/services/test_dedup.py
+import asyncio
+from unittest.mock import patch
+
+from app.services.dedup import DedupIndex
+
+ENTRY = {"document_id": "doc-1", "summary": {"pages_count": 1}}
+
+
+def test_recorded_hashes_are_served_from_the_local_cache():
+    """Entries recorded locally are found without asking Firestore."""
+    index = DedupIndex(cache_size=10)
+
+    async def run():
+        await index.record("abc", dict(ENTRY))
+        return await index.lookup("abc")
+
+    with patch("app.db.firebase.get_document_hash") as remote:
+        entry = asyncio.run(run())
+
+    assert entry["document_id"] == "doc-1"
+    remote.assert_not_called()
+
+
+def test_lookup_falls_back_to_firestore_and_caches():
+    """Misses in the LRU are looked up in Firestore and then cached."""
+    index = DedupIndex(cache_size=10)
+
+    with patch("app.db.firebase.get_document_hash", return_value=dict(ENTRY)) as remote:
+        first = asyncio.run(index.lookup("abc"))
+        second = asyncio.run(index.lookup("abc"))
+
+    assert first == second == ENTRY
+    remote.assert_called_once_with("abc")
+
+
+def test_lookup_errors_are_misses():
+    """A failing index lookup does not fail the upload."""
+    index = DedupIndex(cache_size=10)
+
+    with patch("app.db.firebase.get_document_hash", side_effect=RuntimeError("down")):
+        assert asyncio.run(index.lookup("abc")) is None
@@ -0,0 +1,115 @@
+# tests/services/test_document_versions.py
+import asyncio
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.dedup import dedup_index
+from app.services.document_processor import DocumentProcessorService
+from app.services.document_reader import DocumentReader
+from app.services.storage import DocumentNotFound, InMemoryStorage
+from app.services.worker_pool import ExtractionWorkerPool
+
+
+def _lines(edited=None):
+    lines = []
+    for n in range(60):
+        text = f"Paragraph {n} " + "text " * 20
+        if n == edited:
+            text = "Revised " + text
+        lines += [text, ""]
+    return [lines]
+
+
+@pytest.fixture
+def backend():
+    """In-memory storage behind the processor, reader and dedup index."""
+    backend = InMemoryStorage()
+    pool = ExtractionWorkerPool(mode="thread", max_workers=1)
+    with ExitStack() as stack:
+        for module in ("document_processor", "document_reader", "dedup"):
+            stack.enter_context(patch(f"app.services.{module}.storage", backend))
+        stack.enter_context(
+            patch("app.services.document_processor.extraction_pool", pool)
+        )
+        stack.enter_context(patch.object(settings, "CHUNK_TARGET_BYTES", 1024))
+        yield backend
+    pool.shutdown()
+
+
+def _process(data, **kwargs):
+    return asyncio.run(
+        DocumentProcessorService.process_document(data, "report.pdf", **kwargs)
+    )
+
+
+def test_new_version_writes_only_changed_chunks(backend, build_pdf):
+    """An edited paragraph rewrites its chunk; the rest are shared."""
+    first = _process(build_pdf(_lines()))
+    before = set(backend._chunks)
+
+    second = _process(build_pdf(_lines(edited=30)), version_of=first.document_id)
+
+    stored = asyncio.run(backend.get_document(first.document_id))
+    assert second.document_id == first.document_id
+    assert second.version == 2
+    assert 0 < second.summary["chunks_written"] < second.summary["chunks_reused"]
+    assert [v["version"] for v in stored["versions"]] == ["1", "2"]
+    # Replaced chunks are gone; the others are the ones version 1 wrote
+    assert len(set(backend._chunks) - before) == second.summary["chunks_written"]
+    assert len(backend._chunks) == sum(
+        len(entries) for entries in stored["chunks"].values()
+    )
+
+    page = asyncio.run(backend.get_document_content(first.document_id, ["paragraphs"]))
+    assert page["content"]["paragraphs"] == second.content["paragraphs"]
+
+
+def test_reader_with_a_cached_manifest_reads_the_new_version(backend, build_pdf):
+    """Chunks replaced under a cached manifest trigger a fresh read."""
+    reader = DocumentReader()
+    first = _process(build_pdf(_lines()))
+    asyncio.run(reader.get_etag(first.document_id))
+
+    _process(build_pdf(_lines(edited=0)), version_of=first.document_id)
+    page, etag = asyncio.run(
+        reader.read(first.document_id, ["paragraphs"], offset=0, limit=1)
+    )
+
+    assert page["content"]["paragraphs"][0]["text"].startswith("Revised")
+    assert page["metadata"]["version"] == "2"
+
+
+def test_unchanged_upload_of_an_old_version_is_not_a_duplicate(backend, build_pdf):
+    """Once replaced, a version's content no longer dedups to the document."""
+    original = build_pdf(_lines())
+    first = _process(original, content_hash="v1")
+    _process(
+        build_pdf(_lines(edited=3)), content_hash="v2", version_of=first.document_id
+    )
+
+    assert asyncio.run(DocumentProcessorService.find_duplicate("v1")) is None
+    duplicate = asyncio.run(DocumentProcessorService.find_duplicate("v2"))
+    assert duplicate.document_id == first.document_id
+
+
+def test_stale_cached_entry_of_an_old_version_is_not_a_duplicate(backend, build_pdf):
+    """
+    Another worker may still cache the entry of a replaced version; it is
+    checked against the stored document before being returned.
+    """
+    first = _process(build_pdf(_lines()), content_hash="v1")
+    stale = dict(dedup_index._cache["v1"])
+    _process(
+        build_pdf(_lines(edited=3)), content_hash="v2", version_of=first.document_id
+    )
+    dedup_index._cache["v1"] = stale
+
+    assert asyncio.run(DocumentProcessorService.find_duplicate("v1")) is None
+
+
+def test_version_of_a_missing_document_is_rejected(backend, build_pdf):
+    with pytest.raises(DocumentNotFound):
+        _process(build_pdf(_lines()), version_of="missing")
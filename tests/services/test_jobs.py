@@ -0,0 +1,170 @@
+# tests/services/test_jobs.py
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+from app.schemas.document import ContentPreview, DocumentProcessResponse
+from app.services.jobs import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobQueue,
+    SQLiteJobStore,
+)
+
+
+def _response():
+    return DocumentProcessResponse(
+        status="success",
+        message="Document processed successfully",
+        document_id="test-document-id",
+        summary={"pages_count": 1},
+        content={},
+        content_preview=ContentPreview(
+            first_page_content="", headers=[], first_paragraphs=[]
+        ),
+    )
+
+
+async def _wait_for(queue, job_id, states):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] in states:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {states}")
+
+
+def test_sqlite_store_keeps_unfinished_jobs(tmp_path):
+    """Jobs written to SQLite are visible to a new store instance."""
+    db_path = tmp_path / "jobs.sqlite3"
+    store = SQLiteJobStore(str(db_path))
+    store.create(
+        {"job_id": "a", "status": JOB_RUNNING, "created_at": "1", "filename": "a.pdf"},
+        b"payload",
+    )
+    store.create(
+        {
+            "job_id": "b",
+            "status": JOB_SUCCEEDED,
+            "created_at": "2",
+            "filename": "b.pdf",
+        },
+        b"payload",
+    )
+    store.close()
+
+    reopened = SQLiteJobStore(str(db_path))
+    assert [job["job_id"] for job in reopened.list_unfinished()] == ["a"]
+    with open(reopened.load_payload("a"), "rb") as payload:
+        assert payload.read() == b"payload"
+    reopened.close()
+
+
+def test_sqlite_jobs_are_claimed_by_one_owner(tmp_path):
+    """Processes sharing a store only take over jobs without a live owner."""
+    db_path = str(tmp_path / "jobs.sqlite3")
+    first, second = SQLiteJobStore(db_path), SQLiteJobStore(db_path)
+    job = {"job_id": "a", "status": JOB_QUEUED, "created_at": "1"}
+    first.create(job, b"payload", owner="first")
+
+    assert second.claim_stale("second", stale_before=time.time() - 60) == []
+    assert second.start("a", "second", "now") is False
+
+    first.release("first")
+    assert [j["job_id"] for j in second.claim_stale("second", time.time())] == ["a"]
+    assert first.claim_stale("first", time.time() - 60) == []
+    assert first.start("a", "first", "now") is False
+    assert second.start("a", "second", "now") is True
+    assert second.get("a")["status"] == JOB_RUNNING
+    first.close()
+    second.close()
+
+
+def test_jobs_with_a_stale_heartbeat_are_taken_over(tmp_path):
+    """A running job whose owner died is queued again by the next claimer."""
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create({"job_id": "a", "status": JOB_QUEUED, "created_at": "1"}, b"x", "dead")
+    assert store.start("a", "dead", "now") is True
+
+    claimed = store.claim_stale("alive", stale_before=time.time() + 1)
+
+    assert [job["status"] for job in claimed] == [JOB_QUEUED]
+    assert store.start("a", "alive", "later") is True
+    store.close()
+
+
+def test_finished_jobs_are_purged_after_retention(tmp_path):
+    """Old finished jobs are deleted; unfinished and recent ones are kept."""
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    for job_id, status, updated_at in [
+        ("old", JOB_SUCCEEDED, "2026-01-01T00:00:00"),
+        ("failed", JOB_FAILED, "2026-01-01T00:00:00"),
+        ("recent", JOB_SUCCEEDED, "2026-01-03T00:00:00"),
+        ("queued", JOB_QUEUED, "2026-01-01T00:00:00"),
+    ]:
+        store.create(
+            {
+                "job_id": job_id,
+                "status": status,
+                "created_at": updated_at,
+                "updated_at": updated_at,
+            },
+            b"payload",
+        )
+
+    assert store.purge("2026-01-02T00:00:00") == 2
+    assert store.get("old") is None and store.load_payload("old") is None
+    assert store.get("failed") is None
+    assert store.get("recent") is not None
+    assert store.get("queued") is not None
+    store.close()
+
+
+def test_queue_runs_job_and_reports_progress():
+    """A submitted job is processed in the background and stores its result."""
+
+    async def fake_process(file_content, filename, progress, **kwargs):
+        await progress(stage="writing", pages_parsed=3)
+        await progress(chunks_written=2)
+        return _response()
+
+    async def run():
+        queue = JobQueue(backend="memory", workers=1)
+        with patch(
+            "app.services.document_processor.DocumentProcessorService.process_document",
+            side_effect=fake_process,
+        ):
+            job = await queue.submit(b"content", "test.docx")
+            assert job["status"] == JOB_QUEUED
+            done = await _wait_for(queue, job["job_id"], (JOB_SUCCEEDED, JOB_FAILED))
+        await queue.stop()
+        return done
+
+    job = asyncio.run(run())
+
+    assert job["status"] == JOB_SUCCEEDED
+    assert job["progress"]["pages_parsed"] == 3
+    assert job["progress"]["chunks_written"] == 2
+    assert job["result"]["document_id"] == "test-document-id"
+
+
+def test_queue_records_failures():
+    """Processing errors mark the job as failed with the error message."""
+
+    async def run():
+        queue = JobQueue(backend="memory", workers=1)
+        with patch(
+            "app.services.document_processor.DocumentProcessorService.process_document",
+            new=AsyncMock(side_effect=ValueError("bad document")),
+        ):
+            job = await queue.submit(b"content", "test.docx")
+            done = await _wait_for(queue, job["job_id"], (JOB_SUCCEEDED, JOB_FAILED))
+        await queue.stop()
+        return done
+
+    job = asyncio.run(run())
+
+    assert job["status"] == JOB_FAILED
+    assert job["error"] == "bad document"
@@ -0,0 +1,69 @@
+# tests/services/test_pdf_extraction.py
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.document_processor import DocumentProcessorService
+from app.services.worker_pool import ExtractionWorkerPool
+from app.utils.document_parser import parse_page_range
+
+
+def _pages(count):
+    return [
+        [f"CHAPTER {n}", "", f"Text of page {n}.", "", "Name  Qty", "Bolt  4", ""]
+        for n in range(1, count + 1)
+    ]
+
+
+def test_page_text_is_split_into_paragraphs_and_tables_in_one_pass():
+    """Blank lines separate paragraphs; spaced rows form tables."""
+    paragraphs, tables = DocumentProcessorService._split_pdf_page_text(
+        "TITLE\n\nFirst line\nsecond line\n\nA  B\nC  D"
+    )
+
+    assert paragraphs == ["TITLE", "First line\nsecond line", "A  B\nC  D"]
+    assert tables == [[["A", "B"], ["C", "D"]]]
+
+
+def test_page_range_extracts_only_those_pages(build_pdf):
+    """Only the requested pages are extracted, with absolute page numbers."""
+    data = build_pdf(_pages(5))
+
+    extracted = DocumentProcessorService._extract_data_from_pdf(data, (2, 3))
+
+    assert [p.page_number for p in extracted.pages] == [2, 3]
+    assert [h.text for h in extracted.headers] == ["CHAPTER 2", "CHAPTER 3"]
+    assert extracted.paragraphs[0].index == 0
+
+
+def test_parallel_extraction_matches_serial_extraction(build_pdf):
+    """Page slices extracted concurrently merge into stable global indices."""
+    data = build_pdf(_pages(12))
+    pool = ExtractionWorkerPool(mode="thread", max_workers=3)
+
+    with patch("app.services.document_processor.extraction_pool", pool), patch.object(
+        settings, "PDF_PARALLEL_MIN_PAGES", 4
+    ), patch.object(settings, "PDF_PAGES_PER_TASK", 2):
+        merged = asyncio.run(DocumentProcessorService._extract_pdf_parallel(data))
+    pool.shutdown()
+
+    assert merged == DocumentProcessorService._extract_data_from_pdf(data)
+    assert [t.index for t in merged.tables] == list(range(12))
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("1-20", (1, 20)), ("5", (5, 5)), ("10-", (10, None)), (" 2 - 3 ", (2, 3))],
+)
+def test_parse_page_range(value, expected):
+    """Page ranges accept closed, single-page and open-ended forms."""
+    assert parse_page_range(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0-3", "5-2", "a-b", "-4"])
+def test_parse_page_range_rejects_invalid_ranges(value):
+    """Malformed or empty ranges raise ValueError."""
+    with pytest.raises(ValueError):
+        parse_page_range(value)
@@ -0,0 +1,104 @@
+# tests/services/test_search.py
+import asyncio
+
+from app.services.search import SearchIndex
+
+
+def _content(paragraphs, rows=()):
+    return {
+        "paragraphs": [
+            {"text": text, "index": str(n), "is_heading": "false"}
+            for n, text in enumerate(paragraphs)
+        ],
+        "headers": [],
+        "tables": (
+            [
+                {
+                    "table_index": "0",
+                    "rows": [
+                        {
+                            "row_index": str(r),
+                            "cells": [
+                                {"cell_index": str(c), "value": value}
+                                for c, value in enumerate(row)
+                            ],
+                        }
+                        for r, row in enumerate(rows)
+                    ],
+                }
+            ]
+            if rows
+            else []
+        ),
+    }
+
+
+def _index(index, document_id, paragraphs, rows=(), document_type="pdf"):
+    metadata = {"document_type": document_type, "original_filename": "a.pdf"}
+    asyncio.run(index.index_document(document_id, metadata, _content(paragraphs, rows)))
+
+
+def _search(index, query, **kwargs):
+    return asyncio.run(index.search(query, **kwargs))
+
+
+def test_bm25_ranks_term_frequency_and_rare_terms_higher():
+    index = SearchIndex(":memory:")
+    _index(index, "both", ["Engine inspection report", "Engine checklist"])
+    _index(index, "once", ["Engine maintenance schedule and other notes"])
+    _index(index, "other", ["Cabin crew training", "Weather report"])
+
+    total, results = _search(index, "engine")
+    assert total == 2
+    assert [r["document_id"] for r in results] == ["both", "once"]
+
+    # The rarer term outweighs a common one
+    _, results = _search(index, "engine cabin")
+    assert results[0]["document_id"] == "other"
+
+
+def test_phrases_filters_and_paging():
+    index = SearchIndex(":memory:")
+    _index(index, "a", ["The fuel report is late"], document_type="docx")
+    _index(index, "b", ["A report on fuel"])
+    _index(index, "c", ["fuel report fuel report"])
+
+    total, results = _search(index, '"fuel report"')
+    assert total == 2
+    assert {r["document_id"] for r in results} == {"a", "c"}
+
+    total, results = _search(index, "fuel", document_type="pdf", offset=1, limit=1)
+    assert total == 2 and len(results) == 1
+
+    total, results = _search(index, "fuel", document_ids=["b", "missing"])
+    assert [r["document_id"] for r in results] == ["b"]
+
+    # Past the ids SQLite takes in one query
+    many = [f"missing-{n}" for n in range(600)] + ["c"]
+    total, results = _search(index, "fuel", document_ids=many, document_type="pdf")
+    assert [r["document_id"] for r in results] == ["c"]
+
+
+def test_snippet_comes_from_the_best_matching_passage():
+    index = SearchIndex(":memory:")
+    _index(
+        index,
+        "doc",
+        ["Engine notes", "Unrelated text"],
+        rows=[["Part", "Status"], ["Engine pump", "fuel leak"]],
+    )
+
+    _, [result] = _search(index, "engine fuel")
+
+    assert (result["type"], result["item_index"]) == ("tables", 0)
+    assert result["snippet"] == "<mark>Engine</mark> pump | <mark>fuel</mark> leak"
+
+
+def test_indexing_a_document_again_replaces_it():
+    index = SearchIndex(":memory:")
+    _index(index, "doc", ["Old wording"])
+    _index(index, "doc", ["New wording"])
+
+    assert _search(index, "old") == (0, [])
+    total, [result] = _search(index, "wording")
+    assert total == 1 and result["snippet"] == "New <mark>wording</mark>"
@@ -0,0 +1,262 @@
+# tests/services/test_storage.py
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.document_processor import DocumentProcessorService
+from app.services.storage import (
+    FirestoreStorage,
+    InMemoryStorage,
+    SQLiteStorage,
+    WriteCoalescer,
+    create_storage,
+)
+from app.utils.chunk_codec import ZLIB_CODEC
+from app.utils.chunking import plan_chunks
+
+
+def _stored_document(paragraph_count, chunk_size):
+    """Metadata and chunk documents as written by process_document."""
+    paragraphs = [{"text": f"p{i}", "index": str(i)} for i in range(paragraph_count)]
+    manifest, chunks = [], {}
+    for start in range(0, paragraph_count, chunk_size):
+        index = str(start // chunk_size)
+        content = paragraphs[start : start + chunk_size]
+        chunks[f"doc_paragraphs_{index}"] = {"chunk_index": index, "content": content}
+        manifest.append(
+            {"chunk_index": index, "start": str(start), "count": str(len(content))}
+        )
+    metadata = {
+        "metadata": {"total_paragraphs": str(paragraph_count)},
+        "chunks": {"paragraphs": manifest},
+    }
+    return metadata, chunks
+
+
+def test_content_page_reads_only_overlapping_chunks():
+    """A page spanning two chunks fetches just those two chunks."""
+    metadata, chunks = _stored_document(paragraph_count=250, chunk_size=100)
+    fetched = []
+
+    def get_chunks(chunk_ids):
+        fetched.extend(chunk_ids)
+        return {chunk_id: chunks[chunk_id] for chunk_id in chunk_ids}
+
+    with patch("app.db.firebase.get_document_metadata", return_value=metadata), patch(
+        "app.db.firebase.get_document_chunks", side_effect=get_chunks
+    ):
+        page = asyncio.run(
+            FirestoreStorage().get_document_content(
+                "doc", content_types=["paragraphs"], offset=90, limit=20
+            )
+        )
+
+    assert fetched == ["doc_paragraphs_0", "doc_paragraphs_1"]
+    assert [p["text"] for p in page["content"]["paragraphs"]] == [
+        f"p{i}" for i in range(90, 110)
+    ]
+    assert page["totals"] == {"paragraphs": 250}
+
+
+def test_content_of_missing_document_is_none():
+    """Unknown documents return None."""
+    with patch("app.db.firebase.get_document_metadata", return_value=None):
+        assert asyncio.run(FirestoreStorage().get_document_content("missing")) is None
+
+
+def test_split_items_are_reassembled_from_parallel_reads():
+    """Continuation chunks of a large table are read in groups and merged."""
+    rows = [
+        {"row_index": str(r), "cells": [{"cell_index": "0", "value": "x" * 100}]}
+        for r in range(200)
+    ]
+    tables = [
+        {"table_index": "0", "rows": rows[:2]},
+        {"table_index": "1", "rows": rows},
+        {"table_index": "2", "rows": rows[:1]},
+    ]
+    planned = plan_chunks("tables", tables, target_bytes=4096)
+    chunks, manifest = {}, []
+    for index, plan in enumerate(planned):
+        chunks[f"doc_tables_{index}"] = {
+            "content": plan.items,
+            "part": str(plan.part) if plan.part else None,
+            "total_parts": str(plan.total_parts) if plan.part else None,
+        }
+        manifest.append(
+            {
+                "chunk_index": str(index),
+                "start": str(plan.start),
+                "count": str(len(plan.items)),
+                "byte_size": str(plan.byte_size),
+            }
+        )
+    metadata = {"metadata": {"total_tables": "3"}, "chunks": {"tables": manifest}}
+    reads = []
+
+    def get_chunks(chunk_ids):
+        reads.append(chunk_ids)
+        return {chunk_id: chunks[chunk_id] for chunk_id in chunk_ids}
+
+    with patch("app.db.firebase.get_document_metadata", return_value=metadata), patch(
+        "app.db.firebase.get_document_chunks", side_effect=get_chunks
+    ), patch.object(settings, "CONTENT_FETCH_GROUP_BYTES", 8192):
+        page = asyncio.run(
+            FirestoreStorage().get_document_content(
+                "doc", content_types=["tables"], offset=1, limit=1
+            )
+        )
+
+    assert len(planned) > 3
+    assert len(reads) > 1
+    assert page["content"]["tables"] == [tables[1]]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def local_storage(request, tmp_path):
+    """Each local backend, empty."""
+    if request.param == "memory":
+        backend = InMemoryStorage()
+    else:
+        backend = SQLiteStorage(str(tmp_path / "storage.sqlite3"))
+    yield backend
+    asyncio.run(backend.close())
+
+
+def _save(backend, document_id, paragraph_count, chunk_size):
+    metadata, chunks = _stored_document(paragraph_count, chunk_size)
+    chunks = {
+        chunk_id.replace("doc_", f"{document_id}_", 1): {
+            **chunk,
+            "document_id": document_id,
+            "type": "paragraphs",
+        }
+        for chunk_id, chunk in chunks.items()
+    }
+    return asyncio.run(backend.save_document_bulk(document_id, metadata, chunks))
+
+
+def test_local_backends_round_trip_content(local_storage):
+    """Saved documents are read back page by page."""
+    stats = _save(local_storage, "doc", paragraph_count=250, chunk_size=100)
+    page = asyncio.run(
+        local_storage.get_document_content(
+            "doc", content_types=["paragraphs"], offset=190, limit=20
+        )
+    )
+
+    assert stats["writes"] == 4
+    assert [p["text"] for p in page["content"]["paragraphs"]] == [
+        f"p{i}" for i in range(190, 210)
+    ]
+    chunks = asyncio.run(local_storage.query_chunks("doc", "paragraphs"))
+    assert [c["chunk_index"] for c in chunks] == ["0", "1", "2"]
+
+
+def test_local_backends_round_trip_compressed_chunks(local_storage):
+    """Compressed chunks hold more items and are decoded transparently."""
+    paragraphs = [
+        {"text": f"Paragraph {i} " + "text " * 50, "index": str(i)} for i in range(2000)
+    ]
+    content = {"paragraphs": paragraphs}
+    plain, _ = DocumentProcessorService._build_chunks("doc", content)
+    with patch.object(settings, "CHUNK_COMPRESSION", "zlib"):
+        chunks, manifest = DocumentProcessorService._build_chunks("doc", content)
+    metadata = {"metadata": {"total_paragraphs": "2000"}, "chunks": manifest}
+    asyncio.run(local_storage.save_document_bulk("doc", metadata, chunks))
+
+    page = asyncio.run(
+        local_storage.get_document_content(
+            "doc", content_types=["paragraphs"], offset=1500, limit=10
+        )
+    )
+
+    assert page["content"]["paragraphs"] == paragraphs[1500:1510]
+    assert len(chunks) < len(plain)
+    assert all(chunk["codec"] == ZLIB_CODEC for chunk in chunks.values())
+    assert all(chunk["content"] == [] for chunk in chunks.values())
+
+
+def test_local_backends_delete_documents_and_chunks(local_storage):
+    """Deleting a document removes its chunks but leaves other documents."""
+    _save(local_storage, "doc", paragraph_count=20, chunk_size=10)
+    _save(local_storage, "other", paragraph_count=20, chunk_size=10)
+
+    assert asyncio.run(local_storage.delete_document("doc")) is True
+    assert asyncio.run(local_storage.delete_document("doc")) is False
+    assert asyncio.run(local_storage.get_document("doc")) is None
+    remaining = asyncio.run(
+        local_storage.get_chunks(["doc_paragraphs_0", "other_paragraphs_0"])
+    )
+    assert remaining.keys() == {"other_paragraphs_0"}
+
+
+def test_local_backends_store_content_hashes(local_storage):
+    """The dedup hash index is kept alongside documents."""
+    asyncio.run(local_storage.save_document_hash("abc", {"document_id": "doc"}))
+
+    assert asyncio.run(local_storage.get_document_hash("abc"))["document_id"] == "doc"
+    assert asyncio.run(local_storage.get_document_hash("missing")) is None
+
+
+def test_sqlite_storage_survives_restart(tmp_path):
+    """Documents written before close() are there after reopening."""
+    path = str(tmp_path / "storage.sqlite3")
+    first = SQLiteStorage(path)
+    _save(first, "doc", paragraph_count=5, chunk_size=5)
+    asyncio.run(first.close())
+
+    second = SQLiteStorage(path)
+    try:
+        document = asyncio.run(second.get_document("doc"))
+        assert document["metadata"]["total_paragraphs"] == "5"
+    finally:
+        asyncio.run(second.close())
+
+
+def test_sqlite_storage_opens_a_connection_per_process(tmp_path):
+    """A forked worker does not reuse the connection of its parent."""
+    backend = SQLiteStorage(str(tmp_path / "storage.sqlite3"))
+    assert backend._conn is None
+    _save(backend, "doc", paragraph_count=5, chunk_size=5)
+    parent_conn = backend._conn
+
+    with patch("app.services.storage.os.getpid", return_value=-1):
+        document = asyncio.run(backend.get_document("doc"))
+        assert backend._conn is not parent_conn
+        asyncio.run(backend.close())
+
+    assert document["metadata"]["total_paragraphs"] == "5"
+    parent_conn.close()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_storage("cassandra")
+
+
+def test_write_coalescer_groups_concurrent_saves():
+    """Saves arriving within the window are written in one bulk call."""
+    backend = InMemoryStorage()
+    calls = []
+    original = backend.save_documents_bulk
+
+    async def save_documents_bulk(documents):
+        calls.append([document_id for document_id, _, _ in documents])
+        return await original(documents)
+
+    backend.save_documents_bulk = save_documents_bulk
+    writer = WriteCoalescer(backend, window=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            *(writer.save(f"doc{n}", {"n": n}, {}) for n in range(3))
+        )
+
+    results = asyncio.run(run())
+
+    assert calls == [["doc0", "doc1", "doc2"]]
+    assert all(result["documents"] == 3 for result in results)
+    assert asyncio.run(backend.get_document("doc2"))["n"] == 2
@@ -0,0 +1,94 @@
+# tests/services/test_worker_pool.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.worker_pool import (
+    ExtractionWorkerPool,
+    WorkerPoolSaturated,
+    WorkerPoolTimeout,
+)
+
+
+def test_run_returns_result_off_the_event_loop():
+    """Jobs run on a worker thread and their result is returned."""
+    pool = ExtractionWorkerPool(mode="thread", max_workers=2)
+
+    async def run():
+        return await pool.run(lambda: threading.current_thread().name)
+
+    try:
+        thread_name = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert thread_name.startswith("extraction")
+
+
+def test_run_rejects_jobs_when_queue_is_full():
+    """Jobs beyond workers + queue size are rejected immediately."""
+    pool = ExtractionWorkerPool(mode="thread", max_workers=1, max_queue_size=1)
+    release = threading.Event()
+
+    async def run():
+        blocked = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(WorkerPoolSaturated):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert pool.pending == 0
+
+
+def test_run_times_out_slow_jobs():
+    """Jobs that exceed the timeout raise WorkerPoolTimeout."""
+    pool = ExtractionWorkerPool(mode="thread", max_workers=1, job_timeout=0.05)
+
+    async def run():
+        await pool.run(time.sleep, 0.5)
+
+    try:
+        with pytest.raises(WorkerPoolTimeout):
+            asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+
+def test_timed_out_jobs_hold_their_slot_until_they_finish():
+    """A running job cannot be cancelled, so its worker stays counted."""
+    pool = ExtractionWorkerPool(
+        mode="thread", max_workers=1, max_queue_size=0, job_timeout=0.05
+    )
+    release = threading.Event()
+
+    async def run():
+        with pytest.raises(WorkerPoolTimeout):
+            await pool.run(release.wait)
+        with pytest.raises(WorkerPoolSaturated):
+            await pool.run(time.sleep, 0)
+        release.set()
+        while pool.pending:
+            await asyncio.sleep(0.01)
+        await pool.run(time.sleep, 0)
+
+    try:
+        asyncio.run(run())
+    finally:
+        release.set()
+        pool.shutdown()
+
+    assert pool.pending == 0
+
+
+def test_invalid_mode():
+    """Unknown pool modes are rejected."""
+    with pytest.raises(ValueError):
+        ExtractionWorkerPool(mode="fiber")
@@ -0,0 +1,19 @@
+# tests/test_serve.py
+from unittest.mock import patch
+
+from app.core.config import settings
+from serve import DrainingUvicornWorker, server_options
+
+
+def test_server_options_follow_settings():
+    """Workers default to one per CPU and limits come from Settings."""
+    with patch.object(settings, "SERVER_WORKERS", 0), patch(
+        "serve.available_cpus", return_value=6
+    ), patch.object(settings, "SERVER_MAX_REQUESTS", 250):
+        options = server_options()
+
+    assert options["workers"] == 6
+    assert options["max_requests"] == 250
+    assert options["preload_app"] is True
+    assert options["worker_class"] is DrainingUvicornWorker
+    assert options["forwarded_allow_ips"] == settings.SERVER_FORWARDED_ALLOW_IPS
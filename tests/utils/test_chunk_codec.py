@@ -0,0 +1,55 @@
+# tests/utils/test_chunk_codec.py
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.services.document_processor import DocumentProcessorService
+from app.utils import chunk_codec
+from app.utils.chunk_codec import (
+    ZLIB_CODEC,
+    ZSTD_CODEC,
+    UnknownCodec,
+    chunk_content,
+    compression_codec,
+    encode_content,
+)
+from app.utils.chunking import estimate_size
+
+
+def test_compressed_content_round_trips():
+    items = [{"text": "Überblick " * 20, "index": str(i)} for i in range(50)]
+
+    data = encode_content(ZLIB_CODEC, items)
+    chunk = {"content": [], "codec": ZLIB_CODEC, "compressed_content": data}
+
+    assert chunk_content(chunk) == items
+    assert len(data) * 10 < estimate_size(items)
+    assert chunk_content({"content": items}) == items
+
+
+def test_zstd_falls_back_to_zlib_without_zstandard():
+    compression_codec.cache_clear()
+    try:
+        with patch.object(chunk_codec, "zstandard", None):
+            assert compression_codec("zstd") == ZLIB_CODEC
+            with pytest.raises(UnknownCodec):
+                chunk_content({"codec": ZSTD_CODEC, "compressed_content": b""})
+    finally:
+        compression_codec.cache_clear()
+    assert compression_codec("none") is None
+    with pytest.raises(ValueError):
+        compression_codec("lz4")
+
+
+def test_incompressible_chunks_are_stored_plain():
+    """Compression is skipped for chunks it would not make smaller."""
+    content = {"paragraphs": [{"text": "Short text", "index": "0"}]}
+    with patch.object(settings, "CHUNK_COMPRESSION", "zlib"), patch(
+        "app.services.document_processor.encode_content", return_value=b"x" * 1000
+    ):
+        chunks, manifest = DocumentProcessorService._build_chunks("doc", content)
+
+    (chunk,) = chunks.values()
+    assert chunk["codec"] is None and chunk["content"] == content["paragraphs"]
+    assert manifest["paragraphs"][0]["byte_size"] == chunk["byte_size"]
@@ -0,0 +1,115 @@
+# tests/utils/test_chunking.py
+import pytest
+
+from app.utils.chunking import (
+    chunk_digest,
+    collect_items,
+    estimate_size,
+    plan_chunks,
+    split_item,
+)
+
+
+def _paragraphs(count, text_size):
+    return [
+        {"text": "w" * text_size, "index": str(i), "is_heading": "false"}
+        for i in range(count)
+    ]
+
+
+def _stored(planned):
+    return [
+        {
+            "content": plan.items,
+            "part": plan.part,
+            "total_parts": plan.total_parts,
+        }
+        for plan in planned
+    ]
+
+
+def test_items_are_packed_up_to_the_target_size():
+    """Small items share chunks that stay within the byte target."""
+    paragraphs = _paragraphs(100, 200)
+
+    planned = plan_chunks("paragraphs", paragraphs, target_bytes=4096)
+
+    assert len(planned) > 1
+    assert all(plan.byte_size <= 4096 for plan in planned)
+    assert [plan.start for plan in planned] == [
+        sum(len(p.items) for p in planned[:i]) for i in range(len(planned))
+    ]
+    assert collect_items("paragraphs", _stored(planned)) == paragraphs
+
+
+def test_short_documents_use_a_single_chunk():
+    """Everything that fits the target goes into one write."""
+    planned = plan_chunks("headers", _paragraphs(30, 20), target_bytes=256 * 1024)
+
+    assert len(planned) == 1
+    assert planned[0].byte_size == estimate_size(planned[0].items)
+
+
+def test_oversized_tables_are_split_by_rows():
+    """A table larger than the target becomes continuation chunks."""
+    table = {
+        "table_index": "0",
+        "rows": [
+            {"row_index": str(r), "cells": [{"cell_index": "0", "value": "v" * 50}]}
+            for r in range(500)
+        ],
+    }
+
+    planned = plan_chunks("tables", [table], target_bytes=4096)
+
+    assert len(planned) > 1
+    assert [plan.part for plan in planned] == list(range(1, len(planned) + 1))
+    assert {plan.total_parts for plan in planned} == {len(planned)}
+    assert all(plan.start == 0 and plan.byte_size <= 4096 for plan in planned)
+    assert collect_items("tables", _stored(planned)) == [table]
+
+
+def test_rows_too_large_for_a_chunk_are_rejected():
+    """A row is never split, so one over Firestore's limit cannot be stored."""
+    table = {
+        "table_index": "0",
+        "rows": [
+            {"row_index": "0", "cells": [{"cell_index": "0", "value": "small"}]},
+            {"row_index": "1", "cells": [{"cell_index": "0", "value": "v" * 2**20}]},
+        ],
+    }
+
+    with pytest.raises(ValueError, match="single row"):
+        plan_chunks("tables", [table], target_bytes=256 * 1024)
+
+
+def test_text_is_split_on_character_boundaries():
+    """Splitting long text never breaks a multi-byte character."""
+    page = {"page_number": "1", "content": "é€" * 3000}
+
+    pieces = split_item("pages", page, target_bytes=1024)
+
+    assert len(pieces) > 1
+    assert all(piece["page_number"] == "1" for piece in pieces)
+    assert "".join(piece["content"] for piece in pieces) == page["content"]
+
+
+def test_anchored_chunks_realign_after_an_edit():
+    """Chunks after a grown item keep the boundaries and digests they had."""
+    paragraphs = _paragraphs(100, 200)
+    before = plan_chunks("paragraphs", paragraphs, target_bytes=4096)
+
+    edited = [dict(p) for p in paragraphs]
+    edited[5]["text"] = "w" * 3000
+    after = plan_chunks(
+        "paragraphs",
+        edited,
+        target_bytes=4096,
+        anchors={plan.start for plan in before},
+    )
+
+    following = [plan for plan in after if plan.start >= before[1].start]
+    assert len(after) > len(before)
+    assert [chunk_digest(plan) for plan in following] == [
+        chunk_digest(plan) for plan in before[1:]
+    ]
@@ -0,0 +1,89 @@
+# tests/utils/test_docx_stream.py
+import glob
+import io
+
+from docx import Document
+
+from app.models.document import TableGrid
+from app.services.document_processor import DocumentProcessorService
+from app.utils.document_parser import extract_data_from_docx
+from app.utils.docx_stream import DocxParagraph, iter_docx_blocks
+
+SAMPLE_DOCX = glob.glob("docs/*.docx")[0]
+
+
+def _save(doc) -> bytes:
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def _mixed_document() -> bytes:
+    doc = Document()
+    doc.add_heading("Overview", 1)
+    doc.add_paragraph("")
+    doc.add_paragraph("Intro text")
+    table = doc.add_table(rows=3, cols=3)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"{r}{c}"
+    table.cell(0, 0).merge(table.cell(0, 1))
+    table.cell(1, 2).merge(table.cell(2, 2))
+    doc.add_heading("Details", 2)
+    return _save(doc)
+
+
+def test_blocks_are_yielded_in_document_order():
+    """Paragraphs and tables come out interleaved as they appear in the body."""
+    blocks = list(iter_docx_blocks(_mixed_document()))
+
+    assert [type(block) for block in blocks] == [
+        DocxParagraph,
+        DocxParagraph,
+        DocxParagraph,
+        TableGrid,
+        DocxParagraph,
+    ]
+    assert [b.index for b in blocks if isinstance(b, DocxParagraph)] == [0, 1, 2, 3]
+    assert blocks[0].style == "Heading 1"
+    assert blocks[2].style == "Normal"
+    assert blocks[4].text == "Details"
+
+
+def test_merged_cells_repeat_their_text():
+    """Horizontally and vertically merged cells fill every grid column they cover."""
+    table = next(
+        b for b in iter_docx_blocks(_mixed_document()) if isinstance(b, TableGrid)
+    )
+
+    assert list(table.rows()) == [
+        ["00\n01", "00\n01", "02"],
+        ["10", "11", "12\n22"],
+        ["20", "21", "12\n22"],
+    ]
+
+
+def test_matches_python_docx_on_sample_document():
+    """Paragraph text, indices and styles match python-docx."""
+    doc = Document(SAMPLE_DOCX)
+    expected = [(i, p.text, p.style.name) for i, p in enumerate(doc.paragraphs)]
+
+    blocks = iter_docx_blocks(SAMPLE_DOCX)
+
+    assert [(b.index, b.text, b.style) for b in blocks] == expected
+
+
+def test_parsers_share_the_streaming_backend():
+    """Both extraction entry points report the same headings and tables."""
+    data = _mixed_document()
+
+    service_data = DocumentProcessorService._extract_data_from_docx(data).to_wire()
+    parser_data = extract_data_from_docx(data)
+
+    assert service_data["headers"] == [
+        {"text": "Overview", "level": "1", "index": "0"},
+        {"text": "Details", "level": "2", "index": "3"},
+    ]
+    assert [h["text"] for h in parser_data["headers"]] == ["Overview", "Details"]
+    assert parser_data["tables"][0]["data"][1] == ["10", "11", "12\n22"]
+    assert service_data["tables"][0]["rows"][1]["cells"][2]["value"] == "12\n22"
@@ -0,0 +1,155 @@
+# tests/utils/test_pdf_layout.py
+import io
+from unittest.mock import patch
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import ArrayObject, DictionaryObject, NameObject, NumberObject
+
+from app.core.config import settings
+from app.services.document_processor import DocumentProcessorService
+from app.utils.pdf_layout import _cid_widths, detect_tables, page_words
+
+
+def _first_page(data):
+    return PdfReader(io.BytesIO(data)).pages[0]
+
+
+def test_positioned_cells_form_an_aligned_grid(build_pdf):
+    """Empty and multi-word cells keep their columns; titles stay out."""
+    page = _first_page(
+        build_pdf(
+            [
+                [
+                    "Inventory report",
+                    [(50, "Part"), (200, "Quantity"), (350, "Location")],
+                    [(50, "Hex bolt M8"), (350, "Shelf A")],
+                    [(50, "Washer"), (200, "40")],
+                    [(50, "Spring pin"), (200, "12"), (350, "Bin 3")],
+                    "",
+                    "",
+                    "Totals are checked monthly.",
+                ]
+            ]
+        )
+    )
+
+    assert detect_tables(page_words(page)) == [
+        [
+            ["Part", "Quantity", "Location"],
+            ["Hex bolt M8", "", "Shelf A"],
+            ["Washer", "40", ""],
+            ["Spring pin", "12", "Bin 3"],
+        ]
+    ]
+
+
+def test_rows_with_a_single_cell_stay_in_the_table(build_pdf):
+    """A row with only its first cell filled does not split the table."""
+    page = _first_page(
+        build_pdf(
+            [
+                [
+                    [(50, "Code"), (200, "Status")],
+                    [(50, "A1"), (200, "open")],
+                    [(50, "B2")],
+                    [(50, "C3"), (200, "closed")],
+                ]
+            ]
+        )
+    )
+
+    assert detect_tables(page_words(page)) == [
+        [["Code", "Status"], ["A1", "open"], ["B2", ""], ["C3", "closed"]]
+    ]
+
+
+def test_text_lines_are_not_tables(build_pdf):
+    """Single-spaced text lines produce no tables."""
+    page = _first_page(
+        build_pdf([["A heading", "First line of text", "second line of text"]])
+    )
+
+    assert detect_tables(page_words(page)) == []
+
+
+def test_extraction_uses_the_configured_detector(build_pdf):
+    """Layout detection keeps multi-word cells that the text split breaks up."""
+    data = build_pdf(
+        [[[(50, "Name"), (200, "Unit price")], [(50, "Bolt"), (200, "4")]]]
+    )
+
+    with patch.object(settings, "PDF_TABLE_DETECTION", "layout"):
+        layout = DocumentProcessorService._extract_data_from_pdf(data)
+    with patch.object(settings, "PDF_TABLE_DETECTION", "text"):
+        text = DocumentProcessorService._extract_data_from_pdf(data)
+
+    assert list(layout.tables[0].rows()) == [["Name", "Unit price"], ["Bolt", "4"]]
+    assert layout.pages == text.pages
+    assert layout.paragraphs == text.paragraphs
+
+
+def test_cid_font_widths_come_from_w_and_dw():
+    """Both /W forms are read; other CIDs get the default width."""
+    font = DictionaryObject(
+        {
+            NameObject("/W"): ArrayObject(
+                [
+                    NumberObject(1),
+                    ArrayObject([NumberObject(500), NumberObject(600)]),
+                    NumberObject(10),
+                    NumberObject(12),
+                    NumberObject(250),
+                ]
+            ),
+            NameObject("/DW"): NumberObject(900),
+        }
+    )
+
+    widths, default = _cid_widths(font)
+
+    assert widths == {1: 0.5, 2: 0.6, 10: 0.25, 11: 0.25, 12: 0.25}
+    assert default == 0.9
+
+
+def test_fonts_without_widths_find_no_tables(build_pdf):
+    """Word gaps in a font without metrics are guesses, so tables are skipped."""
+    data = build_pdf(
+        [[[(50, "Code"), (200, "Status")], [(50, "A1"), (200, "open")]]]
+    ).replace(b"/BaseFont /Helvetica", b"/BaseFont /NoMetrics")
+
+    words = page_words(_first_page(data))
+
+    assert words.text == ["Code", "Status", "A1", "open"]
+    assert not words.measured
+    assert detect_tables(words) == []
+
+
+def test_unreadable_content_streams_keep_their_text(build_pdf):
+    """A page whose words cannot be placed has no tables but keeps its text."""
+    data = build_pdf([["Some text on the page", "and another line"]])
+
+    with patch(
+        "app.utils.pdf_layout._page_words", side_effect=KeyError("/Font")
+    ), patch.object(settings, "PDF_TABLE_DETECTION", "layout"):
+        extracted = DocumentProcessorService._extract_data_from_pdf(data)
+
+    assert extracted.pages[0].content
+    assert extracted.paragraphs
+    assert extracted.tables == []
+
+
+def test_contents_lines_with_dot_leaders_are_not_tables(build_pdf):
+    """Section numbers and leader lines of a table of contents stay text."""
+    page = _first_page(
+        build_pdf(
+            [
+                [
+                    [(50, "1"), (100, "Introduction . . . . . . . . 1")],
+                    [(50, "1.1"), (100, "Scope . . . . . . . . . . . 2")],
+                    [(50, "2"), (100, "Usage ......................... 4")],
+                ]
+            ]
+        )
+    )
+
+    assert detect_tables(page_words(page)) == []
@@ -0,0 +1,61 @@
+# tests/utils/test_text_index.py
+from app.utils.text_index import (
+    Passage,
+    decode_position_lists,
+    decode_positions,
+    encode_positions,
+    highlight,
+    index_document,
+    parse_query,
+    phrase_documents,
+)
+
+
+def test_positions_round_trip_through_varints():
+    """Empty lists, large gaps and 32-bit positions survive encoding."""
+    lists = [[], [0, 5, 200], [1, 2, 3, 1_000_000, 2**31 + 5], [], [7]]
+
+    encoded = encode_positions(lists)
+
+    assert [decode_positions(data).tolist() for data in encoded] == lists
+    assert [len(data) for data in encoded] == [0, 4, 11, 0, 1]
+    positions, counts = decode_position_lists(encoded)
+    assert counts.tolist() == [0, 3, 5, 0, 1]
+    assert positions.tolist() == sum(lists, [])
+
+
+def test_phrases_do_not_match_across_passages():
+    """Passages are separated by a position gap."""
+    passages = [
+        Passage("paragraphs", 0, "Check the engine"),
+        Passage("tables", 0, "Fuel | 12"),
+    ]
+    split = index_document(passages)
+    joined = index_document(passages + [Passage("paragraphs", 1, "Engine fuel")])
+
+    def phrase(terms):
+        return phrase_documents(
+            [[(1, terms.terms[term][1])] for term in ("engine", "fuel")]
+        ).tolist()
+
+    assert split.length == 5
+    assert [first for first, _ in split.passages] == [0, 4]
+    assert phrase(split) == []
+    assert phrase(joined) == [1]
+
+
+def test_query_terms_and_phrases():
+    query = parse_query('Engine "fuel  Report" "x" engine')
+
+    assert query.terms == ["fuel", "report", "x", "engine"]
+    assert query.phrases == [["fuel", "report"]]
+
+
+def test_highlight_escapes_and_trims_around_the_first_match():
+    text = "word " * 100 + "<b>Crew</b> report & notes " + "more " * 100
+
+    snippet = highlight(text, {"crew", "report"}, max_chars=80)
+
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "&lt;b&gt;<mark>Crew</mark>&lt;/b&gt; <mark>report</mark> &amp;" in snippet
+    assert len(snippet) < 140
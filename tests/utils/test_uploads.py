@@ -0,0 +1,71 @@
+# tests/utils/test_uploads.py
+import asyncio
+import glob
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+from app.services.document_processor import DocumentProcessorService
+from app.utils.uploads import UploadTooLarge, open_document_source, spool_upload
+
+SAMPLE_DOCX = glob.glob("docs/*.docx")[0]
+
+
+def _spool(data, **kwargs):
+    upload = UploadFile(file=io.BytesIO(data), filename="test.docx")
+    return asyncio.run(spool_upload(upload, **kwargs))
+
+
+def test_small_uploads_stay_in_memory():
+    """Uploads below the threshold are returned as bytes."""
+    spooled = _spool(b"x" * 100, max_size=1000, memory_threshold=500, chunk_size=30)
+
+    assert spooled.in_memory
+    assert spooled.size == 100
+    assert spooled.source() == b"x" * 100
+    spooled.close()
+
+
+def test_large_uploads_are_spooled_to_disk(tmp_path):
+    """Uploads above the threshold are written to a temp file."""
+    spooled = _spool(
+        b"x" * 1000,
+        max_size=2000,
+        memory_threshold=500,
+        chunk_size=300,
+        spool_dir=str(tmp_path),
+    )
+
+    path = spooled.source()
+    assert not spooled.in_memory
+    assert os.path.getsize(path) == 1000
+    spooled.close()
+    assert not os.path.exists(path)
+
+
+def test_oversized_uploads_are_rejected(tmp_path):
+    """Reading stops with UploadTooLarge once the limit is crossed."""
+    with pytest.raises(UploadTooLarge):
+        _spool(
+            b"x" * 1000,
+            max_size=500,
+            memory_threshold=100,
+            chunk_size=100,
+            spool_dir=str(tmp_path),
+        )
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_document_source_path_and_bytes_parse_the_same():
+    """Parsing a file path (memory-mapped) matches parsing its bytes."""
+    with open(SAMPLE_DOCX, "rb") as f:
+        data = f.read()
+
+    with open_document_source(SAMPLE_DOCX) as stream:
+        assert stream.read(2) == b"PK"
+    assert DocumentProcessorService._extract_data_from_docx(
+        SAMPLE_DOCX
+    ) == DocumentProcessorService._extract_data_from_docx(data)